@@ -1,12 +1,13 @@
 import uuid
-from typing import Annotated
+from typing import Annotated, Optional
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import DBDependency
-from app.core.rate_limiting import limiter
+from app.core.ip_filter import client_ip
+from app.core.rate_limiting import limiter, local_share, weighted_limit
 from app.core.responses import send_success, send_error
 from app.core.security import get_current_user, oauth2_scheme
 from app.db.models.user import User
@@ -22,7 +23,7 @@ from app.db.schemas.user import (
 )
 from app.services.email import send_email
 from app.services.auth import AuthService
-from app.services.token import TokenService
+from app.services.token import SESSION_PAGE_SIZE, TokenService
 from app.services.user import UserService
 from app.core.config import settings
 
@@ -33,16 +34,9 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 _PUBLIC = {"security": []}
 
 
-def get_client_ip(request: Request) -> str | None:
-    """Return the real client IP, honoring X-Forwarded-For from proxies."""
-    forwarded_for = request.headers.get("X-Forwarded-For")
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    return request.client.host if request.client else None
-
-
 @router.post("/register", openapi_extra=_PUBLIC)
 @limiter.limit("5/minute")
+@weighted_limit("register")
 async def register(
     request: Request,
     user_data: UserCreate,
@@ -78,6 +72,8 @@ async def register(
 
 @router.post("/verify", openapi_extra=_PUBLIC)
 @limiter.limit("10/minute")
+@weighted_limit("verify_account")
+@local_share(0)  # guards a 6-digit code — always checked against the global count
 async def verify_account(request: Request, body: VerifyRequest, db: DBDependency):
     """Verify user account with verification code"""
     auth_service = AuthService(db)
@@ -95,6 +91,7 @@ async def verify_account(request: Request, body: VerifyRequest, db: DBDependency
 
 @router.post("/resend_verification_code", openapi_extra=_PUBLIC)
 @limiter.limit("3/minute")
+@weighted_limit("resend_verification_code")
 async def resend_verification_code(
     request: Request,
     form_data: ResendVerificationRequest,
@@ -130,11 +127,12 @@ async def resend_verification_code(
 
 @router.post("/login", openapi_extra=_PUBLIC)
 @limiter.limit("10/minute")
+@weighted_limit("login")
 async def login(request: Request, form_data: LoginRequest, db: DBDependency):
     """Authenticate user and return tokens"""
     auth_service = AuthService(db)
 
-    ip_address = get_client_ip(request)
+    ip_address = client_ip(request)
     user_agent = request.headers.get("user-agent")
 
     user, access_token, refresh_token = await auth_service.login(
@@ -157,6 +155,7 @@ async def login(request: Request, form_data: LoginRequest, db: DBDependency):
 
 @router.post("/refresh", openapi_extra=_PUBLIC)
 @limiter.limit("20/minute")
+@weighted_limit("refresh_access_token")
 async def refresh_access_token(
     request: Request, body: RefreshTokenRequest, db: DBDependency
 ):
@@ -177,24 +176,18 @@ async def refresh_access_token(
             detail="User not found",
         )
 
-    ip_address = get_client_ip(request)
+    ip_address = client_ip(request)
     user_agent = request.headers.get("user-agent")
 
-    refresh_record.revoked = True
-
-    access_token_str, access_token_record = await token_service.create_access_token(
+    # New pair and revocation of the old refresh token in one write
+    access_token_str, new_refresh_token_str = await token_service.issue_token_pair(
         user_id=user.id,
         email=user.email,
         db=db,
         ip_address=ip_address,
         user_agent=user_agent,
-    )
-    new_refresh_token_str, _ = await token_service.create_refresh_token(
-        user_id=user.id,
-        access_token_id=access_token_record.id,
-        db=db,
-        ip_address=ip_address,
-        user_agent=user_agent,
+        rotate=refresh_record,
+        user=user,
     )
 
     return send_success(
@@ -209,6 +202,7 @@ async def refresh_access_token(
 
 @router.post("/forgot-password", openapi_extra=_PUBLIC)
 @limiter.limit("5/minute")
+@weighted_limit("forgot_password")
 async def forgot_password(
     request: Request,
     body: ForgotPasswordRequest,
@@ -240,6 +234,8 @@ async def forgot_password(
 
 @router.post("/reset-password", openapi_extra=_PUBLIC)
 @limiter.limit("5/minute")
+@weighted_limit("reset_password")
+@local_share(0)  # guards a 6-digit code — always checked against the global count
 async def reset_password(request: Request, body: ResetRequest, db: DBDependency):
     """Reset password with verification code"""
     auth_service = AuthService(db)
@@ -254,7 +250,9 @@ async def reset_password(request: Request, body: ResetRequest, db: DBDependency)
 
 
 @router.post("/logout")
+@weighted_limit("logout")
 async def logout(
+    request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
     token: Annotated[str, Depends(oauth2_scheme)],
     db: DBDependency,
@@ -266,7 +264,9 @@ async def logout(
 
 
 @router.post("/logout-all")
+@weighted_limit("logout_all_devices")
 async def logout_all_devices(
+    request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
     db: DBDependency,
 ):
@@ -280,6 +280,47 @@ async def logout_all_devices(
 
 
 @router.get("/me")
-async def read_users_me(current_user: Annotated[User, Depends(get_current_user)]):
+@weighted_limit("read_users_me")
+async def read_users_me(
+    request: Request, current_user: Annotated[User, Depends(get_current_user)]
+):
     """Get current authenticated user"""
     return send_success(data=UserResponse.model_validate(current_user))
+
+
+@router.get("/sessions")
+@weighted_limit("list_sessions")
+async def list_sessions(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: DBDependency,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = SESSION_PAGE_SIZE,
+):
+    """List the devices signed in to this account, newest first
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    token_service = TokenService()
+    page = await token_service.list_sessions(
+        current_user.id, db, cursor=cursor, limit=limit
+    )
+    return send_success(data=page)
+
+
+@router.delete("/sessions/{session_id}")
+@weighted_limit("revoke_session")
+async def revoke_session(
+    request: Request,
+    session_id: uuid.UUID,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: DBDependency,
+):
+    """Sign one device out"""
+    token_service = TokenService()
+    if not await token_service.revoke_token_by_id(current_user.id, session_id, db):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found",
+        )
+    return send_success(message="Session revoked")
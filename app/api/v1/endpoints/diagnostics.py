@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.core.config import settings
+from app.core.responses import send_success
+from app.core.security import require_debug_token
+from app.utils.memory import memory_profiler
+
+# Admin only: every route requires a signed X-Debug-Token
+router = APIRouter(
+    prefix="/diagnostics",
+    tags=["diagnostics"],
+    dependencies=[Depends(require_debug_token)],
+)
+
+
+# Snapshots, diffs, gc.get_objects() walks and dumps take seconds on a large
+# heap, so those routes are plain ``def``: they run in the threadpool instead
+# of stalling every request on the worker's event loop.
+
+
+def _run(fn, *args, **kwargs):
+    """Map profiler errors onto HTTP errors."""
+    try:
+        return fn(*args, **kwargs)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.args[0])
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, ge=1, le=50)):
+    """Start tracing allocations in this worker"""
+    memory_profiler.start(frames)
+    return send_success(message="tracemalloc started", data={"frames": frames})
+
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc():
+    """Stop tracing and discard stored snapshots"""
+    memory_profiler.stop()
+    return send_success(message="tracemalloc stopped")
+
+
+@router.post("/memory/snapshots")
+def take_snapshot(name: str = Query(..., min_length=1, max_length=64)):
+    """Take a named snapshot of traced allocations"""
+    data = _run(memory_profiler.take_snapshot, name)
+    return send_success(message="Snapshot taken", data=data)
+
+
+@router.get("/memory/snapshots")
+async def list_snapshots():
+    """List stored snapshot names"""
+    return send_success(
+        data={
+            "tracing": memory_profiler.tracing,
+            "snapshots": memory_profiler.snapshot_names(),
+        }
+    )
+
+
+@router.get("/memory/top")
+def top_allocations(
+    name: str | None = None, limit: int = Query(20, ge=1, le=200)
+):
+    """Largest allocation sites in a snapshot, or right now"""
+    return send_success(data=_run(memory_profiler.top, name, limit))
+
+
+@router.get("/memory/diff")
+def diff_snapshots(
+    base: str,
+    target: str | None = None,
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Top allocation growth by file:line between two snapshots (or base → now)"""
+    return send_success(data=_run(memory_profiler.diff, base, target, limit))
+
+
+@router.get("/memory/gc")
+def gc_stats(limit: int = Query(30, ge=1, le=500)):
+    """gc generation counts, RSS and the most common live object types"""
+    return send_success(data=memory_profiler.gc_stats(limit))
+
+
+@router.post("/memory/dump")
+def dump_memory():
+    """Write a memory report (and snapshot if tracing) to MEMORY_SNAPSHOT_DIR"""
+    paths = memory_profiler.dump(settings.MEMORY_SNAPSHOT_DIR)
+    return send_success(message="Memory dump written", data={"files": paths})
@@ -0,0 +1,190 @@
+"""
+Admission control: per-route concurrency caps with a bounded wait queue
+
+Every request is admitted into a lane before it reaches the application.
+A lane allows ``limit`` requests at once per worker. Further requests
+wait in a FIFO queue of at most ``ADMISSION_QUEUE_SIZE``, and are
+rejected with ``503`` and ``Retry-After`` when:
+
+- the queue is full;
+- they would wait longer than ``ADMISSION_QUEUE_TIMEOUT_MS``; or
+- the lane's recent service time predicts they cannot be admitted within
+  that deadline, so they are shed immediately instead of timing out in
+  the queue.
+
+Routes that run bcrypt share the ``hash`` lane, so a login flood queues
+behind a handful of password verifications instead of occupying the
+whole worker. Everything else goes through the ``default`` lane.
+
+Reads carrying a validly signed bearer token go through their own
+``priority`` lane (``ADMISSION_PRIORITY_CONCURRENCY``), so signed-in users
+are not starved by anonymous traffic in the ``default`` lane. The lane is
+bounded like any other: a signature says nothing about revocation, so a
+flood of reads with a stolen or revoked token can fill only this lane.
+Only ``ADMISSION_PRIORITY_PATHS`` (``/health``, ``/metrics``) skip
+admission entirely.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+from app.core.security import bearer_subject
+
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class OverloadedError(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: float):
+        super().__init__(f"{lane} lane overloaded ({reason})")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class Lane:
+    """A per-worker concurrency cap with a bounded FIFO queue."""
+
+    # Weight of the newest sample in the service-time moving average
+    SMOOTHING = 0.2
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.avg_service = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._queue_gauge = ADMISSION_QUEUE_DEPTH.labels(name)
+        self._in_flight_gauge = ADMISSION_IN_FLIGHT.labels(name)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """Rough time until a newly queued request would be admitted."""
+        return (self.queued + 1) * self.avg_service / self.limit
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self._admit()
+            return
+
+        if self.queued >= self.queue_size:
+            raise OverloadedError(self.name, "queue_full", self.expected_wait())
+        if self.expected_wait() > self.timeout:
+            raise OverloadedError(self.name, "predicted", self.expected_wait())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queue_gauge.inc()
+        try:
+            # release() hands its slot over by resolving the future
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            raise OverloadedError(self.name, "timeout", self.expected_wait()) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # admitted just as the client went away
+            raise
+        finally:
+            self._queue_gauge.dec()
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def _admit(self) -> None:
+        self.active += 1
+        self._in_flight_gauge.inc()
+
+    def release(self, service_time: float | None = None) -> None:
+        if service_time is not None:
+            self.avg_service += self.SMOOTHING * (service_time - self.avg_service)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot passes straight to the next waiter
+                return
+        self.active -= 1
+        self._in_flight_gauge.dec()
+
+
+class AdmissionController:
+    """Maps requests to lanes; one instance per worker."""
+
+    def __init__(self):
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000
+        limits = {
+            "default": settings.ADMISSION_MAX_CONCURRENCY,
+            "priority": settings.ADMISSION_PRIORITY_CONCURRENCY,
+        }
+        limits.update(settings.ADMISSION_LANE_LIMITS)
+        self.lanes = {
+            name: Lane(name, limit, settings.ADMISSION_QUEUE_SIZE, timeout)
+            for name, limit in limits.items()
+        }
+        self.routes = dict(settings.ADMISSION_ROUTE_LANES)
+        self.priority_paths = set(settings.admission_priority_paths)
+
+    def lane_for(self, scope) -> Lane | None:
+        """The lane to queue in, or None for paths that skip admission."""
+        path = scope["path"]
+        if path in self.priority_paths:
+            return None
+        if scope["method"] in _READ_METHODS and path not in self.routes:
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    if bearer_subject(value.decode("latin-1")):
+                        return self.lanes["priority"]
+                    break
+        return self.lanes.get(self.routes.get(path, "default"), self.lanes["default"])
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying ``AdmissionController`` to every request."""
+
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.controller.lane_for(scope)
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await lane.acquire()
+        except OverloadedError as e:
+            from app.core.responses import send_error
+
+            ADMISSION_REJECTIONS.labels(e.lane, e.reason).inc()
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content=send_error(
+                    message="Server is busy. Please retry shortly.",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                ).model_dump(),
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release(time.perf_counter() - start)
@@ -16,16 +16,110 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     ALLOWED_ORIGINS: str = "*"  # Comma-separated string or "*"
     ALLOWED_HOSTS: str = "*"   # Comma-separated hostnames or "*" to allow all
+    TRUSTED_PROXIES: str = ""  # Comma-separated IPs/CIDRs allowed to set X-Forwarded-For
+    # IP filter — comma-separated IPs/CIDRs; the longest matching prefix wins
+    IP_BLOCKLIST: str = ""
+    IP_ALLOWLIST: str = ""
+    IP_FILTER_FILE: str | None = None  # "block|allow|trust <cidr>" lines, hot-reloaded
+    IP_FILTER_RELOAD_SECONDS: int = 5
 
     # Rate Limiting
     RATE_LIMIT_ENABLED: bool = False
+    # Shared counter storage; defaults to REDIS_URL, else sharedmem:// (one host)
+    RATE_LIMIT_STORAGE_URI: str | None = None
+    RATE_LIMIT_STRATEGY: Literal["fixed-window", "moving-window", "hybrid"] = "moving-window"
+    # hybrid: grant from local buckets, reconcile with the storage every interval
+    RATE_LIMIT_SYNC_INTERVAL_MS: int = 250
+    RATE_LIMIT_LOCAL_SHARE: float = 0.25  # of the remaining budget, per worker
+    # When the storage is down: "memory" limits per worker, "open" allows all
+    RATE_LIMIT_FALLBACK: Literal["memory", "open"] = "memory"
+    # sharedmem://: longest a check blocks the event loop on another worker's lock
+    RATE_LIMIT_BUSY_TIMEOUT_MS: int = 50
+    # Per-caller budget shared by the auth routes, each charging its cost
+    RATE_LIMIT_AUTH_BUDGET: str = "100/minute"
+    RATE_LIMIT_COSTS: dict[str, int] = {}  # JSON, e.g. {"login": 20}
+
+    # Admission control (per worker) — excess requests get 503 + Retry-After
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 64  # the "default" lane
+    ADMISSION_PRIORITY_CONCURRENCY: int = 16  # the "priority" lane: authenticated reads
+    ADMISSION_LANE_LIMITS: dict[str, int] = {"hash": 2}  # JSON; concurrent bcrypt calls
+    # Every route that runs the password hasher (passwords and verification codes)
+    ADMISSION_ROUTE_LANES: dict[str, str] = {
+        "/api/v1/auth/login": "hash",
+        "/api/v1/auth/register": "hash",
+        "/api/v1/auth/verify": "hash",
+        "/api/v1/auth/resend_verification_code": "hash",
+        "/api/v1/auth/forgot-password": "hash",
+        "/api/v1/auth/reset-password": "hash",
+    }
+    ADMISSION_QUEUE_SIZE: int = 32  # waiters per lane
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 2000
+    ADMISSION_PRIORITY_PATHS: str = "/health,/metrics"  # never queued
+
+    # Request deadline — handlers are cancelled with 504 past it. Clients may
+    # ask for less with X-Request-Timeout; DB statements inherit what is left
+    REQUEST_TIMEOUT_SECONDS: float = 30
+
+    # Observability
+    # Emit Server-Timing on every response; otherwise only for requests
+    # carrying a valid X-Debug-Token (python generate_secret.py --debug-token)
+    SERVER_TIMING_ENABLED: bool = False
+    # Prometheus /metrics endpoint and request instrumentation
+    METRICS_ENABLED: bool = True
+    # SQL statements slower than this are logged (parameters redacted)
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    # Flag requests issuing more statements than this
+    QUERY_COUNT_WARN_THRESHOLD: int = 20
+    # Flag requests repeating the same statement this many times (N+1)
+    N_PLUS_ONE_THRESHOLD: int = 5
+    # Per-request profiling (requires a signed X-Profile-Token header)
+    PROFILING_ENABLED: bool = True
+    PROFILE_DIR: str = "logs/profiles"
+    # Event-loop lag monitor and blocking-call detector
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_MS: int = 100
+    LOOP_LAG_THRESHOLD_MS: int = 100
+    LOOP_DEBUG: bool = False  # asyncio debug mode + slow-callback reports
+    # Memory diagnostics — dump a snapshot when RSS crosses the threshold
+    MEMORY_RSS_THRESHOLD_MB: int = 0  # 0 disables the automatic dump
+    MEMORY_CHECK_INTERVAL_SECONDS: int = 60
+    MEMORY_SNAPSHOT_DIR: str = "logs/memory"
 
     DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 10  # persistent connections per worker
+    DATABASE_MAX_OVERFLOW: int = 20  # extra connections allowed above the pool size
+    DATABASE_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    DATABASE_POOL_WARMUP: bool = True  # open the pool and prepare hot queries at startup
+    DATABASE_STATEMENT_CACHE_SIZE: int = 256  # asyncpg prepared statements per connection
+    DATABASE_QUERY_CACHE_SIZE: int = 500  # SQLAlchemy compiled-SQL cache entries
+    # Read replicas — comma-separated URLs; only reads marked replica-safe use them
+    DATABASE_REPLICA_URLS: str = ""
+    DATABASE_REPLICA_STRATEGY: Literal["round_robin", "least_connections"] = "round_robin"
+    DATABASE_REPLICA_EJECT_SECONDS: int = 30
     CACHE_TYPE: Literal["inmemory", "redis", "database"] = "inmemory"
     REDIS_URL: str | None = None
     SECRET_KEY: str = ""  # Required; validate below
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # "jwt": signed tokens checked against access_tokens on every request.
+    # "opaque": random tokens whose sessions live in Redis (REDIS_URL, else
+    # per-process memory); revocations reach access_tokens write-behind
+    AUTH_TOKEN_MODE: Literal["jwt", "opaque"] = "jwt"
+    SESSION_AUDIT_FLUSH_SECONDS: int = 5
+    # access_tokens.last_used_at is buffered per worker and flushed in one
+    # batched UPDATE every TOKEN_USAGE_FLUSH_SECONDS, at most once per token
+    # per TOKEN_LAST_USED_RESOLUTION_MINUTES
+    TOKEN_USAGE_FLUSH_SECONDS: int = 10
+    TOKEN_LAST_USED_RESOLUTION_MINUTES: int = 5
+    # Algorithm and cost of new password hashes; older hashes are upgraded
+    # at login. Costs are per host: run python calibrate_hashing.py
+    PASSWORD_HASHER: Literal["bcrypt", "argon2"] = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_KIB: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_TARGET_MS: int = 250  # calibration target per hash
 
     # Environment & Token Settings
     ENVIRONMENT: str = "development"  # development, test, staging, production
@@ -43,6 +137,7 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = False
     TEMPLATE_FOLDER: str = str(BASE_DIR / "templates" / "emails")
     SUPPRESS_SEND: int = 0
+    EMAIL_TIMEOUT_SECONDS: float = 30
 
     # Parse ALLOWED_ORIGINS
     @property
@@ -57,6 +152,26 @@ class Settings(BaseSettings):
             return ["*"]
         return [h.strip() for h in self.ALLOWED_HOSTS.split(",") if h.strip()]
 
+    @property
+    def trusted_proxies_list(self) -> List[str]:
+        return [p.strip() for p in self.TRUSTED_PROXIES.split(",") if p.strip()]
+
+    @property
+    def database_replica_urls(self) -> List[str]:
+        return [u.strip() for u in self.DATABASE_REPLICA_URLS.split(",") if u.strip()]
+
+    @property
+    def ip_blocklist(self) -> List[str]:
+        return [c.strip() for c in self.IP_BLOCKLIST.split(",") if c.strip()]
+
+    @property
+    def ip_allowlist(self) -> List[str]:
+        return [c.strip() for c in self.IP_ALLOWLIST.split(",") if c.strip()]
+
+    @property
+    def admission_priority_paths(self) -> List[str]:
+        return [p.strip() for p in self.ADMISSION_PRIORITY_PATHS.split(",") if p.strip()]
+
     @property
     def secret_key_valid(self) -> bool:
         return bool(
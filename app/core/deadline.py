@@ -0,0 +1,144 @@
+"""
+Request deadlines
+
+Every request gets a deadline: ``REQUEST_TIMEOUT_SECONDS``, or less when
+the client sends ``X-Request-Timeout: <seconds>`` (a client can shorten
+its deadline but not extend it). ``DeadlineMiddleware`` cancels the
+handler when the deadline passes and answers ``504``.
+
+Downstream calls size their own timeouts from the time that is left:
+
+- each database transaction runs ``SET LOCAL statement_timeout``
+  (PostgreSQL), so a stuck query is killed server-side and its pooled
+  connection is released instead of being held until ``pool_timeout``;
+- Redis cache calls and SMTP sends are bounded with ``budget()``, except
+  ``cache.invalidate``: a skipped invalidation would keep stale data.
+
+The deadline is disarmed once the response has been sent, so background
+tasks (e.g. emails) fall back to their own default timeouts.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.utils.logging import get_logger
+
+_HEADER = b"x-request-timeout"
+
+
+class Deadline:
+    __slots__ = ("at",)
+
+    def __init__(self, seconds: float):
+        self.at: float | None = time.monotonic() + seconds
+
+    def remaining(self) -> float | None:
+        if self.at is None:
+            return None
+        return max(self.at - time.monotonic(), 0.0)
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+def start_deadline(seconds: float) -> Deadline:
+    deadline = Deadline(seconds)
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def remaining() -> float | None:
+    """Seconds left before the current request's deadline (None outside one)."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline else None
+
+
+def budget(default: float | None = None) -> float | None:
+    """Timeout for a downstream call: the smaller of ``default`` and the time left."""
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(left, default)
+
+
+def _requested_timeout(scope) -> float:
+    for name, value in scope["headers"]:
+        if name == _HEADER:
+            try:
+                requested = float(value)
+            except ValueError:
+                break
+            if requested > 0:
+                return min(requested, settings.REQUEST_TIMEOUT_SECONDS)
+            break
+    return settings.REQUEST_TIMEOUT_SECONDS
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware enforcing the request deadline."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = _requested_timeout(scope)
+        deadline = start_deadline(seconds)
+        response_started = False
+        expired = False
+
+        # A timer cancelling this task rather than asyncio.timeout(), which
+        # needs Python 3.11 (requires-python is >=3.10)
+        task = asyncio.current_task()
+
+        def expire():
+            nonlocal expired
+            expired = True
+            task.cancel()
+
+        timer = asyncio.get_running_loop().call_later(seconds, expire)
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                # Response delivered: background tasks run without the deadline
+                timer.cancel()
+                deadline.at = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            if not expired or response_started:
+                raise
+            if hasattr(task, "uncancel"):  # 3.11+: our cancel is handled here
+                task.uncancel()
+            get_logger().warning(
+                f"Request deadline of {seconds:g}s exceeded: "
+                f"{scope['method']} {scope['path']}"
+            )
+            from app.core.responses import send_error
+
+            response = JSONResponse(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                content=send_error(
+                    message="The request took too long and was cancelled.",
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                ).model_dump(),
+            )
+            await response(scope, receive, send)
+        finally:
+            timer.cancel()
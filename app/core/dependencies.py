@@ -3,6 +3,11 @@ from typing import Annotated, AsyncGenerator
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.events import (
+    report_connection_hold,
+    run_after_commit,
+    session_has_writes,
+)
 from app.db.session import SessionLocal
 
 import logging
@@ -17,16 +22,24 @@ logger = logging.getLogger(__name__)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    # The session checks out a connection on first use only, so requests
+    # that fail validation or are served from cache never touch the pool
     async with SessionLocal() as session:
         try:
             yield session
-            await session.commit()  # ✅ Commit when all goes well
+            if session_has_writes(session):
+                await session.commit()  # ✅ Commit when all goes well
+            # Including commits made earlier in the request
+            await run_after_commit(session)
+            # Read-only: close() hands the connection back without a COMMIT
         except Exception as e:
-            await session.rollback()  # ✅ Rollback on any error
-            logger.exception(f"Database transaction rolled back: {e}")
+            if session.in_transaction():
+                await session.rollback()  # ✅ Rollback on any error
+                logger.exception(f"Database transaction rolled back: {e}")
             raise
         finally:
             await session.close()  # ✅ Ensure session is closed
+            report_connection_hold(session)
 
 
 DBDependency = Annotated[AsyncSession, Depends(get_db)]
@@ -0,0 +1,186 @@
+"""
+Hybrid rate limiting strategy: local token buckets reconciled with shared storage
+
+With ``RATE_LIMIT_STRATEGY=hybrid`` each worker grants hits from a local
+token bucket per limit key, with no network I/O. A background thread
+pushes the consumed counts to the shared storage (Redis / sharedmem) every
+``RATE_LIMIT_SYNC_INTERVAL_MS`` and refills the bucket from the global
+count it gets back, so every worker converges on the global limit.
+
+A bucket holds ``share`` of the remaining global budget. When it runs dry
+the hit goes to the shared storage synchronously, which is exact. A worker
+cannot see hits other workers granted since their last sync, so the limit
+can be overshot by up to the other workers' shares. A small share keeps
+the overshoot small, and a large one saves more round trips.
+
+The share is set per route with ``local_share``. A share of ``0`` makes a
+route strict, so every hit goes to the shared storage. slowapi scopes a
+route's limit by its URL path, so ``register_route_shares`` maps each
+marked route's path to its share once the routers are included.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from limits.strategies import STRATEGIES, FixedWindowRateLimiter
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_DECISIONS
+from app.utils.logging import get_logger
+
+# Route scope (the URL path slowapi keys limits by) -> share of the
+# remaining budget granted locally
+ROUTE_SHARES: dict[str, float] = {}
+
+
+def local_share(share: float):
+    """Decorator setting how much of a route's remaining limit is granted locally."""
+
+    def decorator(func):
+        # Kept through slowapi's functools.wraps; read by register_route_shares
+        func.rate_limit_share = share
+        return func
+
+    return decorator
+
+
+def register_route_shares(app) -> None:
+    """Key each ``local_share`` route's share by its path, as slowapi scopes it."""
+    for route in app.routes:
+        share = getattr(getattr(route, "endpoint", None), "rate_limit_share", None)
+        if share is not None:
+            ROUTE_SHARES[route.path] = share
+
+
+@dataclass
+class _Bucket:
+    limit: int
+    expiry: int
+    share: float
+    expires_at: float
+    tokens: float
+    pending: int = 0
+
+
+class HybridRateLimiter(FixedWindowRateLimiter):
+    """Fixed-window limiter answering from local buckets between syncs."""
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.sync_interval = settings.RATE_LIMIT_SYNC_INTERVAL_MS / 1000
+        self.default_share = settings.RATE_LIMIT_LOCAL_SHARE
+        self._buckets: dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._local_decisions = RATE_LIMIT_DECISIONS.labels("local")
+        self._shared_decisions = RATE_LIMIT_DECISIONS.labels("shared")
+
+    def _share_for(self, identifiers) -> float:
+        return ROUTE_SHARES.get(identifiers[-1], self.default_share)
+
+    # ── RateLimiter API ──────────────────────────────────────────────────────
+
+    def hit(self, item, *identifiers: str, cost: int = 1) -> bool:
+        share = self._share_for(identifiers)
+        if share <= 0:
+            self._shared_decisions.inc()
+            return super().hit(item, *identifiers, cost=cost)
+
+        self._ensure_syncer()
+        key = item.key_for(*identifiers)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket and bucket.expires_at > now and bucket.tokens >= cost:
+                bucket.tokens -= cost
+                bucket.pending += cost
+                self._local_decisions.inc()
+                return True
+            pending = bucket.pending if bucket and bucket.expires_at > now else 0
+            if bucket:
+                bucket.pending = 0
+
+        # Bucket empty or new window: settle with the shared storage now
+        self._shared_decisions.inc()
+        try:
+            count = self.storage.incr(key, item.get_expiry(), amount=pending + cost)
+        except Exception:
+            self._restore(key, pending)
+            raise
+        expires_at = self.storage.get_expiry(key)
+        with self._lock:
+            self._buckets[key] = _Bucket(
+                limit=item.amount,
+                expiry=item.get_expiry(),
+                share=share,
+                expires_at=expires_at,
+                tokens=max(item.amount - count, 0) * share,
+            )
+        return count <= item.amount
+
+    def test(self, item, *identifiers: str, cost: int = 1) -> bool:
+        bucket = self._buckets.get(item.key_for(*identifiers))
+        if bucket and bucket.expires_at > time.time():
+            return bucket.tokens >= cost or super().test(item, *identifiers, cost=cost)
+        return super().test(item, *identifiers, cost=cost)
+
+    def clear(self, item, *identifiers: str) -> None:
+        with self._lock:
+            self._buckets.pop(item.key_for(*identifiers), None)
+        super().clear(item, *identifiers)
+
+    # ── reconciliation ───────────────────────────────────────────────────────
+
+    def _restore(self, key: str, pending: int) -> None:
+        if not pending:
+            return
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.pending += pending
+
+    def _ensure_syncer(self) -> None:
+        # One sync thread per worker process, started on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._buckets.clear()  # inherited across fork; not ours to push
+            threading.Thread(
+                target=self._sync_loop, name="rate-limit-sync", daemon=True
+            ).start()
+
+    def _sync_loop(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:  # keep syncing; hits fall back to the storage
+                get_logger().warning(f"Rate limit sync failed: {e}")
+
+    def sync(self) -> None:
+        """Push locally granted hits and refill buckets from the global counts."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, b in self._buckets.items() if b.expires_at <= now]:
+                del self._buckets[key]
+            batch = [(k, b, b.pending) for k, b in self._buckets.items() if b.pending]
+            for _, bucket, _ in batch:
+                bucket.pending = 0
+
+        for index, (key, bucket, pending) in enumerate(batch):
+            try:
+                count = self.storage.incr(key, bucket.expiry, amount=pending)
+            except Exception:
+                for unsent_key, _, unsent in batch[index:]:
+                    self._restore(unsent_key, unsent)
+                raise
+            with self._lock:
+                remaining = bucket.limit - count - bucket.pending
+                bucket.tokens = max(remaining, 0) * bucket.share
+
+
+STRATEGIES["hybrid"] = HybridRateLimiter
@@ -0,0 +1,236 @@
+"""
+Client address resolution and IP block/allow lists
+
+``client_ip`` is the one place the real client address is worked out.
+``X-Forwarded-For`` is only honoured when the connection comes from
+``TRUSTED_PROXIES``. The header is walked right to left, because each
+proxy appends the address it received the request from, and the first
+hop that is not a trusted proxy is the client. Entries further left are
+client-supplied and cannot be trusted.
+
+``IPFilterMiddleware`` rejects blocked addresses with a 403 before routing,
+so no database or bcrypt work runs for them. Rules come from
+``IP_BLOCKLIST`` / ``IP_ALLOWLIST`` and, optionally, ``IP_FILTER_FILE``:
+
+    # one rule per line
+    block 203.0.113.0/24
+    allow 203.0.113.8
+    trust 10.0.0.0/8        # extra trusted proxies
+
+The longest matching prefix decides, so an ``allow`` entry carves an
+exception out of a blocked range (``block 0.0.0.0/0`` + ``allow ...`` makes
+an allowlist-only deployment). Each worker checks the file's mtime at
+most every ``IP_FILTER_RELOAD_SECONDS`` and swaps in the new rules without
+a restart.
+
+Lookups use a binary radix tree, so a check costs at most one step per
+prefix bit (32 for IPv4, 128 for IPv6) no matter how many rules exist.
+"""
+import ipaddress
+import os
+import time
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import IP_FILTER_REJECTIONS
+from app.utils.logging import get_logger
+
+BLOCK = "block"
+ALLOW = "allow"
+
+
+def _parse_ip(address: str):
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped:
+        return ip.ipv4_mapped
+    return ip
+
+
+class CIDRTree:
+    """Binary radix tree mapping CIDR prefixes to values."""
+
+    __slots__ = ("_roots", "_size")
+
+    def __init__(self):
+        # node = [zero child, one child, value]
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, cidr: str, value=True) -> None:
+        network = ipaddress.ip_network(cidr.strip(), strict=False)
+        bits = network.max_prefixlen
+        address = int(network.network_address)
+        node = self._roots[network.version]
+        for i in range(network.prefixlen):
+            bit = (address >> (bits - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            self._size += 1
+        node[2] = value
+
+    def lookup(self, address: str):
+        """Value of the longest prefix containing ``address``, or None."""
+        try:
+            ip = _parse_ip(address)
+        except ValueError:
+            return None
+        bits = ip.max_prefixlen
+        value = int(ip)
+        node = self._roots[ip.version]
+        best = node[2]
+        for i in range(bits):
+            node = node[(value >> (bits - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                best = node[2]
+        return best
+
+    def __contains__(self, address: str) -> bool:
+        return self.lookup(address) is not None
+
+
+def resolve_client_ip(peer: str | None, forwarded_for: str | None, trusted: CIDRTree) -> str:
+    """First untrusted hop walking ``peer`` then X-Forwarded-For right to left."""
+    client = peer or "127.0.0.1"
+    if not forwarded_for or client not in trusted:
+        return client
+    for hop in reversed(forwarded_for.split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        client = hop
+        if hop not in trusted:
+            break
+    return client
+
+
+class IPFilter:
+    """Trusted proxies and block/allow rules, swapped atomically on reload."""
+
+    def __init__(self, path: str | None = None, reload_seconds: int = 5):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.trusted = CIDRTree()
+        self.rules = CIDRTree()
+        self._mtime = None
+        self._next_check = 0.0
+        self.load()
+
+    def load(self) -> None:
+        trusted, rules = CIDRTree(), CIDRTree()
+        entries = (
+            [("trust", c) for c in settings.trusted_proxies_list]
+            + [(BLOCK, c) for c in settings.ip_blocklist]
+            + [(ALLOW, c) for c in settings.ip_allowlist]
+        )
+        if self.path:
+            try:
+                self._mtime = os.stat(self.path).st_mtime
+                entries += self._read_file(self.path)
+            except OSError as e:
+                self._mtime = None
+                get_logger().warning(f"IP filter file unavailable: {e}")
+
+        for kind, cidr in entries:
+            try:
+                if kind == "trust":
+                    trusted.insert(cidr)
+                elif kind in (BLOCK, ALLOW):
+                    rules.insert(cidr, kind)
+                else:
+                    raise ValueError(f"unknown rule '{kind}'")
+            except ValueError as e:
+                get_logger().warning(f"Ignoring IP filter entry '{kind} {cidr}': {e}")
+
+        self.trusted, self.rules = trusted, rules
+
+    @staticmethod
+    def _read_file(path: str) -> list[tuple[str, str]]:
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    kind, _, cidr = line.partition(" ")
+                    entries.append((kind.lower(), cidr.strip()))
+        return entries
+
+    def maybe_reload(self) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_seconds
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.load()
+            get_logger().info(
+                f"IP filter reloaded: {len(self.rules)} rules, "
+                f"{len(self.trusted)} trusted proxies"
+            )
+
+    def is_blocked(self, address: str) -> bool:
+        return self.rules.lookup(address) == BLOCK
+
+    def client_ip_from_scope(self, scope) -> str:
+        client = scope.get("client")
+        forwarded = [v for k, v in scope["headers"] if k == b"x-forwarded-for"]
+        return resolve_client_ip(
+            client[0] if client else None,
+            b",".join(forwarded).decode("latin-1") if forwarded else None,
+            self.trusted,
+        )
+
+
+ip_filter = IPFilter(settings.IP_FILTER_FILE, settings.IP_FILTER_RELOAD_SECONDS)
+
+
+def client_ip(request) -> str:
+    """The real client address for a request (resolved once, then cached)."""
+    state = request.scope.setdefault("state", {})
+    if "client_ip" not in state:
+        state["client_ip"] = ip_filter.client_ip_from_scope(request.scope)
+    return state["client_ip"]
+
+
+class IPFilterMiddleware:
+    """Pure ASGI middleware rejecting blocked clients before any app work."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ip_filter.maybe_reload()
+        address = ip_filter.client_ip_from_scope(scope)
+        scope.setdefault("state", {})["client_ip"] = address
+
+        if ip_filter.is_blocked(address):
+            from app.core.responses import send_error
+
+            IP_FILTER_REJECTIONS.inc()
+            response = JSONResponse(
+                status_code=status.HTTP_403_FORBIDDEN,
+                content=send_error(
+                    message="Access denied.", status_code=status.HTTP_403_FORBIDDEN
+                ).model_dump(),
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -2,10 +2,16 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from sqlalchemy import text
 
-from app.db.session import init_db, engine
+from app.db.session import init_db, engine, replica_engines
+from app.db.warmup import warm_pool
 from app.utils.caching import cache
 from app.utils.logging import get_logger
-from app.core.tasks import setup_scheduled_tasks
+from app.core.config import settings
+from app.core.passwords import get_registry
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.tasks import flush_session_audit, setup_scheduled_tasks
+from app.services.sessions import get_session_store
+from app.services.token_usage import usage_buffer
 
 
 @asynccontextmanager
@@ -14,6 +20,11 @@ async def lifespan(app: FastAPI):
     logger = get_logger()
     logger.info(f"Startup: {app.title} v{app.version} starting...")
 
+    # Refuse to start, rather than fail every login, when the configured
+    # password hasher's package is missing (HasherNotAvailable)
+    get_registry()
+    logger.info(f"✓ Password hashing: {settings.PASSWORD_HASHER}")
+
     # Verify database connectivity before proceeding
     async with engine.connect() as conn:
         await conn.execute(text("SELECT 1"))
@@ -22,12 +33,32 @@ async def lifespan(app: FastAPI):
     # Initialize database tables
     await init_db()
 
+    # Open the pools and prepare hot queries so the first burst doesn't wait
+    if settings.DATABASE_POOL_WARMUP:
+        for pool_engine in [engine, *replica_engines]:
+            opened = await warm_pool(pool_engine)
+            url = pool_engine.url
+            logger.info(f"✓ Warmed {opened} pooled connections to {url.host or url.database}")
+
     # Initialize cache (Redis if configured)
     await cache.init_redis()
 
     # Initialize scheduled tasks
     scheduler = setup_scheduled_tasks()
 
+    # Write access_tokens.last_used_at in batches instead of per request
+    usage_buffer.start(settings.TOKEN_USAGE_FLUSH_SECONDS)
+
+    # Watch for code blocking the event loop
+    loop_monitor = None
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor = LoopLagMonitor(
+            interval_ms=settings.LOOP_LAG_INTERVAL_MS,
+            threshold_ms=settings.LOOP_LAG_THRESHOLD_MS,
+        )
+        loop_monitor.start(debug=settings.LOOP_DEBUG)
+        logger.info("✓ Event loop monitor started")
+
     logger.info("✓ Application startup complete")
 
     yield
@@ -35,10 +66,21 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutdown: App shutting down...")
 
+    if loop_monitor:
+        await loop_monitor.stop()
+
+    # Final flush of buffered token usage
+    await usage_buffer.stop()
+
     if scheduler:
         scheduler.shutdown()
         logger.info("✓ Scheduler shutdown complete")
 
     await cache.close()
 
+    if settings.AUTH_TOKEN_MODE == "opaque":
+        # Last write-behind flush, then drop the store connection
+        await flush_session_audit()
+        await get_session_store().close()
+
     logger.info("✓ Application shutdown complete")
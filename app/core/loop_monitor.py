@@ -0,0 +1,113 @@
+"""
+Event-loop lag monitor and blocking-call detector
+
+A probe task sleeps for ``LOOP_LAG_INTERVAL_MS`` and measures how late it
+wakes up; the overshoot is the loop lag every concurrent request suffered.
+Lag is exported as ``event_loop_lag_seconds``.
+
+Lag can only be measured once the loop is free again, by which time the
+blocking code is gone. A watchdog thread therefore watches the probe's
+heartbeat: when it stalls for longer than ``LOOP_LAG_THRESHOLD_MS`` the
+watchdog captures the loop thread's current stack — the code blocking it,
+e.g. bcrypt, a synchronous file write or template rendering — and logs it.
+
+``LOOP_DEBUG`` additionally turns on asyncio debug mode, which reports
+every callback slower than the threshold along with the task's creation
+site, and forwards those reports to the application log.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.core.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+from app.utils.logging import get_logger
+
+logger = get_logger()
+
+
+class _AsyncioLogHandler(logging.Handler):
+    """Forward asyncio's slow-callback warnings to the application log."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logger.log(record.levelname, record.getMessage())
+
+
+class LoopLagMonitor:
+    """Started and stopped by ``lifespan``; one instance per worker."""
+
+    def __init__(self, interval_ms: int = 100, threshold_ms: int = 100):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.last_blocked_stack: str | None = None
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._probe_task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self, debug: bool = False) -> None:
+        """Start the probe task and watchdog thread on the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+
+        if debug:
+            self._enable_debug()
+
+        self._probe_task = self._loop.create_task(self._probe())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+
+    def _enable_debug(self) -> None:
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.threshold
+        asyncio_logger = logging.getLogger("asyncio")
+        if not any(isinstance(h, _AsyncioLogHandler) for h in asyncio_logger.handlers):
+            asyncio_logger.addHandler(_AsyncioLogHandler(level=logging.WARNING))
+
+    async def _probe(self) -> None:
+        while True:
+            self._heartbeat = time.monotonic()
+            start = self._loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(self._loop.time() - start - self.interval, 0.0)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        # Poll faster than the threshold so a stall is caught while it lasts
+        poll = min(self.interval, self.threshold) / 2
+        while not self._stopped.wait(poll):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            self.last_blocked_stack = stack
+            EVENT_LOOP_BLOCKED.inc()
+            logger.warning(
+                f"Event loop blocked for {stalled * 1000:.0f}ms+ "
+                f"(threshold {self.threshold * 1000:.0f}ms). Blocking stack:\n{stack}"
+            )
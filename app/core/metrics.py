@@ -0,0 +1,278 @@
+"""
+Prometheus metrics
+
+All application metrics are defined here and exposed on ``/metrics``.
+
+Multi-process (gunicorn) mode is enabled by exporting
+``PROMETHEUS_MULTIPROC_DIR`` before the server starts (see ``start.sh`` and
+``gunicorn.conf.py``); each worker then writes to shared mmap files and
+``/metrics`` aggregates them, whichever worker serves the scrape.
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests admitted and running, by admission lane",
+    ["lane"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for admission, by lane",
+    ["lane"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests shed with 503 by admission control",
+    ["lane", "reason"],
+)
+
+# ── Database pool ─────────────────────────────────────────────────────────────
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured persistent connections (pool_size)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_idle",
+    "Open connections idle in the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the SQLAlchemy pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open above pool_size (max_overflow in use)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to acquire a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_CONNECTION_HOLD = Histogram(
+    "db_connection_hold_seconds",
+    "Time a request's session held a pooled connection",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_REPLICA_EJECTIONS = Counter(
+    "db_replica_ejections_total",
+    "Read replicas taken out of rotation after a connection failure",
+    ["replica"],
+)
+
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "Statements slower than SLOW_QUERY_THRESHOLD_MS",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements issued per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_QUERY_ANOMALIES = Counter(
+    "db_query_anomalies_total",
+    "Requests flagged for too many queries or repeated statement shapes",
+    ["route", "kind"],
+)
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by backend and result",
+    ["backend", "result"],
+)
+
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Hybrid rate limit decisions taken locally vs. against the shared storage",
+    ["path"],
+)
+
+IP_FILTER_REJECTIONS = Counter(
+    "ip_filter_rejections_total",
+    "Requests rejected by the IP blocklist",
+)
+
+# ── Password hashing ──────────────────────────────────────────────────────────
+
+PASSWORD_REHASHES = Counter(
+    "password_rehashes_total",
+    "Stored password hashes upgraded to the current algorithm and cost at login",
+    ["from_algorithm"],
+)
+
+# ── Token usage ───────────────────────────────────────────────────────────────
+
+TOKEN_USAGE_BUFFER_SIZE = Gauge(
+    "token_usage_buffer_size",
+    "Access tokens whose last_used_at is waiting for the next flush",
+    multiprocess_mode="livesum",
+)
+TOKEN_USAGE_FLUSH_DURATION = Histogram(
+    "token_usage_flush_duration_seconds",
+    "Duration of one batched access_tokens.last_used_at UPDATE",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# ── Event loop ────────────────────────────────────────────────────────────────
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a scheduled wake-up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Stalls longer than LOOP_LAG_THRESHOLD_MS caught by the watchdog",
+)
+
+# ── Scheduler ─────────────────────────────────────────────────────────────────
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "APScheduler job run duration",
+    ["job"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0),
+)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+
+@contextmanager
+def in_progress(gauge: Gauge) -> Iterator[None]:
+    """Increment a gauge for the duration of the enclosed block."""
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def instrument_job(job_id: str):
+    """Decorator recording an async scheduled job's run duration."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                SCHEDULER_JOB_DURATION.labels(job_id).observe(
+                    time.perf_counter() - start
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_pool(engine) -> None:
+    """Track size, checked-out, idle and overflow connections on an engine's pool."""
+    from sqlalchemy import event
+
+    pool = engine.sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return  # NullPool / StaticPool — nothing to report
+
+    def _update(*_):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_IDLE.set(pool.checkedin())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    DB_POOL_SIZE.set(pool.size())
+    event.listen(pool, "checkout", _update)
+    event.listen(pool, "checkin", _update)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency and in-flight requests.
+
+    Labels use the matched route template (``/api/v1/auth/login``), never
+    the raw path, so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+
+            route = scope.get("route")
+            key = (scope["method"], route.path if route else "<unmatched>", status_code)
+            child = self._children.get(key)
+            if child is None:
+                child = HTTP_REQUEST_DURATION.labels(key[0], key[1], str(key[2]))
+                self._children[key] = child
+            child.observe(duration)
+
+
+def render_metrics() -> Response:
+    """Render all metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -3,18 +3,42 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request
 from app.utils.logging import get_logger
 from app.core.config import settings
+from app.core.security import verify_debug_token
+from app.core.timing import start_request_timings
+from app.db.events import report_request_queries, start_query_stats
 
 
 class LogRequestsMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         logger = get_logger()
         request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
         logger.info(f"[{request_id}] {request.method} {request.url}")
+
+        # Per-request subsystem timings (db, cache, hash, serialize)
+        timings = start_request_timings()
+        queries = start_query_stats()
         response = await call_next(request)
 
+        logger.info(
+            f"[{request_id}] {response.status_code} {request.method} "
+            f"{request.url.path} {timings.elapsed * 1000:.1f}ms "
+            f"queries={queries.count} timings={timings.as_dict()}"
+        )
+        route = request.scope.get("route")
+        report_request_queries(
+            queries, request_id, route.path if route else "<unmatched>"
+        )
+
         # Correlation ID — lets you trace a request across logs
         response.headers["X-Request-ID"] = request_id
 
+        # Server-Timing — globally enabled or per request for admins
+        if settings.SERVER_TIMING_ENABLED or verify_debug_token(
+            request.headers.get("X-Debug-Token")
+        ):
+            response.headers["Server-Timing"] = timings.server_timing_header()
+
         # Security headers
         response.headers["X-Content-Type-Options"] = "nosniff"
         response.headers["X-Frame-Options"] = "DENY"
@@ -13,9 +13,15 @@ def custom_openapi(app):
         routes=app.routes,
     )
 
+    generated_schemes = openapi_schema["components"].get("securitySchemes", {})
     openapi_schema["components"]["securitySchemes"] = {
-        "BearerAuth": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
+        "BearerAuth": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"},
     }
+    # Admin diagnostics endpoints authenticate with a signed X-Debug-Token
+    if "DebugToken" in generated_schemes:
+        openapi_schema["components"]["securitySchemes"]["DebugToken"] = (
+            generated_schemes["DebugToken"]
+        )
 
     # Apply Bearer auth globally — all endpoints require a token by default
     openapi_schema["security"] = [{"BearerAuth": []}]
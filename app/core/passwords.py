@@ -0,0 +1,169 @@
+"""
+Password hashing: a versioned registry of hashers, and host calibration
+
+New hashes use PASSWORD_HASHER with the configured cost. Every stored hash
+names its own algorithm and cost (``$2b$12$...``,
+``$argon2id$v=19$m=65536,t=3,p=4$...``), which is its version. Any hash
+from a registered algorithm therefore still verifies after the settings
+change. A hash that does not match the current algorithm and cost is
+rehashed at the user's next successful login (``verify_and_update``), so
+raising the cost or moving to Argon2 needs no migration or reset.
+
+Argon2 needs the optional argon2-cffi package (``pip install
+"pwdlib[argon2]"``). Without it, Argon2 hashes can't be verified, and with
+PASSWORD_HASHER=argon2 the app refuses to start (the lifespan builds the
+registry, which raises HasherNotAvailable).
+
+Costs are hardware-dependent. ``python calibrate_hashing.py`` measures
+this host and prints the settings that meet PASSWORD_HASH_TARGET_MS, and
+``python -m benchmarks.password_hashing`` prints the time for each cost.
+"""
+import hashlib
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pwdlib import PasswordHash
+from pwdlib.exceptions import HasherNotAvailable
+from pwdlib.hashers import HasherProtocol
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+from app.core.config import settings
+
+BCRYPT_MAX_BYTES = 72
+
+
+def _bcrypt_input(password: str) -> bytes:
+    """bcrypt only reads 72 bytes; longer passwords are pre-hashed to 64."""
+    password_bytes = password.encode("utf-8")
+    if len(password_bytes) > BCRYPT_MAX_BYTES:
+        password_bytes = hashlib.sha256(password_bytes).hexdigest().encode("utf-8")
+    return password_bytes
+
+
+class Bcrypt(BcryptHasher):
+    """pwdlib's bcrypt with the long-password pre-hash of earlier hashes."""
+
+    def hash(self, password, *, salt: Optional[bytes] = None) -> str:
+        return super().hash(_bcrypt_input(password), salt=salt)
+
+    def verify(self, password, hash) -> bool:
+        return super().verify(_bcrypt_input(password), hash)
+
+
+def bcrypt_hasher(rounds: Optional[int] = None) -> HasherProtocol:
+    return Bcrypt(rounds=rounds or settings.BCRYPT_ROUNDS)
+
+
+def argon2_hasher(
+    time_cost: Optional[int] = None,
+    memory_cost: Optional[int] = None,
+    parallelism: Optional[int] = None,
+) -> HasherProtocol:
+    """Raises HasherNotAvailable without argon2-cffi."""
+    from pwdlib.hashers.argon2 import Argon2Hasher
+
+    return Argon2Hasher(
+        time_cost=time_cost or settings.ARGON2_TIME_COST,
+        memory_cost=memory_cost or settings.ARGON2_MEMORY_KIB,
+        parallelism=parallelism or settings.ARGON2_PARALLELISM,
+    )
+
+
+# Algorithm name -> hasher with the configured cost
+HASHERS: Dict[str, Callable[[], HasherProtocol]] = {
+    "bcrypt": bcrypt_hasher,
+    "argon2": argon2_hasher,
+}
+
+
+def build_registry() -> PasswordHash:
+    """The current hasher first, then every other available algorithm."""
+    hashers = [HASHERS[settings.PASSWORD_HASHER]()]
+    for name, factory in HASHERS.items():
+        if name == settings.PASSWORD_HASHER:
+            continue
+        try:
+            hashers.append(factory())
+        except HasherNotAvailable:
+            pass
+    return PasswordHash(hashers)
+
+
+_registry: Optional[PasswordHash] = None
+
+
+def get_registry() -> PasswordHash:
+    """The process-wide registry, built from settings on first use."""
+    global _registry
+    if _registry is None:
+        _registry = build_registry()
+    return _registry
+
+
+def algorithm(hashed: str) -> str:
+    """Registry name of the algorithm that produced ``hashed``."""
+    if Bcrypt.identify(hashed):
+        return "bcrypt"
+    # By prefix: pwdlib's Argon2 module can't be imported without argon2-cffi
+    if hashed.startswith("$argon2"):
+        return "argon2"
+    return "unknown"
+
+
+# ── Calibration ───────────────────────────────────────────────────────────────
+
+_SAMPLE = "correct horse battery staple"
+
+
+def hash_seconds(hasher: HasherProtocol, samples: int = 3) -> float:
+    """Median wall time of one hash on this host."""
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash(_SAMPLE)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def calibrate_bcrypt(
+    target_ms: float, min_rounds: int = 10, max_rounds: int = 16
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Highest bcrypt rounds whose hash stays within ``target_ms``
+
+    Each round doubles the cost, so measuring stops at the first round
+    over the target. Returns (rounds, [(rounds, ms), ...]); never below
+    ``min_rounds``.
+    """
+    measured = []
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        ms = hash_seconds(bcrypt_hasher(rounds)) * 1000
+        measured.append((rounds, ms))
+        if ms > target_ms:
+            break
+        chosen = rounds
+    return chosen, measured
+
+
+def calibrate_argon2(
+    target_ms: float, memory_kib: int, parallelism: int, max_time_cost: int = 10
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Highest Argon2id time cost within ``target_ms`` at a fixed memory cost
+
+    Memory is the main defence against GPU cracking, so it stays fixed
+    (ARGON2_MEMORY_KIB) and the number of passes is tuned. Returns
+    (time_cost, [(time_cost, ms), ...]); never below 1. Raises
+    HasherNotAvailable without argon2-cffi.
+    """
+    measured = []
+    chosen = 1
+    for time_cost in range(1, max_time_cost + 1):
+        hasher = argon2_hasher(time_cost, memory_kib, parallelism)
+        ms = hash_seconds(hasher) * 1000
+        measured.append((time_cost, ms))
+        if ms > target_ms:
+            break
+        chosen = time_cost
+    return chosen, measured
@@ -0,0 +1,93 @@
+"""
+On-demand request profiler
+
+Profiles a single real request when it carries a signed debug token in the
+``X-Profile-Token`` header (generate one with ``python generate_secret.py
+--debug-token``). The profile is written to ``PROFILE_DIR`` named after the
+request ID assigned by ``LogRequestsMiddleware`` and the path is returned
+in ``X-Profile-File``.
+
+pyinstrument (sampling, async-aware, HTML flame graph) is used when it is
+installed; otherwise the request runs under cProfile and a ``.prof`` pstats
+file is written (open with ``snakeviz`` or ``python -m pstats``).
+
+cProfile records everything the worker thread runs while the request is in
+flight, including other concurrent requests; profile on a quiet worker for
+a clean picture. Only one request per worker is profiled at a time.
+"""
+import cProfile
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.security import verify_debug_token
+from app.utils.logging import get_logger
+
+try:
+    from pyinstrument import Profiler as _SamplingProfiler
+except ImportError:  # pragma: no cover - optional
+    _SamplingProfiler = None
+
+_HEADER = b"x-profile-token"
+
+
+def _profile_token(scope) -> str | None:
+    """Return the token from the X-Profile-Token header, if any."""
+    for name, value in scope["headers"]:
+        if name == _HEADER:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware; unflagged requests pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _profile_token(scope)
+        if token is None or self._active or not verify_debug_token(token):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = scope.get("state", {}).get("request_id") or str(uuid.uuid4())
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+
+        sampling = _SamplingProfiler is not None
+        if sampling:
+            profiler = _SamplingProfiler(async_mode="enabled")
+            path = os.path.join(settings.PROFILE_DIR, f"{request_id}.html")
+        else:
+            profiler = cProfile.Profile()
+            path = os.path.join(settings.PROFILE_DIR, f"{request_id}.prof")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-file", path.encode("latin-1"))
+                ]
+            await send(message)
+
+        self._active = True
+        if sampling:
+            profiler.start()
+        else:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if sampling:
+                profiler.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.disable()
+                profiler.dump_stats(path)
+            self._active = False
+            get_logger().info(f"[{request_id}] Profile written to {path}")
@@ -0,0 +1,195 @@
+"""
+Shared-memory rate limit storage
+
+slowapi counts in process memory by default, so with N gunicorn workers
+every limit is effectively N times higher. When no Redis is configured the
+limiter uses this backend instead: a small SQLite database on tmpfs
+(``/dev/shm`` where available) that every worker on the host opens.
+Writes run inside ``BEGIN IMMEDIATE`` so increments and moving-window
+acquisitions are atomic across processes.
+
+The limiter calls the storage synchronously on the event loop, so a write
+waits at most ``RATE_LIMIT_BUSY_TIMEOUT_MS`` for another worker's lock.
+Past that, ``database is locked`` is raised and the limiter applies
+``RATE_LIMIT_FALLBACK`` until the storage answers again.
+
+URI form: ``sharedmem://`` (default location) or ``sharedmem:///path/to/file``.
+The default file is named after the project directory, APP_NAME and
+ENVIRONMENT, so other apps, checkouts and test runs on the host keep their
+own counters. It only coordinates workers on one host; use Redis for
+several hosts.
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+from limits.storage import MovingWindowSupport, Storage
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expiry REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    key TEXT NOT NULL,
+    atime REAL NOT NULL,
+    expiry REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_key_atime ON events (key, atime);
+"""
+
+# Expired rows for other keys are swept every this many writes
+_PURGE_EVERY = 1000
+
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def default_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    namespace = f"{_PROJECT_DIR}|{settings.APP_NAME}|{settings.ENVIRONMENT}"
+    digest = hashlib.sha256(namespace.encode()).hexdigest()[:12]
+    return os.path.join(directory, f"fastapi-ratelimit-{digest}.sqlite")
+
+
+class SharedMemoryStorage(Storage, MovingWindowSupport):
+    """Fixed- and moving-window storage shared by every process on the host."""
+
+    STORAGE_SCHEME = ["sharedmem"]
+
+    def __init__(self, uri: str | None = None, wrap_exceptions: bool = False, **options):
+        self.path = (urlparse(uri).path if uri else "") or default_path()
+        self.busy_timeout = settings.RATE_LIMIT_BUSY_TIMEOUT_MS / 1000
+        self._local = threading.local()
+        self._pid = None
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    # ── connection handling ──────────────────────────────────────────────────
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Connections must not cross a fork (gunicorn --preload) or a thread
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # tmpfs; nothing to make durable
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        """Run ``fn(conn, now)`` in a write transaction held across processes."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            result = fn(conn, now)
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                conn.execute("DELETE FROM counters WHERE expiry <= ?", (now,))
+                conn.execute("DELETE FROM events WHERE expiry <= ?", (now,))
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ── fixed window ─────────────────────────────────────────────────────────
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        def _incr(conn, now):
+            conn.execute(
+                "DELETE FROM counters WHERE key = ? AND expiry <= ?", (key, now)
+            )
+            return conn.execute(
+                "INSERT INTO counters (key, value, expiry) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value "
+                "RETURNING value",
+                (key, amount, now + expiry),
+            ).fetchone()[0]
+
+        return self._write(_incr)
+
+    def get(self, key: str) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM counters WHERE key = ? AND expiry > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._conn.execute(
+            "SELECT expiry FROM counters WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    # ── moving window ────────────────────────────────────────────────────────
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+
+        def _acquire(conn, now):
+            conn.execute(
+                "DELETE FROM events WHERE key = ? AND atime < ?", (key, now - expiry)
+            )
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM events WHERE key = ?", (key,)
+            ).fetchone()
+            if count + amount > limit:
+                return False
+            conn.executemany(
+                "INSERT INTO events (key, atime, expiry) VALUES (?, ?, ?)",
+                [(key, now, now + expiry)] * amount,
+            )
+            return True
+
+        return self._write(_acquire)
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        now = time.time()
+        oldest, count = self._conn.execute(
+            "SELECT MIN(atime), COUNT(*) FROM events WHERE key = ? AND atime >= ?",
+            (key, now - expiry),
+        ).fetchone()
+        return (oldest, count) if count else (now, 0)
+
+    # ── maintenance ──────────────────────────────────────────────────────────
+
+    def check(self) -> bool:
+        try:
+            return self._conn.execute("SELECT 1").fetchone() == (1,)
+        except sqlite3.Error:
+            return False
+
+    def clear(self, key: str) -> None:
+        def _clear(conn, _now):
+            conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+            conn.execute("DELETE FROM events WHERE key = ?", (key,))
+
+        self._write(_clear)
+
+    def reset(self) -> int | None:
+        def _reset(conn, _now):
+            removed = conn.execute("DELETE FROM counters").rowcount
+            return removed + conn.execute("DELETE FROM events").rowcount
+
+        return self._write(_reset)
@@ -1,17 +1,86 @@
+import hashlib
+
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from slowapi import Limiter
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
+from app.core.ip_filter import client_ip
+from app.core.security import bearer_subject
+from app.core import rate_limit_storage  # noqa: F401 — registers sharedmem://
+from app.core.hybrid_limiter import local_share  # noqa: F401 — registers "hybrid"
+
+
+def _storage_uri() -> str:
+    """Explicit URI, else Redis when configured, else host shared memory."""
+    return settings.RATE_LIMIT_STORAGE_URI or settings.REDIS_URL or "sharedmem://"
+
+
+def _storage_options(uri: str) -> dict:
+    if uri.startswith(("redis", "rediss")):
+        # Fail fast so the fallback kicks in instead of stalling requests
+        return {"socket_connect_timeout": 0.5, "socket_timeout": 0.5}
+    return {}
+
+
+# ── Key functions ─────────────────────────────────────────────────────────────
+
+def user_or_ip_key(request: Request) -> str:
+    """The authenticated user for a valid bearer token, else the client IP."""
+    subject = bearer_subject(request.headers.get("authorization"))
+    if subject:
+        # Hashed so emails never end up in the limiter storage
+        return "user:" + hashlib.sha256(subject.encode()).hexdigest()[:16]
+    return "ip:" + client_ip(request)
+
 
+_uri = _storage_uri()
+
+# Counters live in shared storage so the limits hold across all workers.
+# When the storage is unreachable, RATE_LIMIT_FALLBACK decides: "memory"
+# keeps limiting per worker until it recovers, "open" lets requests through.
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=client_ip,
     enabled=settings.RATE_LIMIT_ENABLED,
+    storage_uri=_uri,
+    storage_options=_storage_options(_uri),
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    in_memory_fallback_enabled=settings.RATE_LIMIT_FALLBACK == "memory",
+    swallow_errors=settings.RATE_LIMIT_FALLBACK == "open",
 )
 
 
+# ── Cost-weighted budget ──────────────────────────────────────────────────────
+
+# What each auth route charges against the caller's shared budget. bcrypt
+# checks and outgoing email dominate; everything else costs 1. Override
+# with RATE_LIMIT_COSTS.
+ROUTE_COSTS = {
+    "register": 10,
+    "login": 10,
+    "reset_password": 10,
+    "forgot_password": 5,
+    "resend_verification_code": 5,
+    "verify_account": 2,
+    "refresh_access_token": 2,
+}
+
+
+def route_cost(name: str) -> int:
+    return settings.RATE_LIMIT_COSTS.get(name, ROUTE_COSTS.get(name, 1))
+
+
+def weighted_limit(name: str):
+    """Charge route ``name``'s cost against the per-caller RATE_LIMIT_AUTH_BUDGET."""
+    return limiter.shared_limit(
+        settings.RATE_LIMIT_AUTH_BUDGET,
+        scope="auth",
+        key_func=user_or_ip_key,
+        cost=route_cost(name),
+    )
+
+
 async def _rate_limit_handler(request: Request, exc: RateLimitExceeded):
     from app.core.responses import send_error
     return JSONResponse(
@@ -4,6 +4,8 @@ from fastapi import status
 from pydantic import BaseModel
 from fastapi.responses import JSONResponse
 
+from app.core.timing import track
+
 T = TypeVar("T")
 
 
@@ -32,6 +34,14 @@ def send_error(
     )
 
 
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that reports its render time as the "serialize" timing."""
+
+    def render(self, content: Any) -> bytes:
+        with track("serialize"):
+            return super().render(content)
+
+
 # Optional: A helper to create JSONResponse
 def create_json_response(content: dict, status_code: int) -> JSONResponse:
     return JSONResponse(content=content, status_code=status_code)
@@ -1,22 +1,29 @@
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 import jwt
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 
 import bcrypt
 from pydantic import BaseModel
-import hashlib
+import uuid
 from random import randint
 
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from pwdlib.exceptions import UnknownHashError
 
 from app.core.config import settings
 from app.core.dependencies import get_db
+from app.core.passwords import get_registry
+from app.core.timing import track
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
+debug_token_scheme = APIKeyHeader(
+    name="X-Debug-Token", scheme_name="DebugToken", auto_error=False
+)
 
 
 class Token(BaseModel):
@@ -28,24 +35,44 @@ class TokenData(BaseModel):
     username: str | None = None
 
 
-def get_password_hash(password: str) -> str:
-    password_bytes = password.encode("utf-8")
-    # Optional: protect bcrypt 72-byte limit
-    if len(password_bytes) > 72:
-        password = hashlib.sha256(password_bytes).hexdigest()
-        password_bytes = password.encode("utf-8")
+@contextmanager
+def _hashing():
+    """
+    Account a hash call in the request timings
+
+    Hashing runs synchronously on the event loop, so a gauge around it could
+    never be scraped above 0. The backlog is the admission "hash" lane's:
+    admission_queue_depth and admission_in_flight with lane="hash".
+    """
+    with track("hash"):
+        yield
+
 
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
-    return hashed.decode("utf-8")  # ✅ store as string
+def get_password_hash(password: str) -> str:
+    """Hash with the current PASSWORD_HASHER and cost (see app.core.passwords)."""
+    with _hashing():
+        return get_registry().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    plain_bytes = plain_password.encode("utf-8")
-    if len(plain_bytes) > 72:
-        plain_password = hashlib.sha256(plain_bytes).hexdigest()
-        plain_bytes = plain_password.encode("utf-8")
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
 
-    return bcrypt.checkpw(plain_bytes, hashed_password.encode("utf-8"))
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify against any registered algorithm and cost
+
+    Returns (valid, new_hash); new_hash is set when the password is valid
+    but was hashed with another algorithm or cost and should be replaced.
+    Hashes no registered algorithm recognises never match.
+    """
+    try:
+        with _hashing():
+            return get_registry().verify_and_update(plain_password, hashed_password)
+    except UnknownHashError:
+        return False, None
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -60,6 +87,28 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def bearer_subject(authorization: str | None) -> str | None:
+    """
+    ``sub`` of a correctly signed, unexpired bearer token — no DB lookup.
+
+    Cheap enough for middleware and rate-limit keys; revocation is only
+    checked by ``get_current_user``. Opaque tokens (no dots) give the email
+    of their session if this worker has seen it, as a JWT's ``sub`` does.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    if "." not in token:
+        from app.services.sessions import token_subject
+
+        return token_subject(token)
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except InvalidTokenError:
+        return None
+    return payload.get("sub")
+
+
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Annotated["AsyncSession", Depends(get_db)],
@@ -67,16 +116,30 @@ async def get_current_user(
     """
     Get current user from JWT token with database validation
 
-    Validates JWT signature and checks database for token revocation
+    Validates JWT signature and checks database for token revocation.
+    Opaque tokens (AUTH_TOKEN_MODE=opaque) are resolved from the session
+    store alone, without touching the database.
+
+    The token's ``last_used_at`` is recorded in the coalescing usage buffer
+    rather than written here.
     """
     from app.services.token import TokenService
+    from app.services.token_usage import usage_buffer
     from app.services.user import UserService
 
     token_service = TokenService()
 
     try:
+        # Dispatch on the token's shape, so tokens issued before a switch of
+        # AUTH_TOKEN_MODE keep working until they expire
+        if token_service.is_opaque(token):
+            fields, user = await token_service.validate_session(token)
+            usage_buffer.record(uuid.UUID(fields["token_id"]))
+            return user
+
         # Validate token signature and check database
         payload, token_record = await token_service.validate_token(token, db)
+        usage_buffer.record(token_record.id)
 
         # Get user by email from payload
         user_service = UserService(db)
@@ -144,6 +207,36 @@ def verify_reset_token(token: str, max_age_hours: int = 1) -> str:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
 
+# Debug access (Server-Timing, profiling) — signed, timed, no DB lookup
+
+
+def create_debug_token() -> str:
+    s = URLSafeTimedSerializer(settings.SECRET_KEY)
+    return s.dumps("debug", salt="debug-access")
+
+
+def verify_debug_token(token: str | None, max_age_hours: int = 24) -> bool:
+    if not token:
+        return False
+    s = URLSafeTimedSerializer(settings.SECRET_KEY)
+    try:
+        s.loads(token, salt="debug-access", max_age=max_age_hours * 3600)
+        return True
+    except (SignatureExpired, BadSignature):
+        return False
+
+
+async def require_debug_token(
+    token: Annotated[str | None, Depends(debug_token_scheme)],
+) -> None:
+    """Dependency guarding admin diagnostics endpoints."""
+    if not verify_debug_token(token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="A valid X-Debug-Token is required",
+        )
+
+
 # account verification code
 
 
@@ -152,10 +245,14 @@ def generate_verification_code() -> str:
 
 
 def hash_verification_code(code: str) -> str:
-    return bcrypt.hashpw(code.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    with _hashing():
+        return bcrypt.hashpw(code.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 
 def verify_verification_code(stored_hash: str, provided_code: str) -> bool:
     if not stored_hash or not provided_code:
         return False
-    return bcrypt.checkpw(provided_code.encode("utf-8"), stored_hash.encode("utf-8"))
+    with _hashing():
+        return bcrypt.checkpw(
+            provided_code.encode("utf-8"), stored_hash.encode("utf-8")
+        )
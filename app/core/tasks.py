@@ -3,14 +3,19 @@ Scheduled background tasks
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
+from app.core.config import settings
+from app.core.metrics import instrument_job
 from app.db.session import SessionLocal
 from app.services.token import TokenService
 from app.utils.logging import get_logger
+from app.utils.memory import memory_profiler
 
 logger = get_logger()
 
 
+@instrument_job("cleanup_expired_tokens")
 async def cleanup_expired_tokens():
     """
     Cleanup expired access and refresh tokens from database
@@ -34,6 +39,40 @@ async def cleanup_expired_tokens():
         traceback.print_exc()
 
 
+@instrument_job("flush_session_audit")
+async def flush_session_audit():
+    """
+    Apply queued opaque-session revocations to access_tokens
+
+    Runs every SESSION_AUDIT_FLUSH_SECONDS in AUTH_TOKEN_MODE=opaque
+    """
+    try:
+        async with SessionLocal() as db:
+            count = await TokenService().apply_session_audit(db)
+        if count:
+            logger.info(f"✓ Recorded {count} session revocation(s)")
+    except Exception as e:
+        logger.error(f"✗ Session audit flush failed: {e}")
+
+
+@instrument_job("check_memory_usage")
+async def check_memory_usage():
+    """
+    Dump memory diagnostics when this worker's RSS crosses the threshold
+
+    Runs every MEMORY_CHECK_INTERVAL_SECONDS when MEMORY_RSS_THRESHOLD_MB
+    is set
+    """
+    paths = memory_profiler.dump_if_over(
+        settings.MEMORY_RSS_THRESHOLD_MB, settings.MEMORY_SNAPSHOT_DIR
+    )
+    if paths:
+        logger.warning(
+            f"RSS above {settings.MEMORY_RSS_THRESHOLD_MB}MB — "
+            f"memory dump written: {', '.join(paths)}"
+        )
+
+
 def setup_scheduled_tasks() -> AsyncIOScheduler:
     """
     Setup and start scheduled background tasks
@@ -52,10 +91,40 @@ def setup_scheduled_tasks() -> AsyncIOScheduler:
         replace_existing=True,
     )
 
+    # Task 2: Memory watchdog (only when a threshold is configured)
+    if settings.MEMORY_RSS_THRESHOLD_MB > 0:
+        scheduler.add_job(
+            check_memory_usage,
+            trigger=IntervalTrigger(seconds=settings.MEMORY_CHECK_INTERVAL_SECONDS),
+            id="check_memory_usage",
+            name="Check Memory Usage",
+            replace_existing=True,
+        )
+
+    # Task 3: Write-behind of opaque-session revocations
+    if settings.AUTH_TOKEN_MODE == "opaque":
+        scheduler.add_job(
+            flush_session_audit,
+            trigger=IntervalTrigger(seconds=settings.SESSION_AUDIT_FLUSH_SECONDS),
+            id="flush_session_audit",
+            name="Flush Session Audit",
+            replace_existing=True,
+        )
+
     # Start the scheduler
     scheduler.start()
 
     logger.info("✓ Scheduled tasks initialized")
     logger.info("  - cleanup_expired_tokens: Daily at 2:00 AM")
+    if settings.AUTH_TOKEN_MODE == "opaque":
+        logger.info(
+            f"  - flush_session_audit: Every {settings.SESSION_AUDIT_FLUSH_SECONDS}s"
+        )
+    if settings.MEMORY_RSS_THRESHOLD_MB > 0:
+        logger.info(
+            f"  - check_memory_usage: Every "
+            f"{settings.MEMORY_CHECK_INTERVAL_SECONDS}s "
+            f"(threshold {settings.MEMORY_RSS_THRESHOLD_MB}MB)"
+        )
 
     return scheduler
@@ -0,0 +1,94 @@
+"""
+Per-request timing breakdown
+
+Accumulates the time spent in each subsystem (database, cache, password
+hashing, response serialization) for the current request. The totals are
+rendered as a ``Server-Timing`` header and written to the access log by
+``LogRequestsMiddleware``.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class RequestTimings:
+    """Mutable per-request accumulator of subsystem durations (seconds)."""
+
+    __slots__ = ("started_at", "totals", "counts")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return totals in milliseconds, rounded for logging."""
+        return {name: round(total * 1000, 2) for name, total in self.totals.items()}
+
+    def server_timing_header(self) -> str:
+        """
+        Render the totals as a Server-Timing header value.
+
+        Example: ``db;dur=12.40;desc="3 calls", hash;dur=240.11, total;dur=260.02``
+        """
+        parts = []
+        for name, total in self.totals.items():
+            parts.append(
+                f'{name};dur={total * 1000:.2f};desc="{self.counts[name]} calls"'
+            )
+        parts.append(f"total;dur={self.elapsed * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> RequestTimings:
+    """Bind a fresh accumulator to the current context (one per request)."""
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def get_request_timings() -> Optional[RequestTimings]:
+    """Return the accumulator for the current request, if any."""
+    return _current_timings.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a measured duration to the current request (no-op outside one)."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def track(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block and add it to the current request's totals.
+
+    Usage:
+        with track("cache"):
+            value = await redis.get(key)
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
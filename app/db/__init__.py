@@ -8,4 +8,5 @@ from .models.tokens import (
     PasswordResetToken,
     AccessToken,
     RefreshToken,
+    UserAgent,
 )
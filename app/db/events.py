@@ -0,0 +1,256 @@
+"""
+SQLAlchemy engine event hooks
+
+Listeners are attached to the ``Engine`` class so every engine (the app
+engine, test engines, migration engines) reports into the same places:
+
+- statement time into the per-request timing breakdown
+- statements slower than ``SLOW_QUERY_THRESHOLD_MS`` into the log, with
+  parameters redacted
+- a per-request query count and statement-shape histogram, checked at the
+  end of the request for excessive queries and N+1 patterns
+
+Session listeners additionally:
+
+- cap each PostgreSQL transaction's ``statement_timeout`` at the time left
+  before the request deadline
+- track whether a session wrote anything (so ``get_db`` can skip a
+  pointless COMMIT) and how long it held a pooled connection
+- hold ``after_commit`` callbacks until the transaction commits, and drop
+  them if it rolls back
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.deadline import remaining
+from app.core.metrics import (
+    DB_CONNECTION_HOLD,
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_ANOMALIES,
+    DB_SLOW_QUERIES,
+)
+from app.core.timing import record
+from app.utils.logging import get_logger
+
+logger = get_logger()
+
+
+class QueryStats:
+    """Statements issued during one request, keyed by statement text."""
+
+    __slots__ = ("count", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.shapes: Counter = Counter()
+
+    def add(self, statement: str) -> None:
+        self.count += 1
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """Statement shapes executed at least ``threshold`` times."""
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def start_query_stats() -> QueryStats:
+    """Bind a fresh query counter to the current context (one per request)."""
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+def report_request_queries(stats: QueryStats, request_id: str, route: str) -> None:
+    """Flag requests that issue too many queries or repeat a statement shape."""
+    DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+
+    if stats.count > settings.QUERY_COUNT_WARN_THRESHOLD:
+        DB_QUERY_ANOMALIES.labels(route, "too_many_queries").inc()
+        logger.warning(
+            f"[{request_id}] {route} issued {stats.count} queries "
+            f"(threshold {settings.QUERY_COUNT_WARN_THRESHOLD})"
+        )
+
+    for statement, times in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+        DB_QUERY_ANOMALIES.labels(route, "n_plus_one").inc()
+        logger.warning(
+            f"[{request_id}] {route} possible N+1: same statement ran {times}x: "
+            f"{_one_line(statement)}"
+        )
+
+
+def _one_line(statement: str, limit: int = 500) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "…"
+
+
+def _redact(parameters, executemany: bool) -> str:
+    """Describe bound parameters without revealing their values."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets redacted>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}=?" for k in parameters) + "}"
+    if parameters:
+        return f"<{len(parameters)} parameters redacted>"
+    return "<none>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.add(statement)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    record("db", duration)
+
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        DB_SLOW_QUERIES.inc()
+        logger.warning(
+            f"Slow query ({duration * 1000:.1f}ms): {_one_line(statement)} "
+            f"params={_redact(parameters, executemany)}"
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        start = conn.info["query_start_time"].pop()
+        record("db", time.perf_counter() - start)
+
+
+def _apply_statement_timeout(session, transaction, connection):
+    # SET LOCAL lasts until the transaction ends, so pooled connections
+    # never carry one request's timeout into the next
+    left = remaining()
+    if left is not None and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {max(int(left * 1000), 1)}"
+        )
+
+
+def _connection_acquired(session, transaction, connection):
+    session.info.setdefault("connection_acquired_at", time.perf_counter())
+
+
+def _flushed(session, flush_context):
+    session.info["has_writes"] = True
+
+
+def _statement_executed(orm_execute_state):
+    # Bulk UPDATE/DELETE and raw SQL bypass the unit of work; count them too
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+def _transaction_ended(session, transaction):
+    if transaction.parent is not None:
+        return
+    # Ending the outermost transaction returns the connection to the pool
+    if session.info.pop("has_writes", None):
+        session.info["committed_writes"] = True  # later reads stay on the primary
+    acquired = session.info.pop("connection_acquired_at", None)
+    if acquired is not None:
+        session.info["connection_hold"] = (
+            session.info.get("connection_hold", 0.0) + time.perf_counter() - acquired
+        )
+
+
+def _committed(session):
+    queued = session.info.pop("after_commit", None)
+    if queued:
+        session.info.setdefault("committed_callbacks", []).extend(queued)
+
+
+def _rolled_back(session):
+    session.info.pop("after_commit", None)
+
+
+def after_commit(session, callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run ``callback`` once ``session``'s transaction has committed
+
+    For side effects that must not be seen before the data is, such as
+    dropping a cache entry that a concurrent read could otherwise refill
+    with uncommitted or replica-lagged rows. A rollback discards it. The
+    code that commits awaits the callbacks with ``run_after_commit``.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session) -> None:
+    """Await the callbacks of transactions ``session`` has committed."""
+    for callback in session.info.pop("committed_callbacks", []):
+        try:
+            await callback()
+        except Exception as e:  # the data is committed; don't fail the request
+            logger.error(f"After-commit callback failed: {e}")
+
+
+def session_has_writes(session) -> bool:
+    """Whether committing ``session`` would change anything."""
+    return bool(
+        session.info.get("has_writes")
+        or session.new
+        or session.dirty
+        or session.deleted
+    )
+
+
+def report_connection_hold(session) -> float:
+    """Record how long ``session`` held pooled connections, in seconds."""
+    held = session.info.pop("connection_hold", 0.0)
+    if held:
+        DB_CONNECTION_HOLD.observe(held)
+        record("db_conn", held)
+    return held
+
+
+def register_engine_events() -> None:
+    """Attach the timing listeners once (safe to call repeatedly)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        event.listen(Session, "after_begin", _apply_statement_timeout)
+        event.listen(Session, "after_begin", _connection_acquired)
+        event.listen(Session, "after_flush", _flushed)
+        event.listen(Session, "do_orm_execute", _statement_executed)
+        event.listen(Session, "after_transaction_end", _transaction_ended)
+        event.listen(Session, "after_commit", _committed)
+        event.listen(Session, "after_rollback", _rolled_back)
+
+
+@contextmanager
+def capture_queries() -> Iterator[List[str]]:
+    """
+    Collect every statement executed on any engine inside the block.
+
+    Used by the ``assert_max_queries`` test fixture and the benchmarks.
+    """
+    statements: List[str] = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", _capture)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", _capture)
@@ -10,4 +10,4 @@ class CacheEntry(Base):
     key = Column(String, unique=True, index=True, nullable=False)
     value = Column(String, nullable=False)  # Store as JSON string if complex
     # expires_at = Column(DateTime, nullable=True)
-    expires_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import ForeignKey, Index, LargeBinary, String
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import uuid
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy import func
 
 from app.db.base import Base
+from app.db.ids import uuid7
 from app.db.models.user import User
 
 
@@ -13,7 +14,7 @@ class EmailVerificationToken(Base):
     __tablename__ = "email_verification_tokens"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     token: Mapped[str] = mapped_column(
         String(512), unique=True, nullable=False, index=True
@@ -35,7 +36,7 @@ class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     token: Mapped[str] = mapped_column(
         String(512), unique=True, nullable=False, index=True
@@ -60,29 +61,52 @@ class PasswordResetToken(Base):
     user: Mapped["User"] = relationship("User", back_populates="reset_tokens")
 
 
+class UserAgent(Base):
+    """
+    Interned User-Agent strings
+
+    Token rows reference a user agent by integer id instead of each
+    carrying its own copy of the (up to 512-character) header.
+    """
+
+    __tablename__ = "user_agents"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    value: Mapped[str] = mapped_column(String(512), unique=True, nullable=False)
+
+
 class AccessToken(Base):
     __tablename__ = "access_tokens"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     user_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("users.id"), nullable=False, index=True
     )
-    token_hash: Mapped[str] = mapped_column(
-        String(512), unique=True, nullable=False, index=True
+    # Raw 32-byte SHA-256 digest of the JWT
+    token_hash: Mapped[bytes] = mapped_column(
+        LargeBinary(32), unique=True, nullable=False, index=True
     )
+    # Indexed for cleanup_expired_tokens
     expires_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), nullable=False
+        TIMESTAMP(timezone=True), nullable=False, index=True
     )
     revoked: Mapped[bool] = mapped_column(default=False, nullable=False)
     revoked_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), nullable=True
     )
+    # Coalesced: written by the usage flusher at most once per
+    # TOKEN_LAST_USED_RESOLUTION_MINUTES, not on every request
+    last_used_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
 
     # Device/IP metadata
     ip_address: Mapped[str] = mapped_column(String(45), nullable=True)
-    user_agent: Mapped[str] = mapped_column(String(512), nullable=True)
+    user_agent_id: Mapped[int] = mapped_column(
+        ForeignKey("user_agents.id"), nullable=True
+    )
     device_name: Mapped[str] = mapped_column(String(255), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
@@ -91,22 +115,25 @@ class AccessToken(Base):
 
     # Relationship
     user: Mapped["User"] = relationship("User", back_populates="access_tokens")
+    user_agent: Mapped[UserAgent] = relationship(UserAgent)
 
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     user_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("users.id"), nullable=False, index=True
     )
-    token_hash: Mapped[str] = mapped_column(
-        String(512), unique=True, nullable=False, index=True
+    # Raw 32-byte SHA-256 digest of the JWT
+    token_hash: Mapped[bytes] = mapped_column(
+        LargeBinary(32), unique=True, nullable=False, index=True
     )
+    # Indexed for cleanup_expired_tokens
     expires_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), nullable=False
+        TIMESTAMP(timezone=True), nullable=False, index=True
     )
     revoked: Mapped[bool] = mapped_column(default=False, nullable=False)
     revoked_at: Mapped[datetime] = mapped_column(
@@ -120,7 +147,9 @@ class RefreshToken(Base):
 
     # Metadata
     ip_address: Mapped[str] = mapped_column(String(45), nullable=True)
-    user_agent: Mapped[str] = mapped_column(String(512), nullable=True)
+    user_agent_id: Mapped[int] = mapped_column(
+        ForeignKey("user_agents.id"), nullable=True
+    )
 
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc)
@@ -128,6 +157,26 @@ class RefreshToken(Base):
 
     # Relationship
     user: Mapped["User"] = relationship("User", back_populates="refresh_tokens")
+    user_agent: Mapped[UserAgent] = relationship(UserAgent)
+
+
+# Composite and partial indexes for the hot token queries (migration a3f1c8e2d946)
+Index(
+    "ix_password_reset_tokens_user_id_created_at",
+    PasswordResetToken.user_id,
+    PasswordResetToken.created_at.desc(),
+)
+# A user's unrevoked tokens, newest first: serves revoke_all_user_tokens and
+# the keyset-paginated session listing (migration e91b4f6a2c3d replaced the
+# user_id-only ix_access_tokens_user_id_unrevoked)
+Index(
+    "ix_access_tokens_user_id_created_at",
+    AccessToken.user_id,
+    AccessToken.created_at.desc(),
+    AccessToken.id.desc(),
+    postgresql_where=AccessToken.revoked.is_(False),
+    sqlite_where=AccessToken.revoked.is_(False),
+)
 
 
 # Backrefs in User (add to user.py after class)
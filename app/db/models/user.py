@@ -5,13 +5,17 @@ import uuid
 from datetime import datetime
 
 from app.db.base import Base
+from app.db.ids import uuid7
 
 
 class User(Base):
     __tablename__ = "users"
+    # Fetch created_at/updated_at with INSERT/UPDATE ... RETURNING instead of
+    # a follow-up SELECT (refresh) after each write
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     username: Mapped[str] = mapped_column(
         String, unique=True, index=True, nullable=False
@@ -0,0 +1,51 @@
+"""
+Hot-path statements as cached lambda statements
+
+A plain ``select(User).where(User.email == email)`` builds a new construct
+tree on every call. SQLAlchemy then walks that tree to compute a cache key
+before it can reuse the compiled SQL. ``lambda_stmt`` builds the statement
+once per call site: later calls only extract the new bound values from the
+lambda's closure. That skips both the construction and the cache-key walk.
+
+Closure variables must be plain values compared against columns (they
+become bound parameters). Never branch on them inside the lambda.
+``python -m benchmarks.query_overhead`` compares both forms.
+"""
+import uuid
+
+from sqlalchemy import lambda_stmt, select
+
+from app.db.models.tokens import AccessToken, RefreshToken, UserAgent
+from app.db.models.user import User
+
+
+def user_by_id(user_id: uuid.UUID):
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def user_by_email(email: str):
+    return lambda_stmt(lambda: select(User).where(User.email == email))
+
+
+def user_by_username(username: str):
+    return lambda_stmt(lambda: select(User).where(User.username == username))
+
+
+def access_token_by_id(token_id: uuid.UUID, token_hash: bytes):
+    return lambda_stmt(
+        lambda: select(AccessToken).where(
+            AccessToken.id == token_id, AccessToken.token_hash == token_hash
+        )
+    )
+
+
+def refresh_token_by_id(token_id: uuid.UUID, token_hash: bytes):
+    return lambda_stmt(
+        lambda: select(RefreshToken).where(
+            RefreshToken.id == token_id, RefreshToken.token_hash == token_hash
+        )
+    )
+
+
+def user_agent_id(value: str):
+    return lambda_stmt(lambda: select(UserAgent.id).where(UserAgent.value == value))
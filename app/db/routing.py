@@ -0,0 +1,146 @@
+"""
+Read-replica routing
+
+``RoutingSession`` sends SELECTs that opted in with ``prefer_replica`` to
+one of the ``DATABASE_REPLICA_URLS`` engines. Everything else goes to the
+primary:
+
+- writes, flushes and ``SELECT ... FOR UPDATE``
+- any read once the session has written something, so a request always
+  reads its own writes even across a commit
+- any read inside ``with use_primary():``, for flows that must not see
+  replication lag (read-modify-write, or reads right after another
+  request's write)
+
+Replicas are picked round-robin or by fewest checked-out connections
+(``DATABASE_REPLICA_STRATEGY``). A replica that fails to connect or drops
+its connection is ejected for ``DATABASE_REPLICA_EJECT_SECONDS``. While
+every replica is ejected, reads fall back to the primary. The statement
+that hit the failure is not retried.
+"""
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.core.metrics import DB_REPLICA_EJECTIONS
+from app.db.events import session_has_writes
+from app.utils.logging import get_logger
+
+_use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """Send every read in the block to the primary."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def prefer_replica(statement):
+    """Mark a read (plain or lambda statement) as safe to serve from a replica."""
+    if isinstance(statement, StatementLambdaElement):
+        # Extend the cached lambda rather than resolving it to a plain Select
+        return statement + (lambda s: s.execution_options(replica=True))
+    return statement.execution_options(replica=True)
+
+
+def _label(engine: Engine) -> str:
+    url = engine.url
+    return f"{url.host}:{url.port}" if url.host else str(url.database)
+
+
+class ReplicaSet:
+    """Replica engines with load-balanced selection and health ejection."""
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        strategy: str = "round_robin",
+        eject_seconds: float = 30,
+    ):
+        self.engines = list(engines)
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self._turn = itertools.count()
+        self._in_use = {engine: 0 for engine in self.engines}
+        self._ejected_until: dict[Engine, float] = {}
+        for engine in self.engines:
+            self._watch(engine)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def _watch(self, engine: Engine) -> None:
+        def _checkout(*_):
+            self._in_use[engine] += 1
+
+        def _checkin(*_):
+            self._in_use[engine] -= 1
+
+        def _error(context):
+            # No connection means connecting failed
+            if context.is_disconnect or context.connection is None:
+                self.eject(engine)
+
+        event.listen(engine.pool, "checkout", _checkout)
+        event.listen(engine.pool, "checkin", _checkin)
+        event.listen(engine, "handle_error", _error)
+
+    def healthy(self) -> List[Engine]:
+        now = time.monotonic()
+        return [e for e in self.engines if self._ejected_until.get(e, 0) <= now]
+
+    def choose(self) -> Optional[Engine]:
+        """The replica for the next read, or None to use the primary."""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=self._in_use.__getitem__)
+        return candidates[next(self._turn) % len(candidates)]
+
+    def eject(self, engine: Engine) -> None:
+        if self._ejected_until.get(engine, 0) > time.monotonic():
+            return
+        self._ejected_until[engine] = time.monotonic() + self.eject_seconds
+        DB_REPLICA_EJECTIONS.labels(_label(engine)).inc()
+        get_logger().warning(
+            f"Read replica {_label(engine)} ejected for {self.eject_seconds:g}s"
+        )
+
+
+class RoutingSession(Session):
+    """Session sending replica-safe reads to ``replicas``."""
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def _reads_from_replica(self, clause) -> bool:
+        # Lambda statements proxy these attributes to the statement they wrap
+        if not getattr(clause, "is_select", False):
+            return False
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return False
+        if not clause.get_execution_options().get("replica"):
+            return False
+        if _use_primary.get() or self.info.get("committed_writes"):
+            return False
+        return not session_has_writes(self)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas and self._reads_from_replica(clause):
+            replica = self.replicas.choose()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, ConfigDict
+from uuid import UUID
+from datetime import datetime
+from typing import Optional
+
+
+class SessionResponse(BaseModel):
+    """A signed-in device: one unrevoked, unexpired access token."""
+
+    id: UUID
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    device_name: Optional[str] = None
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+    expires_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,30 +1,85 @@
+import time
+
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.metrics import DB_POOL_WAIT, instrument_pool
 from app.db.base import Base
+from app.db.events import register_engine_events
+from app.db.routing import ReplicaSet, RoutingSession
+
 
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long each checkout waited for a connection."""
 
-def _make_engine() -> AsyncEngine:
-    url = settings.DATABASE_URL
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
 
+
+def _make_engine(url: str) -> AsyncEngine:
     # SQLite doesn't support connection pool options
     if url.startswith("sqlite"):
         return create_async_engine(url)
 
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        # Prepared statements kept per connection; 0 disables (needed behind
+        # PgBouncer in transaction mode)
+        connect_args["prepared_statement_cache_size"] = (
+            settings.DATABASE_STATEMENT_CACHE_SIZE
+        )
+
     return create_async_engine(
         url,
-        pool_size=10,        # persistent connections kept open
-        max_overflow=20,     # extra connections allowed above pool_size
-        pool_timeout=30,     # seconds to wait for a free connection
+        connect_args=connect_args,
+        query_cache_size=settings.DATABASE_QUERY_CACHE_SIZE,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
         pool_recycle=1800,   # recycle connections after 30 minutes
         pool_pre_ping=True,  # test connection liveness before using it
     )
 
 
-engine: AsyncEngine = _make_engine()
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+register_engine_events()
+
+engine: AsyncEngine = _make_engine(settings.DATABASE_URL)
+instrument_pool(engine)
+replica_engines = [_make_engine(url) for url in settings.database_replica_urls]
+replicas = ReplicaSet(
+    [replica.sync_engine for replica in replica_engines],
+    strategy=settings.DATABASE_REPLICA_STRATEGY,
+    eject_seconds=settings.DATABASE_REPLICA_EJECT_SECONDS,
+)
+SessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,  # objects stay usable after commit without a reload
+    bind=engine,
+    sync_session_class=RoutingSession,
+    replicas=replicas,
+)
 
 
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+def pool_stats(engine: AsyncEngine = engine) -> dict:
+    """Current pool occupancy, or {} for pools without a fixed size (SQLite)."""
+    pool = engine.sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
@@ -0,0 +1,70 @@
+"""
+Connection-pool warmup
+
+Opening a PostgreSQL connection costs a TCP handshake, TLS and
+authentication. Without a warmup, the first burst of requests after a
+deploy pays that cost for every pooled connection it opens. At startup,
+``warm_pool`` opens ``pool_size`` connections at once and runs the hot
+lookups from ``app.db.queries`` on each of them. On asyncpg that prepares
+those statements in every connection's statement cache. The connections
+then go back to the pool, ready for the first requests.
+"""
+import asyncio
+import uuid
+from contextlib import AsyncExitStack
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.db import queries
+from app.utils.logging import get_logger
+
+
+async def _prime(conn: AsyncConnection) -> None:
+    """Run the hot auth queries once; their dummy keys match no rows."""
+    missing = uuid.UUID(int=0)
+    async with AsyncSession(bind=conn) as session:
+        for statement in (
+            queries.user_by_id(missing),
+            queries.user_by_email(""),
+            queries.user_by_username(""),
+            queries.access_token_by_id(missing, b""),
+            queries.refresh_token_by_id(missing, b""),
+            queries.user_agent_id(""),
+        ):
+            await session.execute(statement)
+
+
+def _pool_size(engine: AsyncEngine) -> int:
+    size = getattr(engine.sync_engine.pool, "size", None)
+    return size() if callable(size) else 1
+
+
+async def warm_pool(engine: AsyncEngine, connections: int | None = None) -> int:
+    """
+    Open ``connections`` (default: pool_size) connections concurrently.
+
+    Returns how many were opened. Raises if none could be, so startup
+    still fails fast when the database is unreachable.
+    """
+    connections = connections or _pool_size(engine)
+
+    async with AsyncExitStack() as stack:
+
+        async def _open() -> None:
+            # Held open until all are ready, so each one is a new connection
+            conn = await stack.enter_async_context(engine.connect())
+            await _prime(conn)
+
+        results = await asyncio.gather(
+            *(_open() for _ in range(connections)), return_exceptions=True
+        )
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if len(errors) == connections:
+        raise errors[0]
+    if errors:
+        get_logger().warning(
+            f"Pool warmup opened {connections - len(errors)}/{connections} "
+            f"connections: {errors[0]!r}"
+        )
+    return connections - len(errors)
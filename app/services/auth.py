@@ -6,17 +6,24 @@ from fastapi import HTTPException, status
 from sqlalchemy import select, and_, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.metrics import PASSWORD_REHASHES
+from app.core.passwords import algorithm
 from app.core.security import (
     get_password_hash,
-    verify_password,
+    verify_and_update_password,
     generate_verification_code,
     hash_verification_code,
     verify_verification_code,
 )
+from app.db import queries
 from app.db.models.user import User
 from app.db.models.tokens import PasswordResetToken
 from app.services.token import TokenService, ensure_timezone_aware
 from app.utils.caching import cache
+from app.utils.logging import get_logger
+
+logger = get_logger()
 
 # ── Lockout configuration ──────────────────────────────────────────────────
 LOGIN_MAX_ATTEMPTS = 5
@@ -135,7 +142,6 @@ class AuthService:
 
         self.db.add(new_user)
         await self.db.flush()
-        await self.db.refresh(new_user)
 
         return new_user, verification_code
 
@@ -176,7 +182,6 @@ class AuthService:
         user.verification_code_expires_at = None
 
         await self.db.flush()
-        await self.db.refresh(user)
 
         return user
 
@@ -195,7 +200,7 @@ class AuthService:
 
         await self._check_lockout(lock_key)
 
-        result = await self.db.execute(select(User).where(User.email == email))
+        result = await self.db.execute(queries.user_by_email(email))
         user = result.scalar_one_or_none()
 
         if not user:
@@ -230,7 +235,6 @@ class AuthService:
         user.verification_code_expires_at = expires_at
 
         await self.db.flush()
-        await self.db.refresh(user)
 
         return verification_code
 
@@ -256,10 +260,15 @@ class AuthService:
 
         await self._check_lockout(lock_key)
 
-        result = await self.db.execute(select(User).where(User.email == email))
+        result = await self.db.execute(queries.user_by_email(email))
         user = result.scalar_one_or_none()
 
-        if not user or not verify_password(password, user.hashed_password):
+        valid, new_hash = (
+            verify_and_update_password(password, user.hashed_password)
+            if user
+            else (False, None)
+        )
+        if not valid:
             remaining = await self._record_failure(
                 fail_key=fail_key,
                 lock_key=lock_key,
@@ -288,25 +297,24 @@ class AuthService:
         # Success — clear any existing failure tracking
         await self._clear_failures(fail_key, lock_key)
 
-        access_token_str, access_token_record = (
-            await self.token_service.create_access_token(
+        # Stored with an older algorithm or cost: upgrade while we have the
+        # plain password (written with the tokens below)
+        if new_hash:
+            PASSWORD_REHASHES.labels(algorithm(user.hashed_password)).inc()
+            user.hashed_password = new_hash
+
+        access_token_str, refresh_token_str = (
+            await self.token_service.issue_token_pair(
                 user_id=user.id,
                 email=user.email,
                 db=self.db,
                 ip_address=ip_address,
                 user_agent=user_agent,
                 device_name=device_name,
+                user=user,
             )
         )
 
-        refresh_token_str, _ = await self.token_service.create_refresh_token(
-            user_id=user.id,
-            access_token_id=access_token_record.id,
-            db=self.db,
-            ip_address=ip_address,
-            user_agent=user_agent,
-        )
-
         return user, access_token_str, refresh_token_str
 
     async def request_password_reset(self, email: str) -> str:
@@ -319,7 +327,7 @@ class AuthService:
         Raises:
             HTTPException: If user not found
         """
-        result = await self.db.execute(select(User).where(User.email == email))
+        result = await self.db.execute(queries.user_by_email(email))
         user = result.scalar_one_or_none()
 
         if not user:
@@ -356,7 +364,7 @@ class AuthService:
         Raises:
             HTTPException: If reset fails
         """
-        user_result = await self.db.execute(select(User).where(User.email == email))
+        user_result = await self.db.execute(queries.user_by_email(email))
         user = user_result.scalar_one_or_none()
 
         if not user:
@@ -403,7 +411,6 @@ class AuthService:
         reset_token.used_at = datetime.now(timezone.utc)
 
         await self.db.flush()
-        await self.db.refresh(user)
 
         # Clear login lockout so the user can log in with the new password
         await self._clear_failures(
@@ -415,10 +422,27 @@ class AuthService:
 
     async def logout(self, token: str) -> bool:
         """Revoke the current access token."""
+        if self.token_service.is_opaque(token):
+            return await self.token_service.revoke_session(token)
         _, token_record = await self.token_service.validate_token(token, self.db)
         token_hash = self.token_service._hash_token(token)
         return await self.token_service.revoke_token(token_hash, self.db)
 
     async def logout_all_devices(self, user_id: uuid.UUID) -> int:
         """Revoke all tokens for a user (logout all devices)."""
-        return await self.token_service.revoke_all_user_tokens(user_id, self.db)
+        revoked = await self.token_service.revoke_all_user_tokens(user_id, self.db)
+        if settings.AUTH_TOKEN_MODE == "opaque":
+            # The rows above include the sessions' own audit rows, and any
+            # JWTs issued before the switch to opaque mode
+            sessions = await self.token_service.revoke_all_user_sessions(user_id)
+            return max(revoked, sessions)
+
+        # Opaque sessions from before a switch back to JWTs still work. Their
+        # rows were revoked above, so nothing is queued for the audit flush
+        # (which only runs in opaque mode), and a store outage must not undo
+        # the JWT logout
+        try:
+            await self.token_service.revoke_all_user_sessions(user_id, audit=False)
+        except Exception as e:
+            logger.warning(f"Could not clear opaque sessions of user {user_id}: {e}")
+        return revoked
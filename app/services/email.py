@@ -1,9 +1,12 @@
+import asyncio
+
 from fastapi_mail import FastMail, MessageSchema, MessageType
 from pathlib import Path
 from typing import List
 
 from app.core.mail import conf  # email configuration
 from app.core.config import settings
+from app.core.deadline import budget
 from datetime import datetime
 
 fm = FastMail(conf)
@@ -53,5 +56,8 @@ async def send_email(
     else:
         message.body = body or "No content provided."
 
-    # Send async
-    await fm.send_message(message, template_name=template if template else None)
+    # Send async; inside a request, never outlive its deadline
+    await asyncio.wait_for(
+        fm.send_message(message, template_name=template if template else None),
+        budget(settings.EMAIL_TIMEOUT_SECONDS),
+    )
@@ -0,0 +1,278 @@
+"""
+Opaque session tokens (AUTH_TOKEN_MODE=opaque)
+
+In opaque mode an access token is 256 random bits (``secrets.token_urlsafe``)
+instead of a JWT. What a JWT would carry, plus a snapshot of the user, lives
+in a session hash keyed by the token's SHA-256, so authenticating a request
+is one HGETALL and no database query. Each user has a set of their session
+keys, so logout-all deletes them without a scan.
+
+The ``access_tokens`` row is still written at login (refresh tokens
+reference it) and stays the audit trail. Revocations are authoritative in
+the store at once; the matching ``access_tokens`` updates are queued in the
+store and applied by the ``flush_session_audit`` job (write-behind). A
+worker that dies between popping a batch and committing it loses that
+batch's audit update only; the sessions themselves are already gone.
+
+The user snapshot is taken at login and refresh, so profile changes show
+up in ``get_current_user`` from the next refresh on.
+
+Sessions live in Redis when REDIS_URL is set, otherwise in process memory
+(a single worker, e.g. development and tests).
+
+Admission lanes and rate-limit keys are picked before any handler runs and
+can't await the store, so each worker also remembers which user the opaque
+tokens it has created or looked up belong to (``token_subject``). A token
+the worker hasn't seen yet counts as anonymous for its first request there.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.deadline import budget
+from app.core.timing import track
+from app.db.models.user import User
+
+SESSION_PREFIX = "session:"
+USER_SESSIONS_PREFIX = "user_sessions:"
+AUDIT_KEY = "session_audit"
+
+
+def session_key(token: str) -> str:
+    """Store key for a token; the raw token is never stored."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# User columns copied into the session, enough for UserResponse
+_USER_FIELDS = (
+    "username",
+    "email",
+    "is_active",
+    "email_verified_at",
+    "created_at",
+    "updated_at",
+)
+
+
+def session_fields(
+    user: User, token_id: uuid.UUID, expires_at: datetime, **metadata
+) -> Dict[str, str]:
+    """The session hash: token and device metadata plus a snapshot of ``user``."""
+    fields = {
+        "user_id": str(user.id),
+        "token_id": str(token_id),
+        "expires_at": str(expires_at.timestamp()),
+    }
+    for name in _USER_FIELDS:
+        value = getattr(user, name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        fields[name] = "" if value is None else str(value)
+    fields.update({name: value for name, value in metadata.items() if value})
+    return fields
+
+
+def user_from_session(fields: Dict[str, str]) -> User:
+    """A detached ``User`` rebuilt from the session snapshot (never flushed)."""
+
+    def _time(name: str) -> Optional[datetime]:
+        return datetime.fromisoformat(fields[name]) if fields.get(name) else None
+
+    return User(
+        id=uuid.UUID(fields["user_id"]),
+        username=fields["username"],
+        email=fields["email"],
+        is_active=fields["is_active"] == "True",
+        email_verified_at=_time("email_verified_at"),
+        created_at=_time("created_at"),
+        updated_at=_time("updated_at"),
+    )
+
+
+class InMemorySessionStore:
+    """Sessions in this process only."""
+
+    def __init__(self):
+        self._sessions: Dict[str, tuple[float, Dict[str, str]]] = {}
+        self._users: Dict[str, set] = {}
+        self._audit: List[str] = []
+
+    def _live(self, key: str) -> Optional[Dict[str, str]]:
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+        expires, fields = entry
+        if expires <= time.time():
+            self._drop(key)
+            return None
+        return fields
+
+    def _drop(self, key: str) -> Optional[Dict[str, str]]:
+        entry = self._sessions.pop(key, None)
+        if entry is None:
+            return None
+        fields = entry[1]
+        self._users.get(fields["user_id"], set()).discard(key)
+        return fields
+
+    async def create(self, key: str, fields: Dict[str, str], ttl: int) -> None:
+        self._sessions[key] = (time.time() + ttl, dict(fields))
+        self._users.setdefault(fields["user_id"], set()).add(key)
+
+    async def get(self, key: str) -> Optional[Dict[str, str]]:
+        return self._live(key)
+
+    async def delete(self, key: str) -> Optional[Dict[str, str]]:
+        return self._live(key) and self._drop(key)
+
+    async def delete_user(self, user_id: str) -> List[Dict[str, str]]:
+        return [
+            fields
+            for key in list(self._users.pop(user_id, ()))
+            if (fields := self._live(key) and self._drop(key))
+        ]
+
+    async def queue_audit(self, event: str) -> None:
+        self._audit.append(event)
+
+    async def pop_audit(self, count: int) -> List[str]:
+        events, self._audit = self._audit[:count], self._audit[count:]
+        return events
+
+    async def push_audit(self, events: List[str]) -> None:
+        self._audit[:0] = events
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisSessionStore:
+    """
+    Sessions shared by every worker: ``session:<key>`` hashes with a TTL,
+    ``user_sessions:<user_id>`` sets and the ``session_audit`` list.
+    """
+
+    def __init__(self, url: str):
+        self._redis = aioredis.from_url(url, decode_responses=True)
+
+    async def _call(self, coro):
+        """Bound a Redis round trip by the time left before the request deadline."""
+        with track("session"):
+            return await asyncio.wait_for(coro, budget())
+
+    async def create(self, key: str, fields: Dict[str, str], ttl: int) -> None:
+        user_key = USER_SESSIONS_PREFIX + fields["user_id"]
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(SESSION_PREFIX + key, mapping=fields)
+            pipe.expire(SESSION_PREFIX + key, ttl)
+            pipe.sadd(user_key, key)
+            # Renewed by every login, so it lives as long as the newest session
+            pipe.expire(user_key, ttl)
+            await self._call(pipe.execute())
+
+    async def get(self, key: str) -> Optional[Dict[str, str]]:
+        return await self._call(self._redis.hgetall(SESSION_PREFIX + key)) or None
+
+    async def delete(self, key: str) -> Optional[Dict[str, str]]:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(SESSION_PREFIX + key)
+            pipe.delete(SESSION_PREFIX + key)
+            fields, deleted = await self._call(pipe.execute())
+        if not deleted:
+            return None
+        await self._call(self._redis.srem(USER_SESSIONS_PREFIX + fields["user_id"], key))
+        return fields
+
+    async def delete_user(self, user_id: str) -> List[Dict[str, str]]:
+        user_key = USER_SESSIONS_PREFIX + user_id
+        keys = await self._call(self._redis.smembers(user_key))
+        if not keys:
+            return []
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for key in keys:
+                pipe.hgetall(SESSION_PREFIX + key)
+            pipe.delete(*(SESSION_PREFIX + key for key in keys))
+            pipe.srem(user_key, *keys)
+            results = await self._call(pipe.execute())
+        return [fields for fields in results[: len(keys)] if fields]
+
+    async def queue_audit(self, event: str) -> None:
+        await self._call(self._redis.rpush(AUDIT_KEY, event))
+
+    async def pop_audit(self, count: int) -> List[str]:
+        return await self._redis.lpop(AUDIT_KEY, count) or []
+
+    async def push_audit(self, events: List[str]) -> None:
+        if events:
+            await self._redis.lpush(AUDIT_KEY, *reversed(events))
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+_store = None
+
+
+def get_session_store():
+    """The process-wide session store, created on first use."""
+    global _store
+    if _store is None:
+        _store = (
+            RedisSessionStore(settings.REDIS_URL)
+            if settings.REDIS_URL
+            else InMemorySessionStore()
+        )
+    return _store
+
+
+# ── Token subjects ────────────────────────────────────────────────────────────
+
+# Session key -> (subject, expires_at), least recently used first. The
+# subject is the email, as in a JWT's ``sub``.
+_SUBJECTS_MAX = 100_000
+_subjects: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+
+def remember_subject(key: str, fields: Dict[str, str]) -> None:
+    """Note the owner of the session at ``key`` for ``token_subject``."""
+    _subjects[key] = (fields["email"], float(fields["expires_at"]))
+    _subjects.move_to_end(key)
+    if len(_subjects) > _SUBJECTS_MAX:
+        _subjects.popitem(last=False)
+
+
+def forget_subject(key: str) -> None:
+    _subjects.pop(key, None)
+
+
+def token_subject(token: str) -> Optional[str]:
+    """
+    The email behind an opaque token this worker has seen, without I/O
+
+    Like ``bearer_subject`` for JWTs this is no authentication: a session
+    revoked elsewhere is only forgotten once it expires.
+    """
+    key = session_key(token)
+    entry = _subjects.get(key)
+    if entry is None:
+        return None
+    if entry[1] <= time.time():
+        del _subjects[key]
+        return None
+    _subjects.move_to_end(key)
+    return entry[0]
+
+
+def audit_event(user_id: str, token_ids: List[str]) -> str:
+    """A queued ``access_tokens`` revocation for ``flush_session_audit``."""
+    return json.dumps(
+        {"user_id": user_id, "token_ids": token_ids, "revoked_at": time.time()}
+    )
@@ -1,17 +1,50 @@
+import functools
 import hashlib
+import json
+import secrets
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Tuple
+from typing import Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
 
 import jwt
 from fastapi import HTTPException, status
 from jwt.exceptions import InvalidTokenError
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.core.config import settings
-from app.db.models.tokens import AccessToken, RefreshToken
+from app.db import queries
+from app.db.events import after_commit, run_after_commit, session_has_writes
+from app.db.ids import uuid7
+from app.db.models.tokens import AccessToken, RefreshToken, UserAgent
 from app.db.models.user import User
+from app.db.routing import prefer_replica
+from app.db.schemas.session import SessionResponse
+from app.services.sessions import (
+    audit_event,
+    forget_subject,
+    get_session_store,
+    remember_subject,
+    session_fields,
+    session_key,
+    user_from_session,
+)
+from app.utils.caching import cache
+from app.utils.pagination import paginate_keyset
+
+# Interned user-agent ids per engine, bounded by clearing when full
+_user_agent_ids: "WeakKeyDictionary[Engine, Dict[str, int]]" = WeakKeyDictionary()
+_USER_AGENT_CACHE_SIZE = 10_000
+
+# Session listing: the first page of each user's sessions is cached
+SESSION_PAGE_SIZE = 20
+SESSION_LIST_CACHE_SECONDS = 60
 
 
 def ensure_timezone_aware(dt: datetime) -> datetime:
@@ -35,46 +68,129 @@ def ensure_timezone_aware(dt: datetime) -> datetime:
 class TokenService:
     """Service for managing JWT tokens with database storage"""
 
-    def _hash_token(self, token: str) -> str:
-        """Hash token using SHA-256 for storage"""
-        return hashlib.sha256(token.encode()).hexdigest()
+    def _hash_token(self, token: str) -> bytes:
+        """Hash token using SHA-256 for storage (raw 32-byte digest)"""
+        return hashlib.sha256(token.encode()).digest()
 
-    async def create_access_token(
+    async def _user_agent_id(
+        self, user_agent: Optional[str], db: AsyncSession
+    ) -> Optional[int]:
+        """
+        Id of the interned ``user_agents`` row, inserting it if new
+
+        Ids are cached per engine, but only when read before the session
+        wrote anything: a row inserted by a transaction that later rolls
+        back never reaches the cache.
+        """
+        if not user_agent:
+            return None
+        user_agent = user_agent[:512]
+        bind = db.get_bind()
+        cache = _user_agent_ids.setdefault(bind, {})
+        agent_id = cache.get(user_agent)
+        if agent_id is not None:
+            return agent_id
+
+        agent_id = await db.scalar(queries.user_agent_id(user_agent))
+        if agent_id is None:
+            dialect_insert = pg_insert if bind.dialect.name == "postgresql" else sqlite_insert
+            agent_id = await db.scalar(
+                dialect_insert(UserAgent)
+                .values(value=user_agent)
+                .on_conflict_do_nothing(index_elements=[UserAgent.value])
+                .returning(UserAgent.id)
+            )
+            if agent_id is None:
+                # Inserted concurrently by another transaction
+                agent_id = await db.scalar(queries.user_agent_id(user_agent))
+            return agent_id
+
+        if not session_has_writes(db.sync_session):
+            if len(cache) >= _USER_AGENT_CACHE_SIZE:
+                cache.clear()
+            cache[user_agent] = agent_id
+        return agent_id
+
+    def _access_token_values(
         self,
         user_id: uuid.UUID,
         email: str,
-        db: AsyncSession,
         ip_address: str = None,
-        user_agent: str = None,
+        user_agent_id: int = None,
         device_name: str = None,
-    ) -> Tuple[str, AccessToken]:
+    ) -> Tuple[str, dict]:
         """
-        Create JWT access token and store in database
+        Encode an access token (a JWT, or random in opaque mode) and build
+        its database row
 
-        Args:
-            user_id: User's UUID
-            email: User's email
-            db: Database session
-            ip_address: Client IP address
-            user_agent: Client user agent
-            device_name: Device name
+        Every column is set client-side (no defaults), so the row can be
+        inserted by the ORM or inside a single multi-statement INSERT.
 
         Returns:
-            Tuple of (token_string, AccessToken record)
+            Tuple of (token_string, column values)
         """
         # Generate token ID
-        token_id = str(uuid.uuid4())
+        token_id = uuid7()
 
         # Calculate expiration
-        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        expires_at = datetime.now(timezone.utc) + expires_delta
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
         # Create JWT payload
         payload = {
             "sub": email,
             "user_id": str(user_id),
             "exp": expires_at,
-            "jti": token_id,
+            "jti": str(token_id),
+        }
+
+        if settings.AUTH_TOKEN_MODE == "opaque":
+            # 256 random bits; the session store holds what the JWT would
+            token_string = secrets.token_urlsafe(32)
+        else:
+            # Encode JWT
+            token_string = jwt.encode(
+                payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+            )
+
+        return token_string, {
+            "id": token_id,
+            "user_id": user_id,
+            "token_hash": self._hash_token(token_string),
+            "expires_at": expires_at,
+            "revoked": False,
+            "ip_address": ip_address,
+            "user_agent_id": user_agent_id,
+            "device_name": device_name,
+            "created_at": now,
+        }
+
+    def _refresh_token_values(
+        self,
+        user_id: uuid.UUID,
+        access_token_id: uuid.UUID,
+        ip_address: str = None,
+        user_agent_id: int = None,
+    ) -> Tuple[str, dict]:
+        """
+        Encode a refresh token JWT and build its database row
+
+        Returns:
+            Tuple of (token_string, column values)
+        """
+        # Generate token ID
+        token_id = uuid7()
+
+        # Calculate expiration (default 30 days)
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(days=getattr(settings, "REFRESH_TOKEN_EXPIRE_DAYS", 30))
+
+        # Create JWT payload
+        payload = {
+            "sub": str(user_id),
+            "exp": expires_at,
+            "jti": str(token_id),
+            "type": "refresh",
         }
 
         # Encode JWT
@@ -82,19 +198,49 @@ class TokenService:
             payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
         )
 
-        # Hash token for storage
-        token_hash = self._hash_token(token_string)
-
-        # Create database record
-        access_token = AccessToken(
-            id=uuid.UUID(token_id),
-            user_id=user_id,
-            token_hash=token_hash,
-            expires_at=expires_at,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            device_name=device_name,
+        return token_string, {
+            "id": token_id,
+            "user_id": user_id,
+            "token_hash": self._hash_token(token_string),
+            "expires_at": expires_at,
+            "revoked": False,
+            "access_token_id": access_token_id,
+            "ip_address": ip_address,
+            "user_agent_id": user_agent_id,
+            "created_at": now,
+        }
+
+    async def create_access_token(
+        self,
+        user_id: uuid.UUID,
+        email: str,
+        db: AsyncSession,
+        ip_address: str = None,
+        user_agent: str = None,
+        device_name: str = None,
+    ) -> Tuple[str, AccessToken]:
+        """
+        Create JWT access token and store in database
+
+        Args:
+            user_id: User's UUID
+            email: User's email
+            db: Database session
+            ip_address: Client IP address
+            user_agent: Client user agent
+            device_name: Device name
+
+        Returns:
+            Tuple of (token_string, AccessToken record)
+        """
+        token_string, values = self._access_token_values(
+            user_id,
+            email,
+            ip_address,
+            await self._user_agent_id(user_agent, db),
+            device_name,
         )
+        access_token = AccessToken(**values)
 
         db.add(access_token)
         await db.flush()
@@ -122,44 +268,224 @@ class TokenService:
         Returns:
             Tuple of (token_string, RefreshToken record)
         """
-        # Generate token ID
-        token_id = str(uuid.uuid4())
+        token_string, values = self._refresh_token_values(
+            user_id,
+            access_token_id,
+            ip_address,
+            await self._user_agent_id(user_agent, db),
+        )
+        refresh_token = RefreshToken(**values)
 
-        # Calculate expiration (default 30 days)
-        expires_delta = timedelta(days=getattr(settings, "REFRESH_TOKEN_EXPIRE_DAYS", 30))
-        expires_at = datetime.now(timezone.utc) + expires_delta
+        db.add(refresh_token)
+        await db.flush()
 
-        # Create JWT payload
-        payload = {
-            "sub": str(user_id),
-            "exp": expires_at,
-            "jti": token_id,
-            "type": "refresh",
-        }
+        return token_string, refresh_token
 
-        # Encode JWT
-        token_string = jwt.encode(
-            payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    def token_pair_statement(
+        self,
+        access_values: dict,
+        refresh_values: dict,
+        rotate_id: Optional[uuid.UUID] = None,
+        revoked_at: Optional[datetime] = None,
+    ):
+        """
+        One PostgreSQL statement inserting both tokens (and revoking the
+        rotated refresh token) via data-modifying CTEs.
+        """
+        statement = insert(RefreshToken).values(**refresh_values)
+        statement = statement.add_cte(
+            insert(AccessToken).values(**access_values).cte("new_access_token")
         )
+        if rotate_id is not None:
+            statement = statement.add_cte(
+                update(RefreshToken)
+                .where(RefreshToken.id == rotate_id)
+                .values(revoked=True, revoked_at=revoked_at)
+                .cte("rotated_refresh_token")
+            )
+        return statement
 
-        # Hash token for storage
-        token_hash = self._hash_token(token_string)
-
-        # Create database record
-        refresh_token = RefreshToken(
-            id=uuid.UUID(token_id),
-            user_id=user_id,
-            token_hash=token_hash,
-            expires_at=expires_at,
-            access_token_id=access_token_id,
-            ip_address=ip_address,
-            user_agent=user_agent,
+    async def issue_token_pair(
+        self,
+        user_id: uuid.UUID,
+        email: str,
+        db: AsyncSession,
+        ip_address: str = None,
+        user_agent: str = None,
+        device_name: str = None,
+        rotate: Optional[RefreshToken] = None,
+        user: Optional[User] = None,
+    ) -> Tuple[str, str]:
+        """
+        Create an access + refresh token pair in a single round trip
+
+        Both token IDs are generated client-side, so neither row has to be
+        flushed before the other can reference it. On PostgreSQL the pair
+        (and the revocation of ``rotate``) is written by one statement;
+        elsewhere by one flush.
+
+        Args:
+            user_id: User's UUID
+            email: User's email
+            db: Database session
+            ip_address: Client IP address
+            user_agent: Client user agent
+            device_name: Device name
+            rotate: Refresh token being exchanged; revoked in the same write
+            user: The user, snapshotted into the session in opaque mode
+
+        Returns:
+            Tuple of (access_token_string, refresh_token_string)
+        """
+        user_agent_id = await self._user_agent_id(user_agent, db)
+        access_string, access_values = self._access_token_values(
+            user_id, email, ip_address, user_agent_id, device_name
         )
+        refresh_string, refresh_values = self._refresh_token_values(
+            user_id, access_values["id"], ip_address, user_agent_id
+        )
+        revoked_at = datetime.now(timezone.utc)
 
-        db.add(refresh_token)
-        await db.flush()
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(
+                self.token_pair_statement(
+                    access_values,
+                    refresh_values,
+                    rotate.id if rotate is not None else None,
+                    revoked_at,
+                )
+            )
+            if rotate is not None:
+                # Already written by the statement; keep the object in step
+                set_committed_value(rotate, "revoked", True)
+                set_committed_value(rotate, "revoked_at", revoked_at)
+        else:
+            if rotate is not None:
+                rotate.revoked = True
+                rotate.revoked_at = revoked_at
+            db.add_all([AccessToken(**access_values), RefreshToken(**refresh_values)])
+            await db.flush()
 
-        return token_string, refresh_token
+        if settings.AUTH_TOKEN_MODE == "opaque":
+            if user is None:
+                user = (await db.execute(queries.user_by_id(user_id))).scalar_one()
+            key = session_key(access_string)
+            fields = session_fields(
+                user,
+                access_values["id"],
+                access_values["expires_at"],
+                ip_address=ip_address,
+                user_agent=user_agent,
+                device_name=device_name,
+            )
+            await get_session_store().create(
+                key, fields, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            )
+            remember_subject(key, fields)
+
+        self.invalidate_session_list(user_id, db)
+        return access_string, refresh_string
+
+    @staticmethod
+    def is_opaque(token: str) -> bool:
+        """Opaque tokens are URL-safe base64; a JWT always contains dots."""
+        return "." not in token
+
+    async def validate_session(self, token: str) -> Tuple[Dict[str, str], User]:
+        """
+        Look up an opaque token's session: one store round trip, no database
+
+        Returns:
+            Tuple of (session fields, detached User snapshot)
+
+        Raises:
+            HTTPException: If there is no live session for the token
+        """
+        key = session_key(token)
+        fields = await get_session_store().get(key)
+        if not fields:
+            forget_subject(key)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or revoked session token",
+            )
+        if float(fields["expires_at"]) < datetime.now(timezone.utc).timestamp():
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has expired",
+            )
+        remember_subject(key, fields)
+        return fields, user_from_session(fields)
+
+    async def revoke_session(self, token: str) -> bool:
+        """
+        End an opaque token's session now; its access_tokens row is marked
+        revoked by the next ``apply_session_audit``.
+        """
+        store = get_session_store()
+        key = session_key(token)
+        forget_subject(key)
+        fields = await store.delete(key)
+        if not fields:
+            return False
+        await store.queue_audit(audit_event(fields["user_id"], [fields["token_id"]]))
+        return True
+
+    async def revoke_all_user_sessions(
+        self, user_id: uuid.UUID, audit: bool = True
+    ) -> int:
+        """
+        End every opaque session of a user; returns how many were live
+
+        With ``audit`` the revocations are queued for apply_session_audit;
+        pass False when the access_tokens rows are already revoked.
+        """
+        store = get_session_store()
+        removed = await store.delete_user(str(user_id))
+        if removed and audit:
+            await store.queue_audit(
+                audit_event(str(user_id), [f["token_id"] for f in removed])
+            )
+        return len(removed)
+
+    async def apply_session_audit(self, db: AsyncSession, batch: int = 500) -> int:
+        """
+        Write queued session revocations to access_tokens (write-behind)
+
+        Events are requeued if the write fails. Returns the number of
+        access_tokens rows updated.
+        """
+        store = get_session_store()
+        events = await store.pop_audit(batch)
+        if not events:
+            return 0
+        try:
+            count = 0
+            for event in map(json.loads, events):
+                result = await db.execute(
+                    update(AccessToken)
+                    .where(
+                        AccessToken.id.in_([uuid.UUID(t) for t in event["token_ids"]]),
+                        AccessToken.revoked.is_(False),
+                    )
+                    .values(
+                        revoked=True,
+                        revoked_at=datetime.fromtimestamp(event["revoked_at"], timezone.utc),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                count += result.rowcount
+                # Events queued before they carried a user id can't be
+                # targeted; those listings catch up within SESSION_LIST_CACHE_SECONDS
+                if "user_id" in event:
+                    self.invalidate_session_list(uuid.UUID(event["user_id"]), db)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await store.push_audit(events)
+            raise
+        await run_after_commit(db)
+        return count
 
     async def validate_token(
         self, token: str, db: AsyncSession
@@ -196,10 +522,7 @@ class TokenService:
 
             # Query database for token
             result = await db.execute(
-                select(AccessToken).where(
-                    AccessToken.id == uuid.UUID(token_id),
-                    AccessToken.token_hash == token_hash,
-                )
+                prefer_replica(queries.access_token_by_id(uuid.UUID(token_id), token_hash))
             )
             token_record = result.scalar_one_or_none()
 
@@ -232,7 +555,7 @@ class TokenService:
                 detail=f"Invalid token: {str(e)}",
             )
 
-    async def revoke_token(self, token_hash: str, db: AsyncSession) -> bool:
+    async def revoke_token(self, token_hash: bytes, db: AsyncSession) -> bool:
         """
         Revoke a token by its hash
 
@@ -252,6 +575,7 @@ class TokenService:
             token_record.revoked = True
             token_record.revoked_at = datetime.now(timezone.utc)
             await db.flush()
+            self.invalidate_session_list(token_record.user_id, db)
             return True
 
         return False
@@ -269,7 +593,8 @@ class TokenService:
         """
         result = await db.execute(
             select(AccessToken).where(
-                AccessToken.user_id == user_id, AccessToken.revoked == False
+                # Matches the predicate of ix_access_tokens_user_id_created_at
+                AccessToken.user_id == user_id, AccessToken.revoked.is_(False)
             )
         )
         tokens = result.scalars().all()
@@ -283,9 +608,141 @@ class TokenService:
 
         if count > 0:
             await db.flush()
+            self.invalidate_session_list(user_id, db)
 
         return count
 
+    async def revoke_token_by_id(
+        self, user_id: uuid.UUID, token_id: uuid.UUID, db: AsyncSession
+    ) -> bool:
+        """
+        Sign one device out: revoke a user's access token by id, the refresh
+        tokens issued with it (so the device can't refresh its way back in),
+        and in opaque mode its session
+
+        Returns:
+            True if the token was revoked, False if the user has no such
+            unrevoked token
+        """
+        result = await db.execute(
+            select(AccessToken).where(
+                AccessToken.id == token_id,
+                AccessToken.user_id == user_id,
+                AccessToken.revoked.is_(False),
+            )
+        )
+        token_record = result.scalar_one_or_none()
+        if not token_record:
+            return False
+
+        revoked_at = datetime.now(timezone.utc)
+        token_record.revoked = True
+        token_record.revoked_at = revoked_at
+        await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.access_token_id == token_id,
+                RefreshToken.revoked.is_(False),
+            )
+            .values(revoked=True, revoked_at=revoked_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.flush()
+
+        if settings.AUTH_TOKEN_MODE == "opaque":
+            # The session key is the hex SHA-256 of the token, i.e. token_hash;
+            # the row is already revoked, so no audit event is queued
+            key = token_record.token_hash.hex()
+            forget_subject(key)
+            await get_session_store().delete(key)
+
+        self.invalidate_session_list(user_id, db)
+        return True
+
+    # ── Session listing ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def _session_list_key(user_id: uuid.UUID) -> str:
+        return f"session_list:{user_id}"
+
+    def invalidate_session_list(self, user_id: uuid.UUID, db: AsyncSession) -> None:
+        """
+        Drop the cached first page of a user's sessions once ``db`` commits
+
+        Dropping it earlier would let a listing in between cache the old
+        rows again until SESSION_LIST_CACHE_SECONDS.
+        """
+        after_commit(
+            db, functools.partial(cache.invalidate, self._session_list_key(user_id), db=db)
+        )
+
+    async def list_sessions(
+        self,
+        user_id: uuid.UUID,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = SESSION_PAGE_SIZE,
+    ) -> dict:
+        """
+        A user's signed-in devices (unrevoked, unexpired access tokens),
+        newest first
+
+        Keyset-paginated on ix_access_tokens_user_id_created_at, selecting
+        only the listed columns. The first page at the default size is read
+        from the primary and cached per user for up to
+        SESSION_LIST_CACHE_SECONDS, and dropped whenever the user's tokens
+        are issued or revoked. Later pages may come from a replica and are
+        never cached, so replication lag can't outlive a single response.
+
+        Returns:
+            ``KeysetPage.to_dict()`` of SessionResponse dicts
+        """
+        cacheable = cursor is None and limit == SESSION_PAGE_SIZE
+        key = self._session_list_key(user_id)
+        if cacheable:
+            cached = await cache.get(key, db=db)
+            # The in-memory backend ignores expiry, so entries carry their own
+            if cached and cached["cached_until"] > time.time():
+                return cached["page"]
+
+        query = (
+            select(
+                AccessToken.id,
+                AccessToken.ip_address,
+                UserAgent.value.label("user_agent"),
+                AccessToken.device_name,
+                AccessToken.created_at,
+                AccessToken.last_used_at,
+                AccessToken.expires_at,
+            )
+            .outerjoin(UserAgent, AccessToken.user_agent_id == UserAgent.id)
+            .where(
+                # Matches the predicate of ix_access_tokens_user_id_created_at
+                AccessToken.user_id == user_id,
+                AccessToken.revoked.is_(False),
+                AccessToken.expires_at > datetime.now(timezone.utc),
+            )
+        )
+        page = await paginate_keyset(
+            db,
+            query if cacheable else prefer_replica(query),
+            [AccessToken.created_at, AccessToken.id],
+            cursor=cursor,
+            limit=limit,
+        )
+        result = page.to_dict(
+            lambda row: SessionResponse.model_validate(row).model_dump(mode="json")
+        )
+
+        if cacheable:
+            await cache.set(
+                key,
+                {"page": result, "cached_until": time.time() + SESSION_LIST_CACHE_SECONDS},
+                expire=SESSION_LIST_CACHE_SECONDS,
+                db=db,
+            )
+        return result
+
     async def validate_refresh_token(
         self, refresh_token: str, db: AsyncSession
     ) -> Tuple[dict, RefreshToken]:
@@ -316,10 +773,7 @@ class TokenService:
             token_hash = self._hash_token(refresh_token)
 
             result = await db.execute(
-                select(RefreshToken).where(
-                    RefreshToken.id == uuid.UUID(token_id),
-                    RefreshToken.token_hash == token_hash,
-                )
+                queries.refresh_token_by_id(uuid.UUID(token_id), token_hash)
             )
             token_record = result.scalar_one_or_none()
 
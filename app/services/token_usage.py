@@ -0,0 +1,141 @@
+"""
+Coalesced ``access_tokens.last_used_at`` tracking
+
+Writing ``last_used_at`` on every authenticated request would turn each
+read into a row update (a new tuple version and WAL record on PostgreSQL).
+Instead ``get_current_user`` records the token in a per-worker buffer, at
+most once per token per ``TOKEN_LAST_USED_RESOLUTION_MINUTES``, and a
+background task started by ``lifespan`` writes the buffer every
+``TOKEN_USAGE_FLUSH_SECONDS`` as one batched UPDATE.
+
+``last_used_at`` is therefore approximate: up to the resolution plus one
+flush interval behind. A worker that dies loses at most its unflushed
+buffer. The UPDATE never moves the value backwards, so workers flushing
+the same token in any order agree on the latest time.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict
+
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import TOKEN_USAGE_BUFFER_SIZE, TOKEN_USAGE_FLUSH_DURATION
+from app.db.models.tokens import AccessToken
+from app.db.session import SessionLocal
+from app.utils.logging import get_logger
+
+logger = get_logger()
+
+_table = AccessToken.__table__
+# Core executemany: one statement, a parameter set per token
+_touch = (
+    update(_table)
+    .where(
+        _table.c.id == bindparam("token_id"),
+        or_(
+            _table.c.last_used_at.is_(None),
+            _table.c.last_used_at < bindparam("used_at"),
+        ),
+    )
+    .values(last_used_at=bindparam("used_at"))
+)
+
+
+class TokenUsageBuffer:
+    """Started and stopped by ``lifespan``; one instance per worker."""
+
+    def __init__(self, resolution_minutes: int = 5):
+        self.resolution = resolution_minutes * 60
+        # token id -> time of use, waiting for the next flush
+        self._pending: Dict[uuid.UUID, datetime] = {}
+        # token id -> monotonic time of the last use let into the buffer
+        self._recorded: Dict[uuid.UUID, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def record(self, token_id: uuid.UUID) -> None:
+        """Note a use of ``token_id``; a no-op within the resolution window."""
+        now = time.monotonic()
+        last = self._recorded.get(token_id)
+        if last is not None and now - last < self.resolution:
+            return
+        self._recorded[token_id] = now
+        self._pending[token_id] = datetime.now(timezone.utc)
+        TOKEN_USAGE_BUFFER_SIZE.set(len(self._pending))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Write the buffered uses in one batched UPDATE
+
+        Uses are put back in the buffer if the write fails. Returns the
+        number of tokens written.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        # Primary-key order, so concurrent flushes lock rows in the same order
+        rows = [
+            {"token_id": token_id, "used_at": used_at}
+            for token_id, used_at in sorted(pending.items())
+        ]
+        try:
+            with TOKEN_USAGE_FLUSH_DURATION.time():
+                await db.execute(_touch, rows)
+                await db.commit()
+        except Exception:
+            await db.rollback()
+            # Newer uses recorded meanwhile win over the requeued ones
+            for token_id, used_at in pending.items():
+                self._pending.setdefault(token_id, used_at)
+            raise
+        finally:
+            TOKEN_USAGE_BUFFER_SIZE.set(len(self._pending))
+            self._prune()
+        return len(rows)
+
+    def _prune(self) -> None:
+        """Forget tokens whose resolution window has passed."""
+        cutoff = time.monotonic() - self.resolution
+        self._recorded = {
+            token_id: recorded
+            for token_id, recorded in self._recorded.items()
+            if recorded > cutoff or token_id in self._pending
+        }
+
+    def start(self, interval_seconds: int) -> None:
+        """Start the periodic flush on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(interval_seconds)
+        )
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write what is left."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._flush_logged()
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            async with SessionLocal() as db:
+                await self.flush(db)
+        except Exception as e:
+            logger.error(f"✗ Token usage flush failed: {e}")
+
+
+usage_buffer = TokenUsageBuffer(settings.TOKEN_LAST_USED_RESOLUTION_MINUTES)
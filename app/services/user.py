@@ -2,11 +2,12 @@ import uuid
 from typing import Optional, Dict, Any
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
 
+from app.db import queries
 from app.db.models.user import User
+from app.db.routing import prefer_replica, use_primary
 
 
 class UserService:
@@ -25,7 +26,9 @@ class UserService:
         Returns:
             User object or None if not found
         """
-        result = await self.db.execute(select(User).where(User.id == user_id))
+        result = await self.db.execute(
+            prefer_replica(queries.user_by_id(user_id))
+        )
         return result.scalar_one_or_none()
 
     async def get_by_email(self, email: str) -> Optional[User]:
@@ -38,7 +41,9 @@ class UserService:
         Returns:
             User object or None if not found
         """
-        result = await self.db.execute(select(User).where(User.email == email))
+        result = await self.db.execute(
+            prefer_replica(queries.user_by_email(email))
+        )
         return result.scalar_one_or_none()
 
     async def get_by_username(self, username: str) -> Optional[User]:
@@ -51,7 +56,9 @@ class UserService:
         Returns:
             User object or None if not found
         """
-        result = await self.db.execute(select(User).where(User.username == username))
+        result = await self.db.execute(
+            prefer_replica(queries.user_by_username(username))
+        )
         return result.scalar_one_or_none()
 
     async def update_user(
@@ -70,7 +77,8 @@ class UserService:
         Raises:
             HTTPException: If user not found
         """
-        user = await self.get_by_id(user_id)
+        with use_primary():  # read-modify-write must not see replica lag
+            user = await self.get_by_id(user_id)
 
         if not user:
             raise HTTPException(
@@ -87,7 +95,6 @@ class UserService:
         user.updated_at = datetime.now(timezone.utc)
 
         await self.db.flush()
-        await self.db.refresh(user)
 
         return user
 
@@ -101,7 +108,8 @@ class UserService:
         Returns:
             True if deleted, False if not found
         """
-        user = await self.get_by_id(user_id)
+        with use_primary():
+            user = await self.get_by_id(user_id)
 
         if not user:
             return False
@@ -1,12 +1,17 @@
 from sqlalchemy import select
 from typing import Any, Optional
+import asyncio
 import json
 import redis.asyncio as aioredis
 from datetime import datetime, timedelta, timezone
 
 from app.core.config import settings
+from app.core.deadline import budget
+from app.core.metrics import CACHE_REQUESTS
+from app.core.timing import track
 from app.db.models.cache import CacheEntry
 from app.core.dependencies import DBDependency  # Reuse DB dep
+from app.utils.logging import get_logger
 
 
 class Cache:
@@ -19,9 +24,27 @@ class Cache:
         if self.cache_type == "redis" and settings.REDIS_URL:
             self._redis = aioredis.from_url(settings.REDIS_URL)
 
+    async def _redis_call(self, coro, bounded: bool = True):
+        """Bound a Redis round trip by the time left before the request deadline."""
+        if not bounded:
+            return await coro
+        return await asyncio.wait_for(coro, budget())
+
     async def get(self, key: str, db: Optional[DBDependency] = None) -> Optional[Any]:
+        with track("cache"):
+            try:
+                value = await self._get(key, db)
+            except asyncio.TimeoutError:
+                get_logger().warning(f"Cache get timed out for '{key}'; treating as a miss")
+                value = None
+        CACHE_REQUESTS.labels(
+            self.cache_type, "miss" if value is None else "hit"
+        ).inc()
+        return value
+
+    async def _get(self, key: str, db: Optional[DBDependency] = None) -> Optional[Any]:
         if self.cache_type == "redis" and self._redis:
-            value = await self._redis.get(key)
+            value = await self._redis_call(self._redis.get(key))
             if value:
                 return json.loads(value) if value else None
         elif self.cache_type == "database" and db:
@@ -50,10 +73,23 @@ class Cache:
         value: Any,
         expire: int = 3600,
         db: Optional[DBDependency] = None,
+    ):
+        with track("cache"):
+            try:
+                await self._set(key, value, expire, db)
+            except asyncio.TimeoutError:
+                get_logger().warning(f"Cache set timed out for '{key}'; skipped")
+
+    async def _set(
+        self,
+        key: str,
+        value: Any,
+        expire: int = 3600,
+        db: Optional[DBDependency] = None,
     ):
         val_str = json.dumps(value)
         if self.cache_type == "redis" and self._redis:
-            await self._redis.set(key, val_str, ex=expire)
+            await self._redis_call(self._redis.set(key, val_str, ex=expire))
         elif self.cache_type == "database" and db:
             # Delete existing
             await db.execute(CacheEntry.__table__.delete().where(CacheEntry.key == key))
@@ -70,8 +106,27 @@ class Cache:
             self._inmemory[key] = value
 
     async def delete(self, key: str, db: Optional[DBDependency] = None):
+        with track("cache"):
+            try:
+                await self._delete(key, db)
+            except asyncio.TimeoutError:
+                get_logger().warning(f"Cache delete timed out for '{key}'; skipped")
+
+    async def invalidate(self, key: str, db: Optional[DBDependency] = None):
+        """
+        Delete an entry that would otherwise be served stale
+
+        Unlike ``delete`` it is not bounded by the request deadline, and a
+        failure is raised instead of skipped.
+        """
+        with track("cache"):
+            await self._delete(key, db, bounded=False)
+
+    async def _delete(
+        self, key: str, db: Optional[DBDependency] = None, bounded: bool = True
+    ):
         if self.cache_type == "redis" and self._redis:
-            await self._redis.delete(key)
+            await self._redis_call(self._redis.delete(key), bounded)
 
         elif self.cache_type == "database" and db:
             await db.execute(
@@ -0,0 +1,174 @@
+"""
+Memory diagnostics: tracemalloc snapshots, diffs, gc statistics and RSS.
+
+All data is per process — under gunicorn each worker has its own
+profiler, so repeat a request until it lands on the worker of interest
+(the response includes its ``pid``).
+"""
+import gc
+import json
+import os
+import resource
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Allocations made by the profiler itself are noise in every diff
+_NOISE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Non-Linux: peak RSS is the best portable approximation
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _stat_to_dict(stat) -> dict:
+    frame = stat.traceback[0]
+    entry = {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+class MemoryProfiler:
+    """Holds named tracemalloc snapshots for the current process."""
+
+    MAX_SNAPSHOTS = 10
+
+    def __init__(self):
+        self._snapshots: Dict[str, tracemalloc.Snapshot] = {}
+        self._next_dump_rss: Optional[int] = None
+
+    # ── tracemalloc control ──────────────────────────────────────────────────
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Stop tracing and drop stored snapshots (they pin a lot of memory)."""
+        tracemalloc.stop()
+        self._snapshots.clear()
+
+    # ── snapshots ────────────────────────────────────────────────────────────
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        return tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS)
+
+    def take_snapshot(self, name: str) -> dict:
+        snapshot = self._snapshot()
+        self._snapshots.pop(name, None)
+        if len(self._snapshots) >= self.MAX_SNAPSHOTS:
+            # Evict the oldest snapshot
+            self._snapshots.pop(next(iter(self._snapshots)))
+        self._snapshots[name] = snapshot
+        return {
+            "name": name,
+            "traced_kb": round(sum(t.size for t in snapshot.traces) / 1024, 1),
+        }
+
+    def snapshot_names(self) -> List[str]:
+        return list(self._snapshots)
+
+    def top(self, name: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """Largest allocation sites in a stored snapshot (or right now)."""
+        snapshot = self._get(name) if name else self._snapshot()
+        return [_stat_to_dict(s) for s in snapshot.statistics("lineno")[:limit]]
+
+    def diff(self, base: str, target: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """
+        Top allocation growth between two snapshots, grouped by file:line.
+
+        Without ``target`` the base is compared against the current heap.
+        """
+        base_snapshot = self._get(base)
+        target_snapshot = self._get(target) if target else self._snapshot()
+        stats = target_snapshot.compare_to(base_snapshot, "lineno")
+        return [_stat_to_dict(s) for s in stats[:limit]]
+
+    def _get(self, name: str) -> tracemalloc.Snapshot:
+        try:
+            return self._snapshots[name]
+        except KeyError:
+            raise KeyError(f"No snapshot named '{name}'") from None
+
+    # ── gc / objects ─────────────────────────────────────────────────────────
+
+    def gc_stats(self, limit: int = 30) -> dict:
+        """gc generation counters and the most common live object types."""
+        types = Counter(type(obj).__name__ for obj in gc.get_objects())
+        return {
+            "pid": os.getpid(),
+            "rss_mb": round(rss_bytes() / 1024 / 1024, 1),
+            "gc_counts": gc.get_count(),
+            "gc_thresholds": gc.get_threshold(),
+            "gc_generations": gc.get_stats(),
+            "object_types": dict(types.most_common(limit)),
+        }
+
+    # ── dumps ────────────────────────────────────────────────────────────────
+
+    def dump(self, directory: str) -> List[str]:
+        """
+        Write the current state to ``directory``.
+
+        Always writes a JSON report (RSS, gc stats, top allocations when
+        tracing); also writes a raw ``.tracemalloc`` snapshot when tracing,
+        loadable later with ``tracemalloc.Snapshot.load()``.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        base = os.path.join(directory, f"memory-{os.getpid()}-{stamp}")
+
+        report = self.gc_stats()
+        paths = []
+        if self.tracing:
+            snapshot = self._snapshot()
+            snapshot.dump(f"{base}.tracemalloc")
+            paths.append(f"{base}.tracemalloc")
+            report["top_allocations"] = [
+                _stat_to_dict(s) for s in snapshot.statistics("lineno")[:50]
+            ]
+
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        paths.append(f"{base}.json")
+        return paths
+
+    def dump_if_over(self, threshold_mb: int, directory: str) -> List[str]:
+        """
+        Dump once RSS crosses ``threshold_mb``, then again only after a
+        further 25% growth so a slow leak does not fill the disk.
+        """
+        rss = rss_bytes()
+        next_dump = self._next_dump_rss or threshold_mb * 1024 * 1024
+        if rss < next_dump:
+            return []
+        self._next_dump_rss = int(rss * 1.25)
+        return self.dump(directory)
+
+
+memory_profiler = MemoryProfiler()
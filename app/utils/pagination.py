@@ -1,13 +1,21 @@
 """Reusable async pagination + search utility for SQLAlchemy models."""
 
+import base64
+import binascii
+import json
 import math
+import uuid
 from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Any, Generic, Optional, Sequence, Type, TypeVar
 
-from sqlalchemy import Select, func, or_, select
+from fastapi import HTTPException, status
+from sqlalchemy import Row, Select, func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import InstrumentedAttribute, RelationshipProperty
 
+from app.db.routing import prefer_replica
+
 T = TypeVar("T")
 
 
@@ -140,7 +148,7 @@ async def paginate(
         list_q = list_q.where(search_clause)
 
     # ---- total count ---------------------------------------------------------
-    total: int = (await db.execute(count_q)).scalar() or 0
+    total: int = (await db.execute(prefer_replica(count_q))).scalar() or 0
 
     # ---- ordering ------------------------------------------------------------
     if order_by is None:
@@ -160,7 +168,7 @@ async def paginate(
 
     # ---- pagination ----------------------------------------------------------
     list_q = list_q.offset((page - 1) * per_page).limit(per_page)
-    data: list[T] = list((await db.execute(list_q)).scalars().all())
+    data: list[T] = list((await db.execute(prefer_replica(list_q))).scalars().all())
 
     # ---- pagination metadata -------------------------------------------------
     pages = max(1, math.ceil(total / per_page)) if per_page else 1
@@ -179,3 +187,97 @@ async def paginate(
     )
 
     return PaginatedResult(data=data, pagination=pagination)
+
+
+# ── Keyset pagination ─────────────────────────────────────────────────────────
+
+
+@dataclass
+class KeysetPage(Generic[T]):
+    data: list[T]
+    limit: int
+    next_cursor: Optional[str]
+
+    def to_dict(self, serializer=None) -> dict:
+        """Same shape as PaginatedResult.to_dict, with a cursor instead of pages."""
+        items = [serializer(item) for item in self.data] if serializer else self.data
+        return {
+            "data": items,
+            "limit": self.limit,
+            "has_next": self.next_cursor is not None,
+            "next_cursor": self.next_cursor,
+        }
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor for the sort-key values of the last row of a page."""
+    plain = [v.isoformat() if isinstance(v, datetime) else str(v) for v in values]
+    return base64.urlsafe_b64encode(json.dumps(plain).encode()).decode()
+
+
+def decode_cursor(cursor: str, keys: Sequence[InstrumentedAttribute]) -> list:
+    """Sort-key values from ``encode_cursor``, typed like ``keys``."""
+    try:
+        plain = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(plain, list) or len(plain) != len(keys):
+            raise ValueError(cursor)
+        values = []
+        for key, value in zip(keys, plain):
+            python_type = key.type.python_type
+            if python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif python_type is uuid.UUID:
+                values.append(uuid.UUID(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+async def paginate_keyset(
+    db: AsyncSession,
+    query: Select,
+    keys: Sequence[InstrumentedAttribute],
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> KeysetPage[Row]:
+    """
+    Newest-first keyset ("seek") pagination.
+
+    Unlike ``paginate``'s OFFSET, which reads and throws away every row
+    before the page, each page starts with an index seek just past the
+    previous page's last row, so page 1000 costs what page 1 does. There is
+    no total count for the same reason.
+
+    Parameters
+    ----------
+    db     : AsyncSession
+    query  : SELECT with its filters; must select every column in ``keys``.
+    keys   : Sort key, unique as a whole, e.g. [Model.created_at, Model.id].
+             Rows come back in descending order of it; an index on the
+             filter columns followed by ``keys`` serves the page directly.
+    cursor : ``next_cursor`` of the previous page; None for the first page.
+    limit  : Rows per page (1–200).
+
+    Returns
+    -------
+    KeysetPage with .data (result rows) and .next_cursor (None on the last page).
+    """
+    limit = max(1, min(limit, 200))
+
+    if cursor is not None:
+        query = query.where(tuple_(*keys) < tuple_(*decode_cursor(cursor, keys)))
+    # One extra row tells whether there is a next page
+    query = query.order_by(*(key.desc() for key in keys)).limit(limit + 1)
+    rows = list((await db.execute(query)).all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]._mapping[key] for key in keys])
+
+    return KeysetPage(data=rows, limit=limit, next_cursor=next_cursor)
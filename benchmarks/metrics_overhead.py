@@ -0,0 +1,63 @@
+"""
+Per-request overhead of MetricsMiddleware.
+
+Drives a trivial ASGI app directly (no HTTP client, no network) with and
+without the middleware and reports the difference in microseconds.
+
+Usage:
+    python -m benchmarks.metrics_overhead [requests]
+
+Set PROMETHEUS_MULTIPROC_DIR to an empty directory to measure the
+mmap-backed multi-process mode used under gunicorn.
+"""
+import asyncio
+import sys
+import time
+
+from app.core.metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/api/v1/auth/me"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def run(app, n: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/auth/me"}
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), _receive, _send)
+    return time.perf_counter() - start
+
+
+async def main(n: int) -> None:
+    wrapped = MetricsMiddleware(bare_app)
+    # Warm up label children and code paths
+    await run(bare_app, 1000)
+    await run(wrapped, 1000)
+
+    bare = min([await run(bare_app, n) for _ in range(5)])
+    instrumented = min([await run(wrapped, n) for _ in range(5)])
+    overhead_us = (instrumented - bare) / n * 1e6
+
+    print(f"requests per run       : {n}")
+    print(f"bare app               : {bare / n * 1e6:.2f} µs/request")
+    print(f"with MetricsMiddleware : {instrumented / n * 1e6:.2f} µs/request")
+    print(f"overhead               : {overhead_us:.2f} µs/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,70 @@
+"""
+Password hash latency per algorithm and cost on this host.
+
+For every bcrypt cost and a set of Argon2id parameter sets (the OWASP
+minimums, pwdlib's default and the configured one), reports the median
+time to hash and to verify one password, and the logins per second one
+core can sustain at that cost. ``python calibrate_hashing.py`` picks the
+costs for a latency target from the same measurements.
+
+Usage:
+    python -m benchmarks.password_hashing [samples]
+
+Argon2id rows need argon2-cffi (pip install "pwdlib[argon2]").
+"""
+import sys
+import time
+
+from pwdlib.exceptions import HasherNotAvailable
+
+from app.core.config import settings
+from app.core.passwords import argon2_hasher, bcrypt_hasher
+
+PASSWORD = "correct horse battery staple"
+
+# (memory KiB, time cost, parallelism)
+ARGON2_PARAMETERS = [
+    (19456, 2, 1),  # OWASP minimum
+    (47104, 1, 1),  # OWASP minimum, memory-heavy variant
+    (65536, 3, 4),  # pwdlib / argon2-cffi default
+    (settings.ARGON2_MEMORY_KIB, settings.ARGON2_TIME_COST, settings.ARGON2_PARALLELISM),
+]
+
+
+def _median_ms(fn, samples: int) -> float:
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def _row(label: str, hasher, samples: int) -> None:
+    hashed = hasher.hash(PASSWORD)
+    hash_ms = _median_ms(lambda: hasher.hash(PASSWORD), samples)
+    verify_ms = _median_ms(lambda: hasher.verify(PASSWORD, hashed), samples)
+    print(
+        f"  {label:34} hash {hash_ms:8.1f} ms   verify {verify_ms:8.1f} ms   "
+        f"{1000 / verify_ms:6.1f} logins/s per core"
+    )
+
+
+def main(samples: int) -> None:
+    print(f"bcrypt (median of {samples})")
+    for rounds in range(10, 15):
+        _row(f"rounds={rounds}", bcrypt_hasher(rounds), samples)
+
+    print(f"\nargon2id (median of {samples})")
+    for memory, time_cost, parallelism in dict.fromkeys(ARGON2_PARAMETERS):
+        try:
+            hasher = argon2_hasher(time_cost, memory, parallelism)
+        except HasherNotAvailable:
+            print('  not installed: pip install "pwdlib[argon2]"')
+            break
+        label = f"m={memory // 1024}MiB t={time_cost} p={parallelism}"
+        _row(label, hasher, samples)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,116 @@
+"""
+Insert throughput and primary-key index size: uuid4 vs uuid7 keys.
+
+For each key type it fills a table shaped like the token tables (UUID
+primary key, a 64-char hash, a timestamp) in batches, then reports rows
+per second for the whole fill and for the last batches, where random
+uuid4 keys hit pages that are no longer cached, and the size of the
+primary-key index.
+
+Usage:
+    python -m benchmarks.primary_keys [rows]
+
+The default of 10,000,000 rows is meant for PostgreSQL; pass a smaller
+count for a quick local run. SQLite (a temporary file) always runs. Set
+BENCH_POSTGRES_URL (postgresql+asyncpg://...) to also measure against
+PostgreSQL; the benchmark tables are dropped afterwards.
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, MetaData, String, Table, insert, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.db.ids import uuid7
+
+BATCH = 10_000
+TAIL_BATCHES = 10
+
+
+def _table(metadata: MetaData, name: str) -> Table:
+    return Table(
+        name,
+        metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("token_hash", String(64), nullable=False),
+        Column("created_at", TIMESTAMP(timezone=True), nullable=False),
+    )
+
+
+async def _index_size(conn: AsyncConnection, table: Table) -> int:
+    if conn.dialect.name == "postgresql":
+        return await conn.scalar(
+            text("SELECT pg_relation_size(:index)"), {"index": f"{table.name}_pkey"}
+        )
+    return await conn.scalar(
+        text("SELECT SUM(pgsize) FROM dbstat WHERE name = :index"),
+        {"index": f"sqlite_autoindex_{table.name}_1"},
+    )
+
+
+async def fill(conn: AsyncConnection, table: Table, make_id, rows: int):
+    now = datetime.now(timezone.utc)
+    batches = max(rows // BATCH, 1)
+    tail_start = max(batches - TAIL_BATCHES, 0)
+    start = tail = time.perf_counter()
+    for i in range(batches):
+        if i == tail_start:
+            tail = time.perf_counter()
+        batch = [
+            {
+                "id": make_id(),
+                "token_hash": hashlib.sha256(os.urandom(16)).hexdigest(),
+                "created_at": now,
+            }
+            for _ in range(BATCH)
+        ]
+        await conn.execute(insert(table), batch)
+        await conn.commit()
+    end = time.perf_counter()
+    return (
+        batches * BATCH / (end - start),
+        (batches - tail_start) * BATCH / (end - tail),
+        await _index_size(conn, table),
+    )
+
+
+async def bench(url: str, rows: int) -> None:
+    engine = create_async_engine(url)
+    metadata = MetaData()
+    tables = {
+        "uuid4": (_table(metadata, "bench_pk_uuid4"), uuid.uuid4),
+        "uuid7": (_table(metadata, "bench_pk_uuid7"), uuid7),
+    }
+    print(f"{engine.dialect.name} ({rows:,} rows)")
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(metadata.create_all)
+            await conn.commit()
+            for name, (table, make_id) in tables.items():
+                overall, tail, size = await fill(conn, table, make_id, rows)
+                print(
+                    f"  {name}: {overall:9.0f} rows/s overall, {tail:9.0f} rows/s "
+                    f"last {TAIL_BATCHES * BATCH:,}, pk index {size / 2**20:8.1f} MiB"
+                )
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.drop_all)
+        await engine.dispose()
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(bench(f"sqlite+aiosqlite:///{tmp}/bench.db", rows))
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        asyncio.run(bench(os.environ["BENCH_POSTGRES_URL"], rows))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
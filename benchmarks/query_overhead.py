@@ -0,0 +1,93 @@
+"""
+Per-call Python overhead of the hot auth lookups: plain select() vs the
+cached lambda statements in app.db.queries.
+
+For each database it times ``session.execute()`` of the user-by-email
+lookup, built both ways, and reports microseconds per call. A second
+figure leaves out the round trip: it covers only building the statement
+and computing its cache key, which is the work ``lambda_stmt`` avoids.
+
+Usage:
+    python -m benchmarks.query_overhead [calls]
+
+SQLite (in-memory) always runs. Set BENCH_POSTGRES_URL
+(postgresql+asyncpg://...) to also measure against PostgreSQL; the
+``users`` table is created there if missing and the benchmark row is
+removed afterwards.
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db import queries
+from app.db.base import Base
+from app.db.models.user import User
+
+EMAIL = "bench@example.com"
+
+
+def plain(email: str):
+    return select(User).where(User.email == email)
+
+
+def build_only(make, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        make(EMAIL)._generate_cache_key()
+    return time.perf_counter() - start
+
+
+async def execute(session: AsyncSession, make, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        (await session.execute(make(EMAIL))).scalar_one()
+    return time.perf_counter() - start
+
+
+async def bench(url: str, n: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[User.__table__])
+    user_id = uuid.uuid4()
+    async with AsyncSession(engine) as session:
+        session.add(User(id=user_id, username="bench", email=EMAIL, hashed_password="x"))
+        await session.commit()
+
+    try:
+        async with AsyncSession(engine) as session:
+            # Warm up compiled caches and prepared statements
+            await execute(session, plain, 200)
+            await execute(session, queries.user_by_email, 200)
+            before = min([await execute(session, plain, n) for _ in range(3)])
+            after = min([await execute(session, queries.user_by_email, n) for _ in range(3)])
+    finally:
+        async with AsyncSession(engine) as session:
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await engine.dispose()
+
+    print(f"{engine.dialect.name} ({n} calls)")
+    print(f"  select() per call      : {before / n * 1e6:8.2f} µs")
+    print(f"  lambda_stmt per call   : {after / n * 1e6:8.2f} µs")
+    print(f"  saved per call         : {(before - after) / n * 1e6:8.2f} µs")
+
+
+def main(n: int) -> None:
+    plain_build = min(build_only(plain, n) for _ in range(3))
+    lambda_build = min(build_only(queries.user_by_email, n) for _ in range(3))
+    print(f"statement build + cache key ({n} calls)")
+    print(f"  select()               : {plain_build / n * 1e6:8.2f} µs")
+    print(f"  lambda_stmt            : {lambda_build / n * 1e6:8.2f} µs")
+
+    asyncio.run(bench("sqlite+aiosqlite:///:memory:", n))
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        asyncio.run(bench(os.environ["BENCH_POSTGRES_URL"], n))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
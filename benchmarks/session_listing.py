@@ -0,0 +1,147 @@
+"""
+Session listing page latency: OFFSET vs keyset, by page depth.
+
+One user with many unrevoked access tokens. Each page of 20 is read with
+the listing's projected SELECT, once with ``OFFSET`` and once with
+``paginate_keyset`` seeking past the previous page's last row. OFFSET
+reads and discards every earlier row, so its cost grows with the depth;
+the keyset page is one index seek on ix_access_tokens_user_id_created_at
+at any depth.
+
+Usage:
+    python -m benchmarks.session_listing [sessions]
+
+SQLite (a temporary file) always runs. Set BENCH_POSTGRES_URL
+(postgresql+asyncpg://...) to also measure against PostgreSQL; the
+benchmark user and its tokens are removed afterwards.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import Base
+from app.db.ids import uuid7
+from app.db.models.tokens import AccessToken
+from app.db.models.user import User
+from app.utils.pagination import encode_cursor, paginate_keyset
+
+PAGE = 20
+BATCH = 10_000
+RUNS = 20
+KEYS = [AccessToken.created_at, AccessToken.id]
+
+
+def _listing(user_id: uuid.UUID):
+    return select(
+        AccessToken.id,
+        AccessToken.ip_address,
+        AccessToken.device_name,
+        AccessToken.created_at,
+        AccessToken.last_used_at,
+        AccessToken.expires_at,
+    ).where(AccessToken.user_id == user_id, AccessToken.revoked.is_(False))
+
+
+async def _offset(session: AsyncSession, user_id: uuid.UUID, depth: int) -> None:
+    query = (
+        _listing(user_id)
+        .order_by(*(key.desc() for key in KEYS))
+        .offset(depth)
+        .limit(PAGE)
+    )
+    (await session.execute(query)).all()
+
+
+async def _keyset(session: AsyncSession, user_id: uuid.UUID, cursor) -> None:
+    await paginate_keyset(session, _listing(user_id), KEYS, cursor=cursor, limit=PAGE)
+
+
+async def _ms(engine, read) -> float:
+    """Best-of-RUNS latency in milliseconds."""
+    best = float("inf")
+    async with AsyncSession(engine) as session:
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            await read(session)
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def bench(url: str, n: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    tag = uuid.uuid4().hex[:8]
+    user_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+
+    try:
+        async with AsyncSession(engine) as session:
+            session.add(
+                User(
+                    id=user_id,
+                    username=f"bench-{tag}",
+                    email=f"{tag}@bench.example",
+                    hashed_password="x",
+                )
+            )
+            await session.flush()
+            for start in range(0, n, BATCH):
+                await session.execute(
+                    insert(AccessToken),
+                    [
+                        {
+                            "id": uuid7(),
+                            "user_id": user_id,
+                            "token_hash": os.urandom(32),
+                            "created_at": now - timedelta(seconds=i),
+                            "expires_at": now + timedelta(days=1),
+                            "ip_address": "203.0.113.7",
+                        }
+                        for i in range(start, min(start + BATCH, n))
+                    ],
+                )
+            await session.commit()
+            await session.execute(text("ANALYZE"))
+            # Newest first, as listed: the cursor for depth d is row d - 1
+            keys = (
+                await session.execute(
+                    select(*KEYS)
+                    .where(AccessToken.user_id == user_id)
+                    .order_by(*(key.desc() for key in KEYS))
+                )
+            ).all()
+
+        print(f"{engine.dialect.name} ({n:,} sessions, {PAGE} per page)")
+        for depth in sorted({0, n // 10, n // 2, n - PAGE}):
+            cursor = encode_cursor(keys[depth - 1]) if depth else None
+            offset = await _ms(engine, lambda s: _offset(s, user_id, depth))
+            keyset = await _ms(engine, lambda s: _keyset(s, user_id, cursor))
+            print(
+                f"  rows {depth:>7,}+: OFFSET {offset:7.2f} ms   "
+                f"keyset {keyset:6.2f} ms   ({offset / keyset:5.1f}x)"
+            )
+    finally:
+        async with AsyncSession(engine) as session:
+            await session.execute(delete(AccessToken).where(AccessToken.user_id == user_id))
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+        await engine.dispose()
+
+
+def main(n: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(bench(f"sqlite+aiosqlite:///{tmp}/bench.db", n))
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        asyncio.run(bench(os.environ["BENCH_POSTGRES_URL"], n))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,93 @@
+"""
+Token pairs issued per second: two flushes vs TokenService.issue_token_pair.
+
+Each iteration issues an access + refresh token pair for one user and
+commits, the way login does. "two flushes" is the previous
+create_access_token + create_refresh_token sequence, and "pair" is
+issue_token_pair: one flush, or one statement on PostgreSQL.
+
+Usage:
+    python -m benchmarks.token_issuance [pairs]
+
+SQLite (a temporary file) always runs. Set BENCH_POSTGRES_URL
+(postgresql+asyncpg://...) to also measure against PostgreSQL, where the
+saved round trips matter most; the benchmark user and its tokens are
+removed afterwards.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import Base
+from app.db.models.tokens import AccessToken, RefreshToken
+from app.db.models.user import User
+from app.services.token import TokenService
+
+tokens = TokenService()
+
+
+async def two_flushes(session: AsyncSession, user: User) -> None:
+    _, access = await tokens.create_access_token(user.id, user.email, session)
+    await tokens.create_refresh_token(user.id, access.id, session)
+
+
+async def pair(session: AsyncSession, user: User) -> None:
+    await tokens.issue_token_pair(user.id, user.email, session)
+
+
+async def run(engine, user: User, issue, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await issue(session, user)
+            await session.commit()
+    return n / (time.perf_counter() - start)
+
+
+async def bench(url: str, n: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    tag = uuid.uuid4().hex[:8]
+    user = User(
+        id=uuid.uuid4(),
+        username=f"bench-{tag}",
+        email=f"{tag}@bench.example",
+        hashed_password="x",
+    )
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(user)
+        await session.commit()
+
+    try:
+        await run(engine, user, pair, 50)  # warm up
+        before = max([await run(engine, user, two_flushes, n) for _ in range(3)])
+        after = max([await run(engine, user, pair, n) for _ in range(3)])
+    finally:
+        async with AsyncSession(engine) as session:
+            for model in (RefreshToken, AccessToken):
+                await session.execute(delete(model).where(model.user_id == user.id))
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
+        await engine.dispose()
+
+    print(f"{engine.dialect.name} ({n} pairs per run)")
+    print(f"  two flushes      : {before:8.0f} pairs/s")
+    print(f"  issue_token_pair : {after:8.0f} pairs/s ({after / before:.2f}x)")
+
+
+def main(n: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(bench(f"sqlite+aiosqlite:///{tmp}/bench.db", n))
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        asyncio.run(bench(os.environ["BENCH_POSTGRES_URL"], n))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
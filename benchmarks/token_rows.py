@@ -0,0 +1,149 @@
+"""
+Token row and token_hash index size: hex/inline user agent vs binary/interned.
+
+Fills two tables shaped like ``refresh_tokens``: the previous layout
+(64-char hex hash in a String column, user agent inline) and the current
+one (32-byte digest, user agent as an integer id into ``user_agents``).
+For each it reports the table and token_hash index sizes and how many
+rows fit per page.
+
+Usage:
+    python -m benchmarks.token_rows [rows]
+
+SQLite (a temporary file) always runs. Set BENCH_POSTGRES_URL
+(postgresql+asyncpg://...) to also measure against PostgreSQL; the
+benchmark tables are dropped afterwards.
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    insert,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.db.ids import uuid7
+
+BATCH = 10_000
+USER_AGENTS = [
+    f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    f"(KHTML, like Gecko) Chrome/{version}.0.0.0 Safari/537.36"
+    for version in range(100, 130)
+]
+
+metadata = MetaData()
+agents = Table(
+    "bench_user_agents",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("value", String(512), unique=True, nullable=False),
+)
+layouts = {
+    "hex + inline agent": Table(
+        "bench_tokens_hex",
+        metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("token_hash", String(512), nullable=False, unique=True, index=True),
+        Column("expires_at", TIMESTAMP(timezone=True), nullable=False),
+        Column("user_agent", String(512)),
+    ),
+    "binary + interned agent": Table(
+        "bench_tokens_bin",
+        metadata,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("token_hash", LargeBinary(32), nullable=False, unique=True, index=True),
+        Column("expires_at", TIMESTAMP(timezone=True), nullable=False),
+        Column("user_agent_id", ForeignKey("bench_user_agents.id")),
+    ),
+}
+
+
+async def _sizes(conn: AsyncConnection, table: Table):
+    """(page size, table bytes, token_hash index bytes)"""
+    index = f"ix_{table.name}_token_hash"
+    if conn.dialect.name == "postgresql":
+        page = int(await conn.scalar(text("SHOW block_size")))
+        query = text("SELECT pg_relation_size(:name)")
+        return (
+            page,
+            await conn.scalar(query, {"name": table.name}),
+            await conn.scalar(query, {"name": index}),
+        )
+    page = await conn.scalar(text("PRAGMA page_size"))
+    query = text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name")
+    return (
+        page,
+        await conn.scalar(query, {"name": table.name}),
+        await conn.scalar(query, {"name": index}),
+    )
+
+
+def _row(i: int, binary: bool) -> dict:
+    digest = hashlib.sha256(os.urandom(32))
+    row = {
+        "id": uuid7(),
+        "token_hash": digest.digest() if binary else digest.hexdigest(),
+        "expires_at": datetime.now(timezone.utc),
+    }
+    if binary:
+        row["user_agent_id"] = i % len(USER_AGENTS) + 1
+    else:
+        row["user_agent"] = USER_AGENTS[i % len(USER_AGENTS)]
+    return row
+
+
+async def bench(url: str, rows: int) -> None:
+    engine = create_async_engine(url)
+    print(f"{engine.dialect.name} ({rows:,} rows)")
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(metadata.create_all)
+            await conn.execute(
+                insert(agents),
+                [{"id": i + 1, "value": ua} for i, ua in enumerate(USER_AGENTS)],
+            )
+            await conn.commit()
+            for name, table in layouts.items():
+                binary = "user_agent_id" in table.c
+                for start in range(0, rows, BATCH):
+                    end = min(start + BATCH, rows)
+                    await conn.execute(
+                        insert(table), [_row(i, binary) for i in range(start, end)]
+                    )
+                    await conn.commit()
+                page, table_bytes, index_bytes = await _sizes(conn, table)
+                print(
+                    f"  {name:24}: "
+                    f"table {table_bytes / 2**20:7.1f} MiB "
+                    f"({rows * page / table_bytes:4.0f} rows/page), "
+                    f"token_hash index {index_bytes / 2**20:7.1f} MiB "
+                    f"({rows * page / index_bytes:4.0f} entries/page)"
+                )
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.drop_all)
+        await engine.dispose()
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(bench(f"sqlite+aiosqlite:///{tmp}/bench.db", rows))
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        asyncio.run(bench(os.environ["BENCH_POSTGRES_URL"], rows))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,53 @@
+"""
+Pick password hashing costs for this host.
+
+Measures how long one hash takes at each bcrypt cost and Argon2id time
+cost, and prints the highest settings within the latency target
+(PASSWORD_HASH_TARGET_MS, or the first argument in milliseconds). Run it on
+the deployment hardware and copy the output into .env. Users' existing
+hashes are upgraded to the new cost at their next login.
+
+Usage:
+    python calibrate_hashing.py [target_ms]
+"""
+import sys
+
+from pwdlib.exceptions import HasherNotAvailable
+
+from app.core.config import settings
+from app.core.passwords import calibrate_argon2, calibrate_bcrypt
+
+
+def main(target_ms: float) -> None:
+    print(f"Target: {target_ms:.0f} ms per hash (single hash, idle host)\n")
+    recommended = {}
+
+    rounds, measured = calibrate_bcrypt(target_ms)
+    print("bcrypt")
+    for cost, ms in measured:
+        print(f"  rounds={cost:<2} {ms:8.1f} ms{'  <- chosen' if cost == rounds else ''}")
+    recommended["BCRYPT_ROUNDS"] = rounds
+
+    memory, lanes = settings.ARGON2_MEMORY_KIB, settings.ARGON2_PARALLELISM
+    print(f"\nargon2id (memory {memory // 1024} MiB, parallelism {lanes})")
+    try:
+        time_cost, measured = calibrate_argon2(target_ms, memory, lanes)
+    except HasherNotAvailable:
+        print('  not installed: pip install "pwdlib[argon2]"')
+    else:
+        for cost, ms in measured:
+            print(f"  time_cost={cost:<2} {ms:8.1f} ms{'  <- chosen' if cost == time_cost else ''}")
+        recommended["ARGON2_TIME_COST"] = time_cost
+
+    print("\nAdd to .env:")
+    for name, value in recommended.items():
+        print(f"{name}={value}")
+    print(
+        "\nEvery login, registration and password reset pays this once per "
+        "request;\nthe hash lane of ADMISSION_LANE_LIMITS bounds how many "
+        "run at once per worker."
+    )
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else settings.PASSWORD_HASH_TARGET_MS)
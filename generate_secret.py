@@ -1,4 +1,5 @@
 import secrets
+import sys
 
 
 def generate_secret_key(length: int = 32):
@@ -6,7 +7,20 @@ def generate_secret_key(length: int = 32):
     return secrets.token_hex(length)
 
 
+def generate_debug_token():
+    """Generate a signed X-Debug-Token for the configured SECRET_KEY."""
+    from app.core.security import create_debug_token
+
+    return create_debug_token()
+
+
 if __name__ == "__main__":
+    if "--debug-token" in sys.argv:
+        token = generate_debug_token()
+        print(f"Generated X-Debug-Token (valid 24h): {token}")
+        print("\nSend it as a request header: X-Debug-Token: <token>")
+        sys.exit(0)
+
     key = generate_secret_key()
     print(f"Generated SECRET_KEY: {key}")
     print("\nCopy this to your .env file: SECRET_KEY=your-generated-key-here")
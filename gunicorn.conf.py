@@ -0,0 +1,15 @@
+"""
+Gunicorn configuration
+
+Picked up automatically by ``gunicorn`` when started from the project root
+(see ``start.sh``).
+"""
+import os
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the shared Prometheus files
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
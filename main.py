@@ -6,13 +6,20 @@ from fastapi.templating import Jinja2Templates
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
 from app.api.v1.router import router as v1_router
+from app.core.admission import AdmissionMiddleware
 from app.core.config import settings
+from app.core.deadline import DeadlineMiddleware
 from app.core.exceptions.handlers import register_exception_handlers
+from app.core.hybrid_limiter import register_route_shares
+from app.core.ip_filter import IPFilterMiddleware
 from app.core.lifespan import lifespan
 from app.core.logging import setup_early_logging
+from app.core.metrics import MetricsMiddleware, render_metrics
 from app.core.middlewares import LogRequestsMiddleware
 from app.core.openapi import custom_openapi
+from app.core.profiling import ProfilerMiddleware
 from app.core.rate_limiting import setup_rate_limiting
+from app.core.responses import TimedJSONResponse
 
 setup_early_logging()
 
@@ -21,6 +28,7 @@ app = FastAPI(
     version=settings.PROJECT_VERSION,
     debug=settings.DEBUG,
     lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
     openapi_tags=[
         {"name": "Auth", "description": "Authentication endpoints"},
         {"name": "Email", "description": "Email management endpoints"},
@@ -51,12 +59,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Inside LogRequestsMiddleware so profiles are named after the request ID
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Inside LogRequestsMiddleware so requests cancelled with 504 are still logged
+app.add_middleware(DeadlineMiddleware)
+
 app.add_middleware(LogRequestsMiddleware)
 
+# Shed load with 503 before it queues up on bcrypt; /health is never queued
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Reject blocked client ranges before any logging, DB or bcrypt work
+app.add_middleware(IPFilterMiddleware)
+
+# Outermost: request latency / in-flight metrics cover every other layer
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 register_exception_handlers(app)
 
 app.include_router(v1_router)
 
+# After the routers: strict routes are found by path
+register_route_shares(app)
+
 templates = Jinja2Templates(directory="templates")
 
 
@@ -71,7 +100,7 @@ async def root(request: Request):
 @app.get("/health")
 async def health_check():
     from app.core.responses import send_success
-    from app.db.session import engine
+    from app.db.session import engine, pool_stats
     from sqlalchemy import text
 
     db_status = "healthy"
@@ -87,10 +116,21 @@ async def health_check():
             "status": "healthy" if db_status == "healthy" else "degraded",
             "version": settings.PROJECT_VERSION,
             "database": db_status,
+            "pool": pool_stats(engine),
         },
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(
+            {"success": False, "message": "Metrics are disabled."},
+            status_code=404,
+        )
+    return render_metrics()
+
+
 @app.get("/test-report", response_class=HTMLResponse)
 async def get_test_report(request: Request):
     import os
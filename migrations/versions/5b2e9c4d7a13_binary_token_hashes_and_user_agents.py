@@ -0,0 +1,72 @@
+"""binary token hashes and interned user agents
+
+Revision ID: 5b2e9c4d7a13
+Revises: 118bd5c5d201
+Create Date: 2026-10-19 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9c4d7a13'
+down_revision: Union[str, None] = '118bd5c5d201'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOKEN_TABLES = ('access_tokens', 'refresh_tokens')
+
+
+def upgrade() -> None:
+    op.create_table('user_agents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.String(length=512), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('value')
+    )
+    op.execute(
+        "INSERT INTO user_agents (value) "
+        "SELECT user_agent FROM access_tokens WHERE user_agent IS NOT NULL "
+        "UNION "
+        "SELECT user_agent FROM refresh_tokens WHERE user_agent IS NOT NULL"
+    )
+
+    for table in TOKEN_TABLES:
+        op.add_column(table, sa.Column('user_agent_id', sa.Integer(), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET user_agent_id = user_agents.id "
+            f"FROM user_agents WHERE user_agents.value = {table}.user_agent"
+        )
+        op.create_foreign_key(
+            f'{table}_user_agent_id_fkey', table, 'user_agents', ['user_agent_id'], ['id']
+        )
+        op.drop_column(table, 'user_agent')
+
+        # 64-char hex -> raw 32-byte digest; the unique index is rebuilt
+        op.alter_column(table, 'token_hash',
+               existing_type=sa.String(length=512),
+               type_=sa.LargeBinary(length=32),
+               existing_nullable=False,
+               postgresql_using="decode(token_hash, 'hex')")
+
+
+def downgrade() -> None:
+    for table in TOKEN_TABLES:
+        op.alter_column(table, 'token_hash',
+               existing_type=sa.LargeBinary(length=32),
+               type_=sa.String(length=512),
+               existing_nullable=False,
+               postgresql_using="encode(token_hash, 'hex')")
+
+        op.add_column(table, sa.Column('user_agent', sa.String(length=512), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET user_agent = user_agents.value "
+            f"FROM user_agents WHERE user_agents.id = {table}.user_agent_id"
+        )
+        op.drop_constraint(f'{table}_user_agent_id_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'user_agent_id')
+
+    op.drop_table('user_agents')
@@ -0,0 +1,50 @@
+"""add token and cache indexes
+
+Revision ID: a3f1c8e2d946
+Revises: 5b2e9c4d7a13
+Create Date: 2026-10-19 12:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c8e2d946'
+down_revision: Union[str, None] = '5b2e9c4d7a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction and does not
+    # block writes to the (large, busy) token tables while it builds
+    with op.get_context().autocommit_block():
+        op.create_index('ix_access_tokens_user_id_unrevoked', 'access_tokens', ['user_id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True,
+                        postgresql_where=sa.text('revoked IS false'))
+        op.create_index(op.f('ix_access_tokens_expires_at'), 'access_tokens', ['expires_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_password_reset_tokens_user_id_created_at', 'password_reset_tokens',
+                        ['user_id', sa.text('created_at DESC')],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_cache_entries_expires_at'), 'cache_entries', ['expires_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_cache_entries_expires_at'), table_name='cache_entries',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_password_reset_tokens_user_id_created_at', table_name='password_reset_tokens',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_access_tokens_expires_at'), table_name='access_tokens',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_access_tokens_user_id_unrevoked', table_name='access_tokens',
+                      postgresql_concurrently=True, if_exists=True)
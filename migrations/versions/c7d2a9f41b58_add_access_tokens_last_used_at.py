@@ -0,0 +1,27 @@
+"""add access_tokens last_used_at
+
+Revision ID: c7d2a9f41b58
+Revises: a3f1c8e2d946
+Create Date: 2026-10-19 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2a9f41b58'
+down_revision: Union[str, None] = 'a3f1c8e2d946'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: a catalog-only change, no table rewrite
+    op.add_column('access_tokens', sa.Column('last_used_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('access_tokens', 'last_used_at')
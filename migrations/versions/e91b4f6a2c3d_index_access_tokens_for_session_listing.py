@@ -0,0 +1,39 @@
+"""index access_tokens for session listing
+
+Revision ID: e91b4f6a2c3d
+Revises: c7d2a9f41b58
+Create Date: 2026-10-19 15:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b4f6a2c3d'
+down_revision: Union[str, None] = 'c7d2a9f41b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The new index leads with user_id under the same predicate, so it also
+    # serves everything the old one did; build it before dropping the old one
+    with op.get_context().autocommit_block():
+        op.create_index('ix_access_tokens_user_id_created_at', 'access_tokens',
+                        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True,
+                        postgresql_where=sa.text('revoked IS false'))
+        op.drop_index('ix_access_tokens_user_id_unrevoked', table_name='access_tokens',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_access_tokens_user_id_unrevoked', 'access_tokens', ['user_id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True,
+                        postgresql_where=sa.text('revoked IS false'))
+        op.drop_index('ix_access_tokens_user_id_created_at', table_name='access_tokens',
+                      postgresql_concurrently=True, if_exists=True)
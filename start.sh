@@ -5,5 +5,10 @@ echo "🚀 Starting deployment process..."
 echo "🧩 Running Alembic migrations..."
 python -m alembic upgrade head
 
+echo "📊 Preparing Prometheus multiprocess directory..."
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "🔥 Starting Gunicorn server..."
 exec gunicorn -k uvicorn.workers.UvicornWorker main:app --bind 0.0.0.0:$PORT
@@ -6,6 +6,7 @@ Uses SQLite in-memory database for fast, isolated tests
 import asyncio
 import pytest
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import AsyncGenerator
 
@@ -14,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.pool import StaticPool
 
 from app.db.base import Base
+from app.db.events import capture_queries, run_after_commit, session_has_writes
 from app.core.config import Settings
 from main import app
 from app.core.dependencies import get_db
@@ -96,7 +98,11 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     """Create test client with database override"""
 
     async def override_get_db():
+        # Commits like get_db, so after-commit work runs as in production
         yield db_session
+        if session_has_writes(db_session):
+            await db_session.commit()
+        await run_after_commit(db_session)
 
     app.dependency_overrides[get_db] = override_get_db
 
@@ -194,3 +200,24 @@ async def admin_token(admin_user: User, db_session: AsyncSession) -> str:
     return access_token
 
 
+# Query budget fixture
+@pytest.fixture
+def assert_max_queries():
+    """
+    Fail if the block issues more SQL statements than allowed.
+
+    Usage:
+        with assert_max_queries(2):
+            await client.get("/api/v1/auth/me", headers=...)
+    """
+
+    @contextmanager
+    def _assert_max_queries(limit: int):
+        with capture_queries() as statements:
+            yield statements
+        assert len(statements) <= limit, (
+            f"Expected at most {limit} queries, got {len(statements)}:\n"
+            + "\n".join(f"  {' '.join(s.split())}" for s in statements)
+        )
+
+    return _assert_max_queries
@@ -0,0 +1,192 @@
+"""
+Tests for admission control
+"""
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    Lane,
+    OverloadedError,
+)
+from app.core.security import create_access_token
+
+
+def _scope(path="/api/v1/auth/login", method="POST", headers=()):
+    return {"type": "http", "path": path, "method": method, "headers": list(headers)}
+
+
+async def _call(middleware, scope):
+    """Run the middleware and return (status, headers)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict(start.get("headers", []))
+
+
+class _SlowApp:
+    """Downstream app holding its slot until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.running = 0
+
+    async def __call__(self, scope, receive, send):
+        self.running += 1
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+class TestLane:
+    """Concurrency cap, bounded queue and deadlines"""
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejected(self):
+        lane = Lane("hash", limit=1, queue_size=1, timeout=5)
+        await lane.acquire()
+        waiter = asyncio.create_task(lane.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(OverloadedError) as exc:
+            await lane.acquire()
+        assert exc.value.reason == "queue_full"
+
+        lane.release()
+        await waiter  # the slot was handed to the queued request
+        assert lane.active == 1 and lane.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_deadline(self):
+        lane = Lane("hash", limit=1, queue_size=5, timeout=0.05)
+        await lane.acquire()
+
+        with pytest.raises(OverloadedError) as exc:
+            await lane.acquire()
+        assert exc.value.reason == "timeout"
+        assert exc.value.retry_after >= 1
+        assert lane.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_predicted_wait_sheds_immediately(self):
+        lane = Lane("hash", limit=1, queue_size=5, timeout=1)
+        lane.avg_service = 2.0  # each request holds the slot ~2s
+        await lane.acquire()
+
+        with pytest.raises(OverloadedError) as exc:
+            await lane.acquire()
+        assert exc.value.reason == "predicted"
+        assert exc.value.retry_after == 2
+
+    @pytest.mark.asyncio
+    async def test_release_updates_service_time(self):
+        lane = Lane("default", limit=2, queue_size=1, timeout=1)
+        await lane.acquire()
+        lane.release(1.0)
+        assert lane.active == 0
+        assert lane.avg_service == pytest.approx(Lane.SMOOTHING)
+
+
+class TestAdmissionMiddleware:
+    """Hash routes are capped; priority requests have their own lane"""
+
+    @pytest.fixture
+    def controller(self):
+        controller = AdmissionController()
+        controller.lanes["hash"] = Lane("hash", limit=1, queue_size=0, timeout=1)
+        return controller
+
+    @pytest.mark.asyncio
+    async def test_hash_route_shed_with_retry_after(self, controller):
+        app = _SlowApp()
+        middleware = AdmissionMiddleware(app, controller)
+
+        first = asyncio.create_task(_call(middleware, _scope()))
+        await asyncio.sleep(0)
+        status, headers = await _call(middleware, _scope())
+
+        assert status == 503
+        assert b"retry-after" in headers
+        app.release.set()
+        assert (await first)[0] == 200
+
+    @pytest.mark.asyncio
+    async def test_priority_requests_not_held_back(self, controller):
+        app = _SlowApp()
+        middleware = AdmissionMiddleware(app, controller)
+        controller.lanes["default"] = Lane("default", limit=1, queue_size=0, timeout=1)
+        token = create_access_token({"sub": "user@example.com"})
+
+        busy = asyncio.create_task(_call(middleware, _scope("/api/v1/email/test", "GET")))
+        await asyncio.sleep(0)
+        health = asyncio.create_task(_call(middleware, _scope("/health", "GET")))
+        me = asyncio.create_task(
+            _call(
+                middleware,
+                _scope(
+                    "/api/v1/auth/me",
+                    "GET",
+                    [(b"authorization", f"Bearer {token}".encode())],
+                ),
+            )
+        )
+        await asyncio.sleep(0)
+        assert app.running == 3  # the full default lane did not hold them back
+        assert controller.lanes["priority"].active == 1
+
+        app.release.set()
+        assert [(await t)[0] for t in (busy, health, me)] == [200, 200, 200]
+
+    @pytest.mark.asyncio
+    async def test_priority_lane_is_bounded(self, controller):
+        app = _SlowApp()
+        middleware = AdmissionMiddleware(app, controller)
+        controller.lanes["priority"] = Lane("priority", limit=1, queue_size=0, timeout=1)
+        # Signed but possibly revoked: the signature alone earns no unbounded pass
+        token = create_access_token({"sub": "user@example.com"})
+        scope = _scope(
+            "/api/v1/auth/me", "GET", [(b"authorization", f"Bearer {token}".encode())]
+        )
+
+        first = asyncio.create_task(_call(middleware, scope))
+        await asyncio.sleep(0)
+        status, headers = await _call(middleware, scope)
+
+        assert status == 503
+        assert b"retry-after" in headers
+        app.release.set()
+        assert (await first)[0] == 200
+
+    def test_forged_token_is_not_priority(self, controller):
+        scope = _scope(
+            "/api/v1/auth/me", "GET", [(b"authorization", b"Bearer forged.token.value")]
+        )
+        assert controller.lane_for(scope) is controller.lanes["default"]
+
+    def test_routes_mapped_to_hash_lane(self, controller):
+        # Every route that hashes or checks a password or verification code
+        for route in (
+            "login",
+            "register",
+            "verify",
+            "resend_verification_code",
+            "forgot-password",
+            "reset-password",
+        ):
+            scope = _scope(f"/api/v1/auth/{route}")
+            assert controller.lane_for(scope) is controller.lanes["hash"]
+
+    @pytest.mark.asyncio
+    async def test_app_requests_pass(self, client: AsyncClient):
+        response = await client.get("/health")
+        assert response.status_code == 200
@@ -0,0 +1,125 @@
+"""
+Tests for the request database session (get_db)
+"""
+import uuid
+
+import pytest
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import dependencies
+from app.core.dependencies import get_db
+from app.db.models.user import User
+
+
+@pytest.fixture
+def commits(engine, monkeypatch):
+    """Route get_db to the test engine and count COMMITs it issues."""
+    monkeypatch.setattr(
+        dependencies,
+        "SessionLocal",
+        async_sessionmaker(engine, autocommit=False, autoflush=False),
+    )
+    issued = []
+
+    def _commit(conn):
+        issued.append(conn)
+
+    event.listen(engine.sync_engine, "commit", _commit)
+    yield issued
+    event.remove(engine.sync_engine, "commit", _commit)
+
+
+async def _run(handler):
+    """Drive get_db like FastAPI does, returning the session it yielded."""
+    dependency = get_db()
+    session = await dependency.__anext__()
+    try:
+        await handler(session)
+    except Exception as e:
+        with pytest.raises(type(e)):
+            await dependency.athrow(e)
+    else:
+        with pytest.raises(StopAsyncIteration):
+            await dependency.__anext__()
+    return session
+
+
+def _user(**overrides):
+    values = dict(
+        id=uuid.uuid4(),
+        username="session-user",
+        email="session@example.com",
+        hashed_password="x",
+    )
+    values.update(overrides)
+    return User(**values)
+
+
+class TestGetDb:
+    """Connections are checked out lazily and COMMIT only follows writes"""
+
+    @pytest.mark.asyncio
+    async def test_unused_session_never_connects(self, commits, engine):
+        begun = []
+
+        def _begin(conn):
+            begun.append(conn)
+
+        event.listen(engine.sync_engine, "begin", _begin)
+
+        async def handler(session):
+            pass
+
+        try:
+            session = await _run(handler)
+        finally:
+            event.remove(engine.sync_engine, "begin", _begin)
+        assert begun == [] and commits == []
+        assert "connection_hold" not in session.info
+
+    @pytest.mark.asyncio
+    async def test_read_only_request_skips_commit(self, commits):
+        async def handler(session):
+            await session.execute(select(User))
+
+        session = await _run(handler)
+        assert commits == []
+        assert "connection_hold" not in session.info  # reported and cleared
+
+    @pytest.mark.asyncio
+    async def test_pending_objects_are_committed(self, commits, engine):
+        async def handler(session):
+            session.add(_user())
+
+        await _run(handler)
+        assert len(commits) == 1
+
+        async with async_sessionmaker(engine)() as check:
+            assert (await check.execute(select(User))).scalar_one().username == "session-user"
+
+    @pytest.mark.asyncio
+    async def test_bulk_statements_are_committed(self, commits):
+        async def handler(session):
+            await session.execute(update(User).values(is_active=False))
+
+        await _run(handler)
+        assert len(commits) == 1
+
+    @pytest.mark.asyncio
+    async def test_error_rolls_back(self, commits, engine):
+        async def handler(session):
+            session.add(_user())
+            await session.flush()
+            raise RuntimeError("boom")
+
+        await _run(handler)
+        assert commits == []
+
+        async with async_sessionmaker(engine)() as check:
+            assert (await check.execute(select(User))).first() is None
+
+    def test_objects_not_expired_on_commit(self):
+        from app.db.session import SessionLocal
+
+        assert SessionLocal.kw["expire_on_commit"] is False
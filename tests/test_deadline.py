@@ -0,0 +1,190 @@
+"""
+Tests for request deadlines
+"""
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.core import deadline
+from app.core.deadline import DeadlineMiddleware, budget, remaining, start_deadline
+from app.db.events import _apply_statement_timeout
+from app.utils.caching import Cache
+
+
+def _scope(headers=()):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/slow",
+        "headers": list(headers),
+    }
+
+
+async def _call(app, scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+class TestBudget:
+    """Remaining time and downstream budgets"""
+
+    def test_no_deadline_outside_requests(self):
+        assert remaining() is None
+        assert budget() is None
+        assert budget(5) == 5
+
+    @pytest.mark.asyncio
+    async def test_budget_capped_by_deadline(self):
+        start_deadline(0.5)
+        assert 0 < remaining() <= 0.5
+        assert budget(10) <= 0.5
+        assert budget(0.1) == 0.1
+
+    def test_header_can_only_lower_deadline(self, monkeypatch):
+        monkeypatch.setattr(deadline.settings, "REQUEST_TIMEOUT_SECONDS", 30)
+        assert deadline._requested_timeout(_scope([(b"x-request-timeout", b"2.5")])) == 2.5
+        assert deadline._requested_timeout(_scope([(b"x-request-timeout", b"300")])) == 30
+        assert deadline._requested_timeout(_scope([(b"x-request-timeout", b"abc")])) == 30
+        assert deadline._requested_timeout(_scope([(b"x-request-timeout", b"-1")])) == 30
+
+
+class TestDeadlineMiddleware:
+    """Slow handlers are cancelled; finished responses are left alone"""
+
+    @pytest.mark.asyncio
+    async def test_slow_handler_cancelled_with_504(self):
+        cancelled = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        middleware = DeadlineMiddleware(slow_app)
+        messages = await _call(middleware, _scope([(b"x-request-timeout", b"0.05")]))
+
+        assert messages[0]["status"] == 504
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_background_work_outlives_deadline(self):
+        finished = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+            # Background task after the response was sent
+            assert remaining() is None
+            await asyncio.sleep(0.1)
+            finished.set()
+
+        middleware = DeadlineMiddleware(app)
+        messages = await _call(middleware, _scope([(b"x-request-timeout", b"0.05")]))
+
+        assert messages[0]["status"] == 200
+        assert finished.is_set()
+
+    @pytest.mark.asyncio
+    async def test_handler_timeouts_are_not_turned_into_504(self):
+        async def app(scope, receive, send):
+            async with asyncio.timeout(0.01):
+                await asyncio.sleep(1)
+
+        with pytest.raises(TimeoutError):
+            await _call(DeadlineMiddleware(app), _scope())
+
+    @pytest.mark.asyncio
+    async def test_app_requests_pass(self, client: AsyncClient):
+        response = await client.get("/health", headers={"X-Request-Timeout": "5"})
+        assert response.status_code == 200
+
+
+class _FakeDialect:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeConnection:
+    def __init__(self, dialect):
+        self.dialect = _FakeDialect(dialect)
+        self.statements = []
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+
+class TestStatementTimeout:
+    """Transactions inherit the remaining budget on PostgreSQL"""
+
+    @pytest.mark.asyncio
+    async def test_set_local_on_postgres(self):
+        start_deadline(2)
+        connection = _FakeConnection("postgresql")
+        _apply_statement_timeout(None, None, connection)
+
+        [statement] = connection.statements
+        assert statement.startswith("SET LOCAL statement_timeout = ")
+        assert 0 < int(statement.rsplit(" ", 1)[1]) <= 2000
+
+    @pytest.mark.asyncio
+    async def test_skipped_without_deadline_or_on_sqlite(self):
+        connection = _FakeConnection("postgresql")
+        _apply_statement_timeout(None, None, connection)
+        assert connection.statements == []
+
+        start_deadline(2)
+        connection = _FakeConnection("sqlite")
+        _apply_statement_timeout(None, None, connection)
+        assert connection.statements == []
+
+
+class _StuckRedis:
+    async def get(self, key):
+        await asyncio.sleep(5)
+
+    async def set(self, key, value, ex=None):
+        await asyncio.sleep(5)
+
+
+class _SlowRedis:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete(self, key):
+        await asyncio.sleep(0.1)
+        self.deleted.append(key)
+
+
+class TestCacheBudget:
+    """A stuck Redis is a cache miss once the deadline runs out"""
+
+    @pytest.mark.asyncio
+    async def test_stuck_redis_is_a_miss(self):
+        cache = Cache()
+        cache.cache_type = "redis"
+        cache._redis = _StuckRedis()
+        start_deadline(0.05)
+
+        assert await cache.get("key") is None
+        await cache.set("key", {"a": 1})  # skipped rather than raising
+
+    @pytest.mark.asyncio
+    async def test_invalidation_outlives_deadline(self):
+        cache = Cache()
+        cache.cache_type = "redis"
+        cache._redis = _SlowRedis()
+        start_deadline(0.01)
+
+        await cache.invalidate("key")
+        assert cache._redis.deleted == ["key"]
@@ -0,0 +1,111 @@
+"""
+Tests for the admin memory diagnostics endpoints
+"""
+import threading
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.security import create_debug_token
+from app.utils.memory import memory_profiler
+
+BASE = "/api/v1/diagnostics/memory"
+
+
+@pytest.fixture
+def debug_headers():
+    return {"X-Debug-Token": create_debug_token()}
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    memory_profiler.stop()
+    memory_profiler._next_dump_rss = None
+
+
+class TestDiagnosticsAccess:
+    """Diagnostics are admin only"""
+
+    @pytest.mark.asyncio
+    async def test_requires_debug_token(self, client: AsyncClient):
+        response = await client.get(f"{BASE}/gc")
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_rejects_bearer_token(self, client: AsyncClient, auth_token: str):
+        """A normal user's access token is not enough"""
+        response = await client.get(
+            f"{BASE}/gc", headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 403
+
+
+class TestMemoryDiagnostics:
+    """Test tracemalloc snapshots, diffs and gc statistics"""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_diff_groups_by_line(
+        self, client: AsyncClient, debug_headers
+    ):
+        """Allocations made between snapshots show up as file:line growth"""
+        await client.post(f"{BASE}/tracemalloc/start", headers=debug_headers)
+        await client.post(f"{BASE}/snapshots?name=before", headers=debug_headers)
+
+        leak = [bytearray(1024) for _ in range(2000)]  # ~2 MB at this line
+
+        await client.post(f"{BASE}/snapshots?name=after", headers=debug_headers)
+        response = await client.get(
+            f"{BASE}/diff?base=before&target=after&limit=5", headers=debug_headers
+        )
+
+        assert response.status_code == 200
+        top = response.json()["data"][0]
+        assert "test_diagnostics.py" in top["location"]
+        assert top["size_diff_kb"] >= 1900
+        del leak
+
+    @pytest.mark.asyncio
+    async def test_snapshot_requires_tracing(self, client: AsyncClient, debug_headers):
+        response = await client.post(f"{BASE}/snapshots?name=x", headers=debug_headers)
+        assert response.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_unknown_snapshot_404(self, client: AsyncClient, debug_headers):
+        await client.post(f"{BASE}/tracemalloc/start", headers=debug_headers)
+        response = await client.get(f"{BASE}/diff?base=missing", headers=debug_headers)
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_gc_stats(self, client: AsyncClient, debug_headers):
+        response = await client.get(f"{BASE}/gc?limit=5", headers=debug_headers)
+
+        data = response.json()["data"]
+        assert response.status_code == 200
+        assert len(data["gc_counts"]) == 3
+        assert len(data["object_types"]) == 5
+        assert data["rss_mb"] > 0
+
+    @pytest.mark.asyncio
+    async def test_heap_walks_run_off_the_event_loop(
+        self, client: AsyncClient, debug_headers, monkeypatch
+    ):
+        threads = []
+
+        def gc_stats(limit):
+            threads.append(threading.current_thread())
+            return {}
+
+        monkeypatch.setattr(memory_profiler, "gc_stats", gc_stats)
+        response = await client.get(f"{BASE}/gc", headers=debug_headers)
+
+        assert response.status_code == 200
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_dump_if_over_threshold(self, tmp_path):
+        """Crossing the RSS threshold writes a report, then re-arms higher"""
+        first = memory_profiler.dump_if_over(1, str(tmp_path))
+        second = memory_profiler.dump_if_over(1, str(tmp_path))
+
+        assert len(first) == 1 and first[0].endswith(".json")
+        assert second == []
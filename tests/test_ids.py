@@ -0,0 +1,59 @@
+"""
+Tests for time-ordered UUIDv7 primary keys
+"""
+import time
+import uuid
+
+import jwt
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import ids
+from app.db.ids import uuid7
+from app.db.models.user import User
+from app.services.token import TokenService
+
+
+class TestUuid7:
+    """RFC 9562 layout and ordering"""
+
+    def test_version_and_variant(self):
+        value = uuid7()
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+    def test_embeds_current_time(self):
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+        assert before <= value.int >> 80 <= after + 1
+
+    def test_strictly_increasing(self):
+        values = [uuid7() for _ in range(10_000)]
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
+
+    def test_increasing_when_clock_steps_back(self, monkeypatch):
+        first = uuid7()
+        monkeypatch.setattr(ids.time, "time_ns", lambda: 0)
+        assert uuid7() > first
+
+
+class TestDefaults:
+    """New rows and token jti use UUIDv7"""
+
+    @pytest.mark.asyncio
+    async def test_new_user_id(self, db_session: AsyncSession):
+        user = User(username="ordered", email="ordered@example.com", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        assert user.id.version == 7
+
+    @pytest.mark.asyncio
+    async def test_token_ids(self, db_session: AsyncSession, test_user: User):
+        access, refresh = await TokenService().issue_token_pair(
+            test_user.id, test_user.email, db_session
+        )
+        for token in (access, refresh):
+            payload = jwt.decode(token, options={"verify_signature": False})
+            assert uuid.UUID(payload["jti"]).version == 7
@@ -0,0 +1,169 @@
+"""
+Tests that the hot TokenService / AuthService queries are served by an index
+
+Each statement is run under ``EXPLAIN QUERY PLAN`` on the test database
+and the plan must search the expected index instead of scanning the table.
+"""
+import inspect
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import queries
+from app.db.models.cache import CacheEntry
+from app.db.models.tokens import AccessToken, PasswordResetToken, RefreshToken
+from app.db.models.user import User
+from app.services.token import TokenService
+
+
+@pytest.fixture
+def query_plan(db_session: AsyncSession):
+    """
+    Return a coroutine giving the SQLite query plan of a statement, or of
+    everything a service coroutine runs.
+    """
+
+    async def plan(statement) -> str:
+        conn = await db_session.connection()
+        details = []
+
+        def explain(conn, cursor, sql, parameters, context, executemany):
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            # (id, parent, notused, detail)
+            details.extend(row[3] for row in cursor.fetchall())
+
+        event.listen(conn.sync_engine, "before_cursor_execute", explain)
+        try:
+            if inspect.iscoroutine(statement):
+                await statement
+            else:
+                await conn.execute(statement)
+        finally:
+            event.remove(conn.sync_engine, "before_cursor_execute", explain)
+        return "\n".join(details)
+
+    return plan
+
+
+def assert_uses_index(plan: str, index: str):
+    assert f"INDEX {index}" in plan, plan
+    assert "SCAN" not in plan, plan
+
+
+class TestTokenServiceIndexes:
+    """TokenService lookups, revocation and cleanup"""
+
+    @pytest.mark.asyncio
+    async def test_access_token_by_id(self, query_plan):
+        plan = await query_plan(queries.access_token_by_id(uuid.uuid4(), bytes(32)))
+        # Either unique index (primary key or token_hash) finds the one row
+        assert_uses_index(plan, "")
+        assert "sqlite_autoindex_access_tokens_1" in plan or "ix_access_tokens_token_hash" in plan
+
+    @pytest.mark.asyncio
+    async def test_refresh_token_by_id(self, query_plan):
+        plan = await query_plan(queries.refresh_token_by_id(uuid.uuid4(), bytes(32)))
+        # Either unique index (primary key or token_hash) finds the one row
+        assert_uses_index(plan, "")
+        assert "sqlite_autoindex_refresh_tokens_1" in plan or "ix_refresh_tokens_token_hash" in plan
+
+    @pytest.mark.asyncio
+    async def test_revoke_by_hash(self, query_plan):
+        plan = await query_plan(
+            select(AccessToken).where(AccessToken.token_hash == bytes(32))
+        )
+        assert_uses_index(plan, "ix_access_tokens_token_hash")
+
+    @pytest.mark.asyncio
+    async def test_revoke_all_uses_partial_index(
+        self, query_plan, db_session: AsyncSession, test_user: User
+    ):
+        # Mostly revoked tokens, as in production: with statistics the
+        # planner prefers the smaller unrevoked-only index over the full
+        # user_id index (otherwise the two tie)
+        token_service = TokenService()
+        for _ in range(10):
+            await token_service.issue_token_pair(test_user.id, test_user.email, db_session)
+        await token_service.revoke_all_user_tokens(test_user.id, db_session)
+        await token_service.issue_token_pair(test_user.id, test_user.email, db_session)
+        await db_session.execute(text("ANALYZE"))
+
+        plan = await query_plan(
+            select(AccessToken).where(
+                AccessToken.user_id == test_user.id, AccessToken.revoked.is_(False)
+            )
+        )
+        assert_uses_index(plan, "ix_access_tokens_user_id_created_at")
+
+    @pytest.mark.asyncio
+    async def test_session_listing_page(
+        self, query_plan, db_session: AsyncSession, test_user: User
+    ):
+        token_service = TokenService()
+        for _ in range(10):
+            await token_service.issue_token_pair(test_user.id, test_user.email, db_session)
+        await db_session.execute(text("ANALYZE"))
+        first = await token_service.list_sessions(test_user.id, db_session, limit=3)
+
+        plan = await query_plan(
+            token_service.list_sessions(
+                test_user.id, db_session, cursor=first["next_cursor"], limit=3
+            )
+        )
+        assert_uses_index(plan, "ix_access_tokens_user_id_created_at")
+        # A seek into the index, already in page order: no OFFSET, no sort
+        assert "TEMP B-TREE" not in plan, plan
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("model", [AccessToken, RefreshToken])
+    async def test_cleanup_expired(self, query_plan, model):
+        plan = await query_plan(
+            select(model).where(model.expires_at < datetime.now(timezone.utc))
+        )
+        assert_uses_index(plan, f"ix_{model.__tablename__}_expires_at")
+
+    @pytest.mark.asyncio
+    async def test_user_agent_id(self, query_plan):
+        plan = await query_plan(queries.user_agent_id("Mozilla/5.0"))
+        assert_uses_index(plan, "sqlite_autoindex_user_agents_1")
+
+
+class TestAuthServiceIndexes:
+    """AuthService user and password-reset lookups"""
+
+    @pytest.mark.asyncio
+    async def test_user_by_email(self, query_plan):
+        plan = await query_plan(queries.user_by_email("a@example.com"))
+        assert_uses_index(plan, "ix_users_email")
+
+    @pytest.mark.asyncio
+    async def test_username_or_email(self, query_plan):
+        plan = await query_plan(
+            select(User).where(
+                (User.username == "a") | (User.email == "a@example.com")
+            )
+        )
+        assert "ix_users_username" in plan and "ix_users_email" in plan, plan
+        assert "SCAN" not in plan, plan
+
+    @pytest.mark.asyncio
+    async def test_latest_reset_token(self, query_plan):
+        plan = await query_plan(
+            select(PasswordResetToken)
+            .where(PasswordResetToken.user_id == uuid.uuid4())
+            .order_by(PasswordResetToken.created_at.desc())
+            .limit(1)
+        )
+        assert_uses_index(plan, "ix_password_reset_tokens_user_id_created_at")
+        # Rows come out of the index already ordered
+        assert "TEMP B-TREE" not in plan, plan
+
+    @pytest.mark.asyncio
+    async def test_cache_entry_expiry(self, query_plan):
+        plan = await query_plan(
+            select(CacheEntry).where(CacheEntry.expires_at <= datetime.now(timezone.utc))
+        )
+        assert_uses_index(plan, "ix_cache_entries_expires_at")
@@ -0,0 +1,118 @@
+"""
+Tests for client address resolution and the IP block/allow lists
+"""
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from app.core import ip_filter as ip_filter_module
+from app.core.ip_filter import CIDRTree, IPFilter, resolve_client_ip
+
+
+@pytest.fixture
+def trusted():
+    tree = CIDRTree()
+    tree.insert("10.0.0.0/8")
+    tree.insert("fd00::/8")
+    return tree
+
+
+class TestCIDRTree:
+    """Longest-prefix lookups over IPv4 and IPv6"""
+
+    def test_longest_prefix_wins(self):
+        tree = CIDRTree()
+        tree.insert("203.0.113.0/24", "block")
+        tree.insert("203.0.113.8/32", "allow")
+
+        assert tree.lookup("203.0.113.7") == "block"
+        assert tree.lookup("203.0.113.8") == "allow"
+        assert tree.lookup("198.51.100.1") is None
+
+    def test_ipv6_and_mapped_ipv4(self):
+        tree = CIDRTree()
+        tree.insert("2001:db8::/32", "block")
+        tree.insert("192.0.2.0/24", "block")
+
+        assert tree.lookup("2001:db8::1") == "block"
+        assert tree.lookup("2001:db9::1") is None
+        assert tree.lookup("::ffff:192.0.2.5") == "block"
+
+    def test_default_route_and_garbage(self):
+        tree = CIDRTree()
+        tree.insert("0.0.0.0/0", "block")
+
+        assert tree.lookup("8.8.8.8") == "block"
+        assert tree.lookup("::1") is None
+        assert tree.lookup("not-an-ip") is None
+        assert len(tree) == 1
+
+
+class TestResolveClientIp:
+    """X-Forwarded-For is walked right to left through trusted proxies"""
+
+    def test_untrusted_peer_ignores_header(self, trusted):
+        assert resolve_client_ip("198.51.100.20", "203.0.113.7", trusted) == "198.51.100.20"
+
+    def test_spoofed_leftmost_entry_is_ignored(self, trusted):
+        forwarded = "1.2.3.4, 203.0.113.7, 10.0.0.9"
+        assert resolve_client_ip("10.0.0.2", forwarded, trusted) == "203.0.113.7"
+
+    def test_ipv6_proxies(self, trusted):
+        assert resolve_client_ip("fd00::2", "2001:db8::7, fd00::3", trusted) == "2001:db8::7"
+
+    def test_no_header(self, trusted):
+        assert resolve_client_ip("10.0.0.2", None, trusted) == "10.0.0.2"
+
+    def test_all_hops_trusted(self, trusted):
+        assert resolve_client_ip("10.0.0.2", "10.1.1.1", trusted) == "10.1.1.1"
+
+
+class TestIPFilterReload:
+    """Rules file changes apply without a restart"""
+
+    def test_reloads_changed_file(self, tmp_path):
+        rules = tmp_path / "ip_rules.txt"
+        rules.write_text("block 203.0.113.0/24  # scrapers\n")
+        ip_filter = IPFilter(str(rules), reload_seconds=0)
+        assert ip_filter.is_blocked("203.0.113.7")
+
+        rules.write_text("block 203.0.113.0/24\nallow 203.0.113.7\ntrust 10.0.0.0/8\n")
+        os.utime(rules, (0, 1))  # mtime resolution can hide a quick rewrite
+        ip_filter.maybe_reload()
+
+        assert not ip_filter.is_blocked("203.0.113.7")
+        assert ip_filter.is_blocked("203.0.113.8")
+        assert "10.1.2.3" in ip_filter.trusted
+
+    def test_bad_entries_are_skipped(self, tmp_path):
+        rules = tmp_path / "ip_rules.txt"
+        rules.write_text("block nonsense\npermit 1.2.3.4\nblock 192.0.2.1\n")
+        ip_filter = IPFilter(str(rules))
+        assert len(ip_filter.rules) == 1
+
+
+class TestIPFilterMiddleware:
+    """Blocked clients never reach the application"""
+
+    @pytest.mark.asyncio
+    async def test_blocked_client_rejected(self, client: AsyncClient, monkeypatch):
+        rules = CIDRTree()
+        rules.insert("127.0.0.0/8", "block")
+        monkeypatch.setattr(ip_filter_module.ip_filter, "rules", rules)
+
+        response = await client.get("/health")
+
+        assert response.status_code == 403
+        assert response.json()["success"] is False
+
+    @pytest.mark.asyncio
+    async def test_other_clients_pass(self, client: AsyncClient, monkeypatch):
+        rules = CIDRTree()
+        rules.insert("203.0.113.0/24", "block")
+        monkeypatch.setattr(ip_filter_module.ip_filter, "rules", rules)
+
+        response = await client.get("/health")
+
+        assert response.status_code == 200
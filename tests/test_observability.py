@@ -0,0 +1,398 @@
+"""
+Tests for request observability
+
+Covers the per-request timing breakdown, the Server-Timing header, the
+Prometheus /metrics endpoint, SQL statement instrumentation and the
+on-demand request profiler and the event-loop lag monitor.
+"""
+import asyncio
+import contextvars
+import time
+
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import profiling
+from app.core.loop_monitor import LoopLagMonitor
+from app.db import events
+
+from app.core.security import create_debug_token
+from app.core.timing import get_request_timings, start_request_timings, track
+from app.db.models.user import User
+
+
+class TestRequestTimings:
+    """Test the context-local timing accumulator"""
+
+    def test_track_outside_request_is_noop(self):
+        """track() does nothing when no request timings are bound"""
+
+        def run():
+            with track("db"):
+                pass
+            return get_request_timings()
+
+        assert contextvars.Context().run(run) is None
+
+    def test_track_accumulates(self):
+        """Repeated blocks add up under one name with a call count"""
+
+        def run():
+            timings = start_request_timings()
+            with track("cache"):
+                pass
+            with track("cache"):
+                pass
+            assert get_request_timings() is timings
+            return timings
+
+        timings = contextvars.copy_context().run(run)
+        assert timings.counts["cache"] == 2
+        assert "cache" in timings.as_dict()
+        assert "cache;dur=" in timings.server_timing_header()
+        assert "total;dur=" in timings.server_timing_header()
+
+
+class TestServerTimingHeader:
+    """Test Server-Timing emission on real requests"""
+
+    @pytest.mark.asyncio
+    async def test_no_header_without_debug_token(
+        self, client: AsyncClient, test_user: User
+    ):
+        """Server-Timing is not exposed to ordinary callers"""
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": test_user.email, "password": "testpassword123"},
+        )
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_header_with_debug_token(self, client: AsyncClient, test_user: User):
+        """A signed debug token unlocks the per-subsystem breakdown"""
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": test_user.email, "password": "testpassword123"},
+            headers={"X-Debug-Token": create_debug_token()},
+        )
+        assert response.status_code == 200
+
+        header = response.headers["server-timing"]
+        assert "db;dur=" in header
+        assert "hash;dur=" in header
+        assert "serialize;dur=" in header
+        assert "total;dur=" in header
+
+    @pytest.mark.asyncio
+    async def test_forged_debug_token_rejected(
+        self, client: AsyncClient, test_user: User
+    ):
+        """An unsigned token does not unlock Server-Timing"""
+        response = await client.get(
+            "/health", headers={"X-Debug-Token": "not-a-signed-token"}
+        )
+        assert "server-timing" not in response.headers
+
+
+class TestMetricsEndpoint:
+    """Test the Prometheus /metrics surface"""
+
+    @pytest.mark.asyncio
+    async def test_metrics_exposes_route_template(
+        self, client: AsyncClient, auth_token: str
+    ):
+        """Latency is labelled with the route template and status"""
+        await client.get(
+            "/api/v1/auth/me", headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "http_request_duration_seconds_bucket" in body
+        assert 'route="/api/v1/auth/me"' in body
+        assert 'status="200"' in body
+        assert "http_requests_in_progress" in body
+        assert 'admission_queue_depth{lane="hash"}' in body
+        assert "scheduler_job_duration_seconds" in body
+
+    @pytest.mark.asyncio
+    async def test_cache_hits_and_misses_counted(self):
+        """Cache.get() counts a miss, then a hit after set()"""
+        from app.utils.caching import cache
+
+        def sample(result):
+            labels = {"backend": cache.cache_type, "result": result}
+            return REGISTRY.get_sample_value("cache_requests_total", labels) or 0
+
+        misses, hits = sample("miss"), sample("hit")
+
+        await cache.get("metrics:test")
+        await cache.set("metrics:test", {"v": 1}, expire=60)
+        await cache.get("metrics:test")
+        await cache.delete("metrics:test")
+
+        assert sample("miss") == misses + 1
+        assert sample("hit") == hits + 1
+
+
+class TestQueryInstrumentation:
+    """Test slow-query logging, per-request counts and N+1 detection"""
+
+    def test_parameters_are_redacted(self):
+        """Logged parameters never include bound values"""
+        assert events._redact({"email": "a@b.c", "pw": "x"}, False) == "{email=?, pw=?}"
+        assert events._redact(("secret",), False) == "<1 parameters redacted>"
+        assert "secret" not in events._redact([("secret",)], True)
+
+    @pytest.mark.asyncio
+    async def test_slow_query_counted(self, db_session: AsyncSession, monkeypatch):
+        """Statements over the threshold are counted as slow"""
+        monkeypatch.setattr(events.settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+        before = REGISTRY.get_sample_value("db_slow_queries_total") or 0
+
+        await db_session.execute(text("SELECT 1"))
+
+        assert REGISTRY.get_sample_value("db_slow_queries_total") > before
+
+    def test_repeated_statement_flagged_as_n_plus_one(self):
+        """The same statement shape N times is flagged for the route"""
+        labels = {"route": "/test/n-plus-one", "kind": "n_plus_one"}
+        stats = events.QueryStats()
+        for _ in range(events.settings.N_PLUS_ONE_THRESHOLD):
+            stats.add("SELECT users.id FROM users WHERE users.id = ?")
+        stats.add("SELECT 1")
+
+        events.report_request_queries(stats, "req-1", "/test/n-plus-one")
+
+        assert REGISTRY.get_sample_value("db_query_anomalies_total", labels) == 1
+        assert stats.count == events.settings.N_PLUS_ONE_THRESHOLD + 1
+
+
+class TestQueryBudgets:
+    """Pin the number of SQL statements issued by hot endpoints"""
+
+    CODE = "123456"
+
+    @pytest.fixture
+    def fixed_code(self, monkeypatch):
+        """Make verification and reset codes predictable"""
+        import app.services.auth as auth_service
+
+        monkeypatch.setattr(auth_service, "generate_verification_code", lambda: self.CODE)
+        return self.CODE
+
+    @pytest.fixture
+    async def registered(self, client: AsyncClient, fixed_code):
+        response = await client.post(
+            "/api/v1/auth/register",
+            json={"username": "budget", "email": "budget@example.com", "password": "password12345"},
+        )
+        assert response.status_code == 200
+        return "budget@example.com"
+
+    @pytest.mark.asyncio
+    async def test_register_budget(self, client: AsyncClient, assert_max_queries):
+        """/register: duplicate check + INSERT ... RETURNING (no refresh)"""
+        with assert_max_queries(2):
+            response = await client.post(
+                "/api/v1/auth/register",
+                json={"username": "fresh", "email": "fresh@example.com", "password": "password12345"},
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_verify_budget(self, client: AsyncClient, registered, assert_max_queries):
+        """/verify: user lookup + UPDATE ... RETURNING"""
+        with assert_max_queries(2):
+            response = await client.post(
+                "/api/v1/auth/verify", json={"email": registered, "code": self.CODE}
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_resend_budget(self, client: AsyncClient, registered, assert_max_queries):
+        """/resend_verification_code: user lookup + UPDATE ... RETURNING + user for the email"""
+        with assert_max_queries(3):
+            response = await client.post(
+                "/api/v1/auth/resend_verification_code", json={"email": registered}
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_forgot_password_budget(
+        self, client: AsyncClient, test_user: User, fixed_code, assert_max_queries
+    ):
+        """/forgot-password: user lookup + DELETE old codes + INSERT + user for the email"""
+        with assert_max_queries(4):
+            response = await client.post(
+                "/api/v1/auth/forgot-password", json={"email": test_user.email}
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_reset_password_budget(
+        self, client: AsyncClient, test_user: User, fixed_code, assert_max_queries
+    ):
+        """/reset-password: user + reset code lookups + two UPDATEs"""
+        await client.post("/api/v1/auth/forgot-password", json={"email": test_user.email})
+        with assert_max_queries(4):
+            response = await client.post(
+                "/api/v1/auth/reset-password",
+                json={
+                    "email": test_user.email,
+                    "verification_code": self.CODE,
+                    "new_password": "newpassword123",
+                },
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_refresh_budget(
+        self, client: AsyncClient, test_user: User, assert_max_queries
+    ):
+        """/refresh: token + user lookups, user-agent id (cached once read
+        committed), then one flush for the new pair and the old token's
+        revocation (a single statement on PostgreSQL)"""
+        login = await client.post(
+            "/api/v1/auth/login",
+            json={"email": test_user.email, "password": "testpassword123"},
+        )
+        with assert_max_queries(6):
+            response = await client.post(
+                "/api/v1/auth/refresh",
+                json={"refresh_token": login.json()["data"]["refresh_token"]},
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_logout_budget(
+        self, client: AsyncClient, auth_token: str, assert_max_queries
+    ):
+        """/logout: current user (2) + token lookups (2) + UPDATE"""
+        with assert_max_queries(5):
+            response = await client.post(
+                "/api/v1/auth/logout", headers={"Authorization": f"Bearer {auth_token}"}
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_logout_all_budget(
+        self, client: AsyncClient, auth_token: str, assert_max_queries
+    ):
+        """/logout-all: current user (2) + active tokens + UPDATE"""
+        with assert_max_queries(4):
+            response = await client.post(
+                "/api/v1/auth/logout-all", headers={"Authorization": f"Bearer {auth_token}"}
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_budget(
+        self, client: AsyncClient, auth_token: str, assert_max_queries
+    ):
+        """/me: token lookup + user lookup"""
+        with assert_max_queries(2):
+            response = await client.get(
+                "/api/v1/auth/me", headers={"Authorization": f"Bearer {auth_token}"}
+            )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_login_budget(
+        self, client: AsyncClient, test_user: User, assert_max_queries
+    ):
+        """/login: user lookup + access token + refresh token, plus interning
+        a user agent never seen before (lookup + insert)"""
+        with assert_max_queries(5):
+            response = await client.post(
+                "/api/v1/auth/login",
+                json={"email": test_user.email, "password": "testpassword123"},
+            )
+        assert response.status_code == 200
+
+
+class TestRequestProfiler:
+    """Test on-demand profiling of a single request"""
+
+    @pytest.mark.asyncio
+    async def test_profile_written_with_request_id(
+        self, client: AsyncClient, tmp_path, monkeypatch
+    ):
+        """A signed X-Profile-Token writes a profile named after the request ID"""
+        monkeypatch.setattr(profiling.settings, "PROFILE_DIR", str(tmp_path))
+
+        response = await client.get(
+            "/health", headers={"X-Profile-Token": create_debug_token()}
+        )
+
+        request_id = response.headers["x-request-id"]
+        profile_file = response.headers["x-profile-file"]
+        assert request_id in profile_file
+        assert any(p.name.startswith(request_id) for p in tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_query_token_ignored(
+        self, client: AsyncClient, tmp_path, monkeypatch
+    ):
+        """?profile=<token> is not accepted; the request URL is logged"""
+        monkeypatch.setattr(profiling.settings, "PROFILE_DIR", str(tmp_path))
+
+        response = await client.get("/health", params={"profile": create_debug_token()})
+
+        assert "x-profile-file" not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_unsigned_flag_ignored(
+        self, client: AsyncClient, tmp_path, monkeypatch
+    ):
+        """Requests without a valid token are never profiled"""
+        monkeypatch.setattr(profiling.settings, "PROFILE_DIR", str(tmp_path))
+
+        plain = await client.get("/health")
+        forged = await client.get("/health", headers={"X-Profile-Token": "forged"})
+
+        assert "x-profile-file" not in plain.headers
+        assert "x-profile-file" not in forged.headers
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestLoopLagMonitor:
+    """Test loop lag measurement and blocking-call capture"""
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_stack_captured(self):
+        """A synchronous sleep on the loop is caught with its call site"""
+        monitor = LoopLagMonitor(interval_ms=20, threshold_ms=50)
+        before = REGISTRY.get_sample_value("event_loop_blocked_total") or 0
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(0.3)  # block the loop
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        assert REGISTRY.get_sample_value("event_loop_blocked_total") > before
+        assert "test_blocking_call_stack_captured" in monitor.last_blocked_stack
+        assert "time.sleep(0.3)" in monitor.last_blocked_stack
+
+    @pytest.mark.asyncio
+    async def test_lag_observed(self):
+        """Probe wake-ups are recorded in the lag histogram"""
+        monitor = LoopLagMonitor(interval_ms=10, threshold_ms=1000)
+        before = REGISTRY.get_sample_value("event_loop_lag_seconds_count") or 0
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+
+        assert REGISTRY.get_sample_value("event_loop_lag_seconds_count") > before
+        assert monitor.last_blocked_stack is None
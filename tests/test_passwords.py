@@ -0,0 +1,151 @@
+"""
+Tests for the password hasher registry and rehash-on-login
+"""
+import hashlib
+
+import bcrypt
+import pytest
+from pwdlib.exceptions import HasherNotAvailable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import passwords
+from app.core.lifespan import lifespan
+from app.core.metrics import PASSWORD_REHASHES
+from app.core.security import (
+    get_password_hash,
+    verify_and_update_password,
+    verify_password,
+)
+from app.db.models.user import User
+from app.services.auth import AuthService
+from main import app
+
+PASSWORD = "testpassword123"
+
+
+@pytest.fixture
+def hashing(monkeypatch):
+    """Set hashing settings; the registry is rebuilt from them."""
+
+    def configure(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(passwords.settings, name, value)
+        monkeypatch.setattr(passwords, "_registry", None)
+
+    configure(PASSWORD_HASHER="bcrypt", BCRYPT_ROUNDS=4)
+    return configure
+
+
+def _legacy_hash(password: str, rounds: int = 4) -> str:
+    """A hash as get_password_hash wrote it before the registry."""
+    password_bytes = password.encode("utf-8")
+    if len(password_bytes) > 72:
+        password_bytes = hashlib.sha256(password_bytes).hexdigest().encode("utf-8")
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+class TestRegistry:
+    """Hashing and verifying through the registry"""
+
+    def test_hash_uses_configured_cost(self, hashing):
+        hashed = get_password_hash(PASSWORD)
+        assert hashed.startswith("$2b$04$")
+        assert verify_password(PASSWORD, hashed)
+        assert not verify_password("wrong", hashed)
+
+    def test_legacy_hashes_verify(self, hashing):
+        assert verify_password(PASSWORD, _legacy_hash(PASSWORD))
+        # Over bcrypt's 72 bytes: same pre-hash as before
+        long_password = "ä" * 60
+        assert verify_password(long_password, _legacy_hash(long_password))
+
+    def test_outdated_cost_needs_rehash(self, hashing):
+        current = get_password_hash(PASSWORD)
+        assert verify_and_update_password(PASSWORD, current) == (True, None)
+
+        hashing(BCRYPT_ROUNDS=5)
+        valid, new_hash = verify_and_update_password(PASSWORD, current)
+        assert valid
+        assert new_hash.startswith("$2b$05$")
+        # Wrong passwords are never rehashed
+        assert verify_and_update_password("wrong", current) == (False, None)
+
+    def test_unknown_hash_never_matches(self, hashing):
+        assert verify_and_update_password(PASSWORD, "not-a-hash") == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_missing_hasher_stops_startup(self, hashing, monkeypatch):
+        def unavailable():
+            raise HasherNotAvailable("argon2")
+
+        monkeypatch.setitem(passwords.HASHERS, "argon2", unavailable)
+        hashing(PASSWORD_HASHER="argon2")
+        with pytest.raises(HasherNotAvailable):
+            async with lifespan(app):
+                pass
+
+    def test_migrates_bcrypt_to_argon2(self, hashing):
+        pytest.importorskip("argon2")
+        legacy = get_password_hash(PASSWORD)
+
+        hashing(PASSWORD_HASHER="argon2")
+        valid, new_hash = verify_and_update_password(PASSWORD, legacy)
+        assert valid and new_hash.startswith("$argon2id$")
+        assert passwords.algorithm(new_hash) == "argon2"
+        assert verify_and_update_password(PASSWORD, new_hash) == (True, None)
+
+
+class TestCalibration:
+    """Picking costs for a latency target"""
+
+    def test_bcrypt_stops_at_target(self):
+        rounds, measured = passwords.calibrate_bcrypt(10_000, min_rounds=4, max_rounds=6)
+        assert rounds == 6
+        assert [cost for cost, _ in measured] == [4, 5, 6]
+
+        # Nothing fits: the minimum is still returned
+        rounds, measured = passwords.calibrate_bcrypt(0, min_rounds=4, max_rounds=6)
+        assert rounds == 4
+        assert len(measured) == 1
+
+
+class TestRehashOnLogin:
+    """AuthService.login upgrades outdated hashes"""
+
+    @pytest.mark.asyncio
+    async def test_login_rehashes(self, db_session: AsyncSession, hashing):
+        user = User(
+            username="legacy",
+            email="legacy@example.com",
+            hashed_password=_legacy_hash(PASSWORD, rounds=4),
+            is_active=True,
+        )
+        db_session.add(user)
+        await db_session.commit()
+        hashing(BCRYPT_ROUNDS=5)
+        before = PASSWORD_REHASHES.labels("bcrypt")._value.get()
+
+        await AuthService(db_session).login(user.email, PASSWORD)
+        await db_session.commit()
+        await db_session.refresh(user)
+
+        assert user.hashed_password.startswith("$2b$05$")
+        assert verify_password(PASSWORD, user.hashed_password)
+        assert PASSWORD_REHASHES.labels("bcrypt")._value.get() == before + 1
+
+    @pytest.mark.asyncio
+    async def test_current_hash_untouched(self, db_session: AsyncSession, hashing):
+        user = User(
+            username="current",
+            email="current@example.com",
+            hashed_password=get_password_hash(PASSWORD),
+            is_active=True,
+        )
+        db_session.add(user)
+        await db_session.commit()
+        stored = user.hashed_password
+
+        await AuthService(db_session).login(user.email, PASSWORD)
+        await db_session.commit()
+        await db_session.refresh(user)
+        assert user.hashed_password == stored
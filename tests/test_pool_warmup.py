@@ -0,0 +1,71 @@
+"""
+Tests for connection-pool warmup and pool statistics
+"""
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db.base import Base
+from app.db.events import capture_queries
+from app.db.session import pool_stats
+from app.db.warmup import warm_pool
+
+
+@pytest.fixture
+async def pooled_engine(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=3,
+        max_overflow=2,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+class TestWarmPool:
+    """Startup opens pool_size connections and primes the hot queries"""
+
+    @pytest.mark.asyncio
+    async def test_opens_pool_size_connections(self, pooled_engine):
+        opened = await warm_pool(pooled_engine)
+
+        assert opened == 3
+        stats = pool_stats(pooled_engine)
+        assert stats["idle"] == 3  # all back in the pool, ready for requests
+        assert stats["checked_out"] == 0
+
+    @pytest.mark.asyncio
+    async def test_primes_hot_queries_on_each_connection(self, pooled_engine):
+        with capture_queries() as statements:
+            await warm_pool(pooled_engine, connections=2)
+
+        from_users = [s for s in statements if "FROM users" in s]
+        from_tokens = [s for s in statements if "FROM access_tokens" in s]
+        assert len(from_users) == 2 * 3  # get_by_id / email / username
+        assert len(from_tokens) == 2
+
+    @pytest.mark.asyncio
+    async def test_unreachable_database_fails_startup(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/dir/x.db")
+        with pytest.raises(Exception):
+            await warm_pool(engine, connections=2)
+        await engine.dispose()
+
+
+class TestPoolStats:
+    """Pool occupancy for dashboards"""
+
+    @pytest.mark.asyncio
+    async def test_reports_checked_out_connections(self, pooled_engine):
+        async with pooled_engine.connect():
+            stats = pool_stats(pooled_engine)
+        assert stats["size"] == 3
+        assert stats["checked_out"] == 1
+
+    @pytest.mark.asyncio
+    async def test_health_includes_pool(self, client):
+        response = await client.get("/health")
+        assert "pool" in response.json()["data"]
@@ -0,0 +1,35 @@
+"""
+Tests for the cached hot-path statements
+"""
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import queries
+from app.db.models.user import User
+
+
+class TestLambdaStatements:
+    """Each call binds its own values into the shared cached statement"""
+
+    @pytest.mark.asyncio
+    async def test_values_are_bound_per_call(self, db_session: AsyncSession):
+        ids = [uuid.uuid4(), uuid.uuid4()]
+        for i, user_id in enumerate(ids):
+            db_session.add(
+                User(id=user_id, username=f"u{i}", email=f"u{i}@example.com", hashed_password="x")
+            )
+        await db_session.flush()
+
+        for i, user_id in enumerate(ids):
+            by_email = await db_session.execute(queries.user_by_email(f"u{i}@example.com"))
+            by_id = await db_session.execute(queries.user_by_id(user_id))
+            assert by_email.scalar_one().id == user_id
+            assert by_id.scalar_one().username == f"u{i}"
+
+    def test_statement_shape_is_cached(self):
+        first = queries.user_by_email("a@example.com")._generate_cache_key()
+        second = queries.user_by_email("b@example.com")._generate_cache_key()
+        assert first.key == second.key
+        assert first.bindparams[0].value != second.bindparams[0].value
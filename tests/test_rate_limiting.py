@@ -0,0 +1,275 @@
+"""
+Tests for the shared rate limit storage
+"""
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+from httpx import AsyncClient
+from limits import parse
+from starlette.requests import Request
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+
+from app.core.ip_filter import client_ip
+from app.core.hybrid_limiter import ROUTE_SHARES, HybridRateLimiter
+from app.core.rate_limit_storage import SharedMemoryStorage
+from app.core import rate_limit_storage, rate_limiting
+from app.core.config import settings
+from app.core.rate_limiting import limiter, route_cost, user_or_ip_key
+from app.core.security import create_access_token
+
+STRATEGIES = {"fixed-window": FixedWindowRateLimiter, "moving-window": MovingWindowRateLimiter}
+
+
+def _request(peer="198.51.100.20", token=None) -> Request:
+    headers = []
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return Request({"type": "http", "headers": headers, "client": (peer, 50000)})
+
+
+def _worker(path: str, strategy: str, attempts: int, results) -> None:
+    """One 'gunicorn worker': its own storage instance and connection."""
+    rate_limiter = STRATEGIES[strategy](SharedMemoryStorage(f"sharedmem://{path}"))
+    limit = parse("10/minute")
+    results.put(sum(rate_limiter.hit(limit, "login", "203.0.113.7") for _ in range(attempts)))
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return SharedMemoryStorage(f"sharedmem://{tmp_path / 'ratelimit.sqlite'}")
+
+
+class TestSharedMemoryStorage:
+    """Counter semantics of the sharedmem:// backend"""
+
+    def test_incr_and_expiry(self, storage):
+        assert storage.incr("k", 60) == 1
+        assert storage.incr("k", 60, amount=2) == 3
+        assert storage.get("k") == 3
+        assert storage.get_expiry("k") > 0
+
+    def test_expired_counter_restarts(self, storage):
+        storage.incr("k", 0)
+        assert storage.get("k") == 0
+        assert storage.incr("k", 60) == 1
+
+    def test_moving_window(self, storage):
+        assert storage.acquire_entry("k", limit=2, expiry=60)
+        assert storage.acquire_entry("k", limit=2, expiry=60)
+        assert not storage.acquire_entry("k", limit=2, expiry=60)
+        _, count = storage.get_moving_window("k", limit=2, expiry=60)
+        assert count == 2
+
+    def test_clear_and_reset(self, storage):
+        storage.incr("a", 60)
+        storage.acquire_entry("b", limit=5, expiry=60)
+        storage.clear("a")
+        assert storage.get("a") == 0
+        assert storage.reset() == 1
+        assert storage.check()
+
+    def test_locked_storage_fails_fast(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(rate_limit_storage.settings, "RATE_LIMIT_BUSY_TIMEOUT_MS", 20)
+        uri = f"sharedmem://{tmp_path / 'ratelimit.sqlite'}"
+        holder, waiter = SharedMemoryStorage(uri), SharedMemoryStorage(uri)
+        holder._conn.execute("BEGIN IMMEDIATE")  # another worker mid-write
+
+        start = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            waiter.incr("k", 60)
+        assert time.perf_counter() - start < 1
+        holder._conn.execute("ROLLBACK")
+        assert waiter.incr("k", 60) == 1
+
+    def test_default_path_is_namespaced(self, monkeypatch):
+        first = rate_limit_storage.default_path()
+        monkeypatch.setattr(rate_limit_storage.settings, "APP_NAME", "Other App")
+        assert rate_limit_storage.default_path() != first
+
+    def test_instances_share_counters(self, tmp_path):
+        uri = f"sharedmem://{tmp_path / 'ratelimit.sqlite'}"
+        first, second = SharedMemoryStorage(uri), SharedMemoryStorage(uri)
+        first.incr("k", 60)
+        assert second.incr("k", 60) == 2
+
+
+class TestGlobalLimits:
+    """Limits hold across processes, not per worker"""
+
+    @pytest.mark.parametrize("strategy", ["fixed-window", "moving-window"])
+    def test_limit_holds_across_workers(self, tmp_path, strategy):
+        path = str(tmp_path / "ratelimit.sqlite")
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=_worker, args=(path, strategy, 8, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        allowed = sum(results.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join(timeout=10)
+
+        # 4 workers x 8 attempts against 10/minute: exactly 10 get through
+        assert allowed == 10
+
+
+class TestHybridLimiter:
+    """Local buckets grant without I/O and converge on the global count"""
+
+    def _limiter(self, storage, share):
+        rate_limiter = HybridRateLimiter(storage)
+        rate_limiter.default_share = share
+        rate_limiter.sync_interval = 3600  # sync by hand
+        return rate_limiter
+
+    def test_grants_locally_then_syncs(self, storage):
+        rate_limiter = self._limiter(storage, share=1.0)
+        limit = parse("10/minute")
+        key = limit.key_for("203.0.113.7", "tests.route")
+
+        assert all(rate_limiter.hit(limit, "203.0.113.7", "tests.route") for _ in range(10))
+        assert storage.get(key) == 1  # only the first hit went to the storage
+
+        rate_limiter.sync()
+        assert storage.get(key) == 10
+        assert not rate_limiter.hit(limit, "203.0.113.7", "tests.route")
+
+    def test_workers_converge_on_limit(self, storage):
+        """Overshoot is bounded by the other worker's share"""
+        workers = [self._limiter(storage, share=0.5) for _ in range(2)]
+        limit = parse("10/minute")
+
+        allowed = 0
+        for attempt in range(30):
+            allowed += workers[attempt % 2].hit(limit, "203.0.113.7", "tests.route")
+            if attempt % 7 == 0:
+                workers[attempt % 2].sync()
+
+        assert 10 <= allowed <= 10 + 5
+        for worker in workers:
+            worker.sync()
+        assert not any(worker.hit(limit, "203.0.113.7", "tests.route") for worker in workers)
+
+    def test_strict_route_always_hits_storage(self, storage, monkeypatch):
+        monkeypatch.setitem(ROUTE_SHARES, "tests.strict", 0)
+        rate_limiter = self._limiter(storage, share=1.0)
+        limit = parse("3/minute")
+
+        results = [rate_limiter.hit(limit, "203.0.113.7", "tests.strict") for _ in range(4)]
+
+        assert results == [True, True, True, False]
+        assert storage.get(limit.key_for("203.0.113.7", "tests.strict")) == 4
+
+    def test_code_routes_are_strict(self):
+        # Keyed by the URL path, the scope slowapi passes to the strategy
+        assert ROUTE_SHARES["/api/v1/auth/reset-password"] == 0
+        assert ROUTE_SHARES["/api/v1/auth/verify"] == 0
+
+    @pytest.mark.asyncio
+    async def test_strict_route_consults_storage_every_call(
+        self, client: AsyncClient, storage, monkeypatch
+    ):
+        rate_limiter = self._limiter(storage, share=1.0)
+        monkeypatch.setattr(limiter, "_limiter", rate_limiter)
+        calls = []
+        incr = storage.incr
+
+        def counting_incr(key, *args, **kwargs):
+            calls.append(key)
+            return incr(key, *args, **kwargs)
+
+        monkeypatch.setattr(storage, "incr", counting_incr)
+        limiter.enabled = True
+        try:
+            for _ in range(3):
+                await client.post(
+                    "/api/v1/auth/verify",
+                    json={"email": "nobody@example.com", "code": "000000"},
+                )
+        finally:
+            limiter.enabled = False
+            limiter.reset()
+
+        assert len([key for key in calls if "/api/v1/auth/verify" in key]) == 3
+        # The shared "auth" budget keeps the default share: one settle, then local
+        assert len([key for key in calls if "/auth/verify" not in key]) == 1
+
+
+class TestLimiterWiring:
+    """The app limiter uses shared storage"""
+
+    def test_default_storage_is_shared(self):
+        assert isinstance(limiter._storage, SharedMemoryStorage)
+
+    @pytest.mark.asyncio
+    async def test_endpoint_limit_enforced(self, client: AsyncClient):
+        limiter.reset()
+        limiter.enabled = True
+        try:
+            payload = {"email": "nobody@example.com"}
+            codes = [
+                (await client.post("/api/v1/auth/forgot-password", json=payload)).status_code
+                for _ in range(6)
+            ]
+        finally:
+            limiter.enabled = False
+            limiter.reset()
+
+        # 5/minute
+        assert 429 not in codes[:5]
+        assert codes[5] == 429
+
+
+class TestKeyFunctions:
+    """Limits key on the real caller"""
+
+    def test_ip_key_is_client_ip(self):
+        # The one resolver, tested with X-Forwarded-For in test_ip_filter
+        assert limiter._key_func is client_ip
+
+    def test_user_key_for_valid_token(self):
+        token = create_access_token({"sub": "user@example.com"})
+        first = user_or_ip_key(_request(token=token))
+        second = user_or_ip_key(_request(peer="192.0.2.1", token=token))
+
+        assert first.startswith("user:")
+        assert first == second  # same user behind different addresses
+        assert "example.com" not in first
+
+    def test_ip_key_for_invalid_token(self):
+        assert user_or_ip_key(_request(token="not-a-jwt")) == "ip:198.51.100.20"
+
+
+class TestRouteCosts:
+    """Expensive routes charge more of the shared budget"""
+
+    def test_defaults(self):
+        assert route_cost("login") > route_cost("refresh_access_token") > route_cost("read_users_me")
+
+    def test_override(self, monkeypatch):
+        monkeypatch.setattr(rate_limiting.settings, "RATE_LIMIT_COSTS", {"login": 25})
+        assert route_cost("login") == 25
+
+    @pytest.mark.asyncio
+    async def test_me_charges_user_budget(self, client: AsyncClient, auth_token: str):
+        limiter.reset()
+        limiter.enabled = True
+        try:
+            for _ in range(3):
+                response = await client.get(
+                    "/api/v1/auth/me", headers={"Authorization": f"Bearer {auth_token}"}
+                )
+                assert response.status_code == 200
+            key = user_or_ip_key(_request(token=auth_token))
+            stats = limiter.limiter.get_window_stats(
+                parse(settings.RATE_LIMIT_AUTH_BUDGET), key, "auth"
+            )
+        finally:
+            limiter.enabled = False
+            limiter.reset()
+
+        assert stats.remaining == 100 - 3 * route_cost("read_users_me")
@@ -0,0 +1,160 @@
+"""
+Tests for read-replica routing
+
+Uses two SQLite files as primary and replica, with different rows in
+each, so every read shows which database answered it.
+"""
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models.user import User
+from app.db.routing import ReplicaSet, RoutingSession, prefer_replica, use_primary
+from app.services.user import UserService
+
+
+def _user(username: str) -> User:
+    return User(
+        id=uuid.uuid4(),
+        username=username,
+        email="same@example.com",
+        hashed_password="x",
+    )
+
+
+async def _database(path, username: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add(_user(username))
+        await session.commit()
+    return engine
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    primary = await _database(tmp_path / "primary.db", "on-primary")
+    replica = await _database(tmp_path / "replica.db", "on-replica")
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.fixture
+def make_session(databases):
+    primary, replica = databases
+    replicas = ReplicaSet([replica.sync_engine])
+    return async_sessionmaker(
+        bind=primary,
+        autoflush=False,
+        sync_session_class=RoutingSession,
+        replicas=replicas,
+    )
+
+
+class TestRouting:
+    """Replica-safe reads go to replicas; everything else to the primary"""
+
+    @pytest.mark.asyncio
+    async def test_marked_reads_use_replica(self, make_session):
+        async with make_session() as session:
+            user = await UserService(session).get_by_email("same@example.com")
+            assert user.username == "on-replica"
+
+    @pytest.mark.asyncio
+    async def test_unmarked_reads_use_primary(self, make_session):
+        async with make_session() as session:
+            result = await session.execute(select(User))
+            assert result.scalar_one().username == "on-primary"
+
+    @pytest.mark.asyncio
+    async def test_for_update_uses_primary(self, make_session):
+        async with make_session() as session:
+            result = await session.execute(prefer_replica(select(User)).with_for_update())
+            assert result.scalar_one().username == "on-primary"
+
+    @pytest.mark.asyncio
+    async def test_use_primary_override(self, make_session):
+        async with make_session() as session:
+            with use_primary():
+                user = await UserService(session).get_by_email("same@example.com")
+            assert user.username == "on-primary"
+
+    @pytest.mark.asyncio
+    async def test_reads_follow_writes_to_primary(self, make_session):
+        async with make_session() as session:
+            session.add(
+                User(id=uuid.uuid4(), username="new", email="new@example.com", hashed_password="x")
+            )
+            await session.flush()
+            assert await UserService(session).get_by_username("new") is not None
+
+            await session.commit()  # still pinned after the commit
+            assert await UserService(session).get_by_username("new") is not None
+
+    @pytest.mark.asyncio
+    async def test_no_replicas_means_primary(self, databases):
+        primary, _ = databases
+        make_session = async_sessionmaker(
+            bind=primary, sync_session_class=RoutingSession, replicas=ReplicaSet([])
+        )
+        async with make_session() as session:
+            user = await UserService(session).get_by_email("same@example.com")
+            assert user.username == "on-primary"
+
+
+class TestReplicaSet:
+    """Load balancing and health ejection"""
+
+    @pytest.fixture
+    def engines(self, tmp_path):
+        engines = [
+            create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/r{i}.db").sync_engine
+            for i in range(2)
+        ]
+        yield engines
+        for engine in engines:
+            engine.dispose()
+
+    def test_round_robin(self, engines):
+        replicas = ReplicaSet(engines)
+        assert [replicas.choose() for _ in range(4)] == engines * 2
+
+    def test_least_connections(self, engines):
+        replicas = ReplicaSet(engines, strategy="least_connections")
+        replicas._in_use[engines[0]] = 3
+        assert replicas.choose() is engines[1]
+
+    def test_ejected_replica_skipped_until_timeout(self, engines):
+        replicas = ReplicaSet(engines, eject_seconds=60)
+        replicas.eject(engines[0])
+        assert {replicas.choose() for _ in range(4)} == {engines[1]}
+
+        replicas.eject(engines[1])
+        assert replicas.choose() is None  # all ejected: primary takes the reads
+
+        replicas._ejected_until.clear()
+        assert len(replicas.healthy()) == 2
+
+    @pytest.mark.asyncio
+    async def test_connect_failure_ejects(self, databases, tmp_path):
+        primary, _ = databases
+        broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/dir/r.db")
+        replicas = ReplicaSet([broken.sync_engine], eject_seconds=60)
+        make_session = async_sessionmaker(
+            bind=primary, sync_session_class=RoutingSession, replicas=replicas
+        )
+
+        async with make_session() as session:
+            with pytest.raises(Exception):
+                await UserService(session).get_by_email("same@example.com")
+        assert replicas.healthy() == []
+
+        async with make_session() as session:
+            user = await UserService(session).get_by_email("same@example.com")
+            assert user.username == "on-primary"
+        await broken.dispose()
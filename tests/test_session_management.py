@@ -0,0 +1,229 @@
+"""
+Tests for listing and revoking a user's sessions (GET/DELETE /auth/sessions)
+"""
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.events import run_after_commit
+from app.db.models.tokens import AccessToken
+from app.db.models.user import User
+from app.services import auth as auth_module
+from app.services import sessions
+from app.services import token as token_module
+from app.services.sessions import InMemorySessionStore
+from app.services.token import TokenService
+from app.utils.caching import cache
+from app.utils.pagination import paginate_keyset
+
+LOGIN = {"email": "test@example.com", "password": "testpassword123"}
+
+
+async def _login(client: AsyncClient, user_agent: str = "pytest") -> dict:
+    response = await client.post(
+        "/api/v1/auth/login", json=LOGIN, headers={"User-Agent": user_agent}
+    )
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _sessions(client: AsyncClient, token: str, **params) -> dict:
+    response = await client.get(
+        "/api/v1/auth/sessions", headers=_bearer(token), params=params
+    )
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+class TestListSessions:
+    """GET /auth/sessions"""
+
+    @pytest.mark.asyncio
+    async def test_lists_devices_newest_first(self, client: AsyncClient, test_user: User):
+        await _login(client, "Firefox")
+        token = (await _login(client, "Safari"))["access_token"]
+
+        page = await _sessions(client, token)
+        assert [s["user_agent"] for s in page["data"]] == ["Safari", "Firefox"]
+        assert page["has_next"] is False
+        assert page["next_cursor"] is None
+        assert {"id", "ip_address", "created_at", "last_used_at", "expires_at"} <= set(
+            page["data"][0]
+        )
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages(self, client: AsyncClient, test_user: User):
+        tokens = [(await _login(client))["access_token"] for _ in range(5)]
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+            page = await _sessions(client, tokens[0], **params)
+            seen += [s["id"] for s in page["data"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 5
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, client: AsyncClient, auth_token: str):
+        response = await client.get(
+            "/api/v1/auth/sessions",
+            headers=_bearer(auth_token),
+            params={"cursor": "not-a-cursor"},
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_excludes_revoked(self, client: AsyncClient, test_user: User):
+        first = (await _login(client))["access_token"]
+        second = (await _login(client))["access_token"]
+        await client.post("/api/v1/auth/logout", headers=_bearer(first))
+
+        page = await _sessions(client, second)
+        assert len(page["data"]) == 1
+
+
+class TestSessionListCache:
+    """The first page is cached per user and dropped on login and logout"""
+
+    @pytest.mark.asyncio
+    async def test_first_page_cached(
+        self, test_user: User, db_session: AsyncSession, assert_max_queries
+    ):
+        token_service = TokenService()
+        await token_service.issue_token_pair(test_user.id, test_user.email, db_session)
+
+        first = await token_service.list_sessions(test_user.id, db_session)
+        with assert_max_queries(0):
+            assert await token_service.list_sessions(test_user.id, db_session) == first
+
+    @pytest.mark.asyncio
+    async def test_invalidated_only_after_commit(
+        self, test_user: User, db_session: AsyncSession
+    ):
+        token_service = TokenService()
+        user_id, email = test_user.id, test_user.email  # a rollback expires test_user
+        key = token_service._session_list_key(user_id)
+        await token_service.list_sessions(user_id, db_session)
+
+        # Until the login commits, another request could re-cache the old page
+        await token_service.issue_token_pair(user_id, email, db_session)
+        assert await cache.get(key) is not None
+        await db_session.rollback()
+        await run_after_commit(db_session)
+        assert await cache.get(key) is not None
+
+        await token_service.issue_token_pair(user_id, email, db_session)
+        await db_session.commit()
+        await run_after_commit(db_session)
+        assert await cache.get(key) is None
+
+    @pytest.mark.asyncio
+    async def test_only_primary_reads_cached(
+        self, test_user: User, db_session: AsyncSession, monkeypatch
+    ):
+        reads = []
+
+        async def spy(db, query, keys, **kwargs):
+            reads.append(query.get_execution_options().get("replica", False))
+            return await paginate_keyset(db, query, keys, **kwargs)
+
+        monkeypatch.setattr(token_module, "paginate_keyset", spy)
+        token_service = TokenService()
+        await token_service.list_sessions(test_user.id, db_session)
+        await token_service.list_sessions(test_user.id, db_session, limit=5)
+        assert reads == [False, True]
+
+    @pytest.mark.asyncio
+    async def test_login_and_logout_invalidate(self, client: AsyncClient, test_user: User):
+        token = (await _login(client))["access_token"]
+        assert len((await _sessions(client, token))["data"]) == 1
+
+        other = (await _login(client))["access_token"]
+        assert len((await _sessions(client, token))["data"]) == 2
+
+        await client.post("/api/v1/auth/logout", headers=_bearer(other))
+        assert len((await _sessions(client, token))["data"]) == 1
+
+
+class TestRevokeSession:
+    """DELETE /auth/sessions/{id}"""
+
+    @pytest.mark.asyncio
+    async def test_signs_device_out(
+        self, client: AsyncClient, test_user: User, db_session: AsyncSession
+    ):
+        device = await _login(client)
+        token = (await _login(client))["access_token"]
+        page = await _sessions(client, token)
+        session_id = page["data"][1]["id"]
+
+        response = await client.delete(
+            f"/api/v1/auth/sessions/{session_id}", headers=_bearer(token)
+        )
+        assert response.status_code == 200
+
+        response = await client.get("/api/v1/auth/me", headers=_bearer(device["access_token"]))
+        assert response.status_code == 401
+        # Its refresh token went with it
+        response = await client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": device["refresh_token"]}
+        )
+        assert response.status_code == 401
+        assert [s["id"] for s in (await _sessions(client, token))["data"]] == [
+            page["data"][0]["id"]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unknown_or_foreign_session(
+        self, client: AsyncClient, test_user: User, db_session: AsyncSession
+    ):
+        token = (await _login(client))["access_token"]
+
+        other = User(
+            username="other", email="other@example.com", hashed_password="x", is_active=True
+        )
+        db_session.add(other)
+        await db_session.commit()
+        await TokenService().issue_token_pair(other.id, other.email, db_session)
+        await db_session.commit()
+        foreign = (
+            await db_session.execute(
+                select(AccessToken.id).where(AccessToken.user_id == other.id)
+            )
+        ).scalar_one()
+
+        for session_id in (uuid.uuid4(), foreign):
+            response = await client.delete(
+                f"/api/v1/auth/sessions/{session_id}", headers=_bearer(token)
+            )
+            assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_opaque_session_ended(
+        self, client: AsyncClient, test_user: User, monkeypatch
+    ):
+        for module in (token_module, auth_module):
+            monkeypatch.setattr(module.settings, "AUTH_TOKEN_MODE", "opaque")
+        store = InMemorySessionStore()
+        monkeypatch.setattr(sessions, "_store", store)
+
+        device = (await _login(client))["access_token"]
+        token = (await _login(client))["access_token"]
+        session_id = (await store.get(sessions.session_key(device)))["token_id"]
+
+        response = await client.delete(
+            f"/api/v1/auth/sessions/{session_id}", headers=_bearer(token)
+        )
+        assert response.status_code == 200
+        assert await store.get(sessions.session_key(device)) is None
+        response = await client.get("/api/v1/auth/me", headers=_bearer(device))
+        assert response.status_code == 401
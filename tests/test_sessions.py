@@ -0,0 +1,233 @@
+"""
+Tests for opaque session tokens (AUTH_TOKEN_MODE=opaque)
+"""
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from starlette.requests import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.admission import AdmissionController
+from app.core.rate_limiting import user_or_ip_key
+from app.core.security import create_access_token
+from app.db.models.tokens import AccessToken
+from app.db.models.user import User
+from app.services import auth as auth_module
+from app.services import sessions
+from app.services import token as token_module
+from app.services.sessions import InMemorySessionStore
+from app.services.token import TokenService
+
+LOGIN = {"email": "test@example.com", "password": "testpassword123"}
+
+
+@pytest.fixture
+def store(monkeypatch) -> InMemorySessionStore:
+    """Opaque mode with a fresh in-memory session store."""
+    for module in (token_module, auth_module):
+        monkeypatch.setattr(module.settings, "AUTH_TOKEN_MODE", "opaque")
+    store = InMemorySessionStore()
+    monkeypatch.setattr(sessions, "_store", store)
+    return store
+
+
+async def _login(client: AsyncClient) -> str:
+    response = await client.post("/api/v1/auth/login", json=LOGIN)
+    assert response.status_code == 200
+    return response.json()["data"]["access_token"]
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestOpaqueTokens:
+    """Issuing and authenticating with opaque tokens"""
+
+    @pytest.mark.asyncio
+    async def test_login_issues_opaque_token(
+        self, client: AsyncClient, test_user: User, store, db_session: AsyncSession
+    ):
+        token = await _login(client)
+
+        assert TokenService.is_opaque(token)
+        fields = await store.get(sessions.session_key(token))
+        assert fields["user_id"] == str(test_user.id)
+        assert fields["username"] == test_user.username
+        # The access_tokens audit row is still written
+        record = await db_session.get(AccessToken, uuid.UUID(fields["token_id"]))
+        assert record.token_hash == TokenService()._hash_token(token)
+
+    @pytest.mark.asyncio
+    async def test_me_without_database(
+        self, client: AsyncClient, test_user: User, store, assert_max_queries
+    ):
+        token = await _login(client)
+
+        with assert_max_queries(0):
+            response = await client.get("/api/v1/auth/me", headers=_bearer(token))
+        assert response.status_code == 200
+        assert response.json()["data"]["email"] == test_user.email
+
+    @pytest.mark.asyncio
+    async def test_unknown_token_rejected(self, client: AsyncClient, store):
+        response = await client.get("/api/v1/auth/me", headers=_bearer("not-a-session"))
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_jwt_still_accepted(
+        self, client: AsyncClient, auth_token: str, store
+    ):
+        """Tokens issued before switching modes keep working"""
+        response = await client.get("/api/v1/auth/me", headers=_bearer(auth_token))
+        assert response.status_code == 200
+
+
+class TestOpaqueRevocation:
+    """Logout ends sessions at once; access_tokens follows write-behind"""
+
+    @pytest.mark.asyncio
+    async def test_logout(
+        self, client: AsyncClient, test_user: User, store, db_session: AsyncSession
+    ):
+        token = await _login(client)
+        token_id = (await store.get(sessions.session_key(token)))["token_id"]
+
+        response = await client.post("/api/v1/auth/logout", headers=_bearer(token))
+        assert response.status_code == 200
+        response = await client.get("/api/v1/auth/me", headers=_bearer(token))
+        assert response.status_code == 401
+
+        assert await TokenService().apply_session_audit(db_session) == 1
+        record = (
+            await db_session.execute(
+                select(AccessToken).where(AccessToken.id == uuid.UUID(token_id))
+            )
+        ).scalar_one()
+        await db_session.refresh(record)
+        assert record.revoked is True
+        assert record.revoked_at is not None
+        # Drained
+        assert await TokenService().apply_session_audit(db_session) == 0
+
+    @pytest.mark.asyncio
+    async def test_logout_all(self, client: AsyncClient, test_user: User, store):
+        tokens = [await _login(client) for _ in range(3)]
+
+        response = await client.post("/api/v1/auth/logout-all", headers=_bearer(tokens[0]))
+        assert response.status_code == 200
+        assert response.json()["data"]["revoked_count"] == 3
+        for token in tokens:
+            response = await client.get("/api/v1/auth/me", headers=_bearer(token))
+            assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_logout_all_after_switch_to_jwt(
+        self, client: AsyncClient, test_user: User, store, monkeypatch
+    ):
+        opaque = await _login(client)
+        for module in (token_module, auth_module):
+            monkeypatch.setattr(module.settings, "AUTH_TOKEN_MODE", "jwt")
+        jwt_token = await _login(client)
+
+        response = await client.post("/api/v1/auth/logout-all", headers=_bearer(jwt_token))
+        assert response.status_code == 200
+        assert await store.get(sessions.session_key(opaque)) is None
+        response = await client.get("/api/v1/auth/me", headers=_bearer(opaque))
+        assert response.status_code == 401
+        # The rows are revoked directly; the audit flush doesn't run in jwt mode
+        assert await store.pop_audit(10) == []
+
+    @pytest.mark.asyncio
+    async def test_jwt_logout_all_survives_store_outage(
+        self, client: AsyncClient, test_user: User, monkeypatch
+    ):
+        store = InMemorySessionStore()
+        monkeypatch.setattr(sessions, "_store", store)
+
+        async def down(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(store, "delete_user", down)
+        token = await _login(client)
+
+        response = await client.post("/api/v1/auth/logout-all", headers=_bearer(token))
+        assert response.status_code == 200
+        assert response.json()["data"]["revoked_count"] == 1
+        response = await client.get("/api/v1/auth/me", headers=_bearer(token))
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_failed_audit_write_is_requeued(
+        self, test_user: User, store, db_session: AsyncSession, monkeypatch
+    ):
+        await store.queue_audit(sessions.audit_event(str(test_user.id), [str(uuid.uuid4())]))
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("database down")
+
+        monkeypatch.setattr(db_session, "execute", fail)
+        with pytest.raises(RuntimeError):
+            await TokenService().apply_session_audit(db_session)
+        assert len(await store.pop_audit(10)) == 1
+
+
+class TestOpaqueCaller:
+    """Admission and rate-limit keys know the user behind an opaque token"""
+
+    @staticmethod
+    def _scope(token: str, peer: str = "198.51.100.20") -> dict:
+        return {
+            "type": "http",
+            "path": "/api/v1/auth/me",
+            "method": "GET",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "client": (peer, 50000),
+        }
+
+    @pytest.mark.asyncio
+    async def test_priority_lane(self, client: AsyncClient, test_user: User, store):
+        token = await _login(client)
+        controller = AdmissionController()
+
+        assert controller.lane_for(self._scope(token)) is controller.lanes["priority"]
+        unknown = self._scope("x" * 43)
+        assert controller.lane_for(unknown) is controller.lanes["default"]
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_keyed_on_user(
+        self, client: AsyncClient, test_user: User, store
+    ):
+        token = await _login(client)
+        first = user_or_ip_key(Request(self._scope(token)))
+        second = user_or_ip_key(Request(self._scope(token, peer="192.0.2.1")))
+
+        assert first == second
+        # The same key a JWT of this user gets
+        jwt_token = create_access_token({"sub": test_user.email})
+        assert user_or_ip_key(Request(self._scope(jwt_token))) == first
+
+    @pytest.mark.asyncio
+    async def test_logout_forgets_subject(
+        self, client: AsyncClient, test_user: User, store
+    ):
+        token = await _login(client)
+        await client.post("/api/v1/auth/logout", headers=_bearer(token))
+        assert sessions.token_subject(token) is None
+
+
+class TestInMemoryStore:
+    """Expiry and per-user bookkeeping of the in-process store"""
+
+    @pytest.mark.asyncio
+    async def test_expired_session_is_gone(self, monkeypatch):
+        store = InMemorySessionStore()
+        await store.create("k", {"user_id": "u", "token_id": "t"}, ttl=60)
+        assert await store.get("k")
+
+        now = sessions.time.time()
+        monkeypatch.setattr(sessions.time, "time", lambda: now + 61)
+        assert await store.get("k") is None
+        assert await store.delete_user("u") == []
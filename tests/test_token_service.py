@@ -7,10 +7,12 @@ import pytest
 import uuid
 from datetime import datetime, timedelta, timezone
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
 from app.services.token import TokenService
+from app.db.models.tokens import RefreshToken, UserAgent
 from app.db.models.user import User
 
 
@@ -34,7 +36,8 @@ class TestTokenCreation:
         assert len(token_string) > 0
         assert token_record.user_id == test_user.id
         assert token_record.ip_address == "192.168.1.1"
-        assert token_record.user_agent == "Mozilla/5.0"
+        user_agent = await db_session.get(UserAgent, token_record.user_agent_id)
+        assert user_agent.value == "Mozilla/5.0"
         assert token_record.revoked is False
         assert token_record.expires_at > datetime.now(timezone.utc)
 
@@ -66,6 +69,112 @@ class TestTokenCreation:
         assert refresh_token_record.revoked is False
 
 
+class TestTokenPairIssuance:
+    """Test issuing access + refresh tokens in one write"""
+
+    @pytest.mark.asyncio
+    async def test_issue_token_pair(
+        self, db_session: AsyncSession, test_user: User, assert_max_queries
+    ):
+        """Both rows are written by one flush, access token first"""
+        token_service = TokenService()
+
+        with assert_max_queries(2) as statements:
+            access, refresh = await token_service.issue_token_pair(
+                user_id=test_user.id, email=test_user.email, db=db_session
+            )
+        assert statements[0].startswith("INSERT INTO access_tokens")
+        assert statements[1].startswith("INSERT INTO refresh_tokens")
+
+        payload, access_record = await token_service.validate_token(access, db_session)
+        refresh_payload, refresh_record = await token_service.validate_refresh_token(
+            refresh, db_session
+        )
+        assert refresh_record.access_token_id == access_record.id
+        assert refresh_payload["sub"] == str(test_user.id)
+
+    @pytest.mark.asyncio
+    async def test_rotation_revokes_in_same_flush(
+        self, db_session: AsyncSession, test_user: User, assert_max_queries
+    ):
+        """The exchanged refresh token is revoked alongside the new inserts"""
+        token_service = TokenService()
+        _, old_refresh = await token_service.issue_token_pair(
+            user_id=test_user.id, email=test_user.email, db=db_session
+        )
+        _, old_record = await token_service.validate_refresh_token(old_refresh, db_session)
+
+        with assert_max_queries(3):
+            await token_service.issue_token_pair(
+                user_id=test_user.id,
+                email=test_user.email,
+                db=db_session,
+                rotate=old_record,
+            )
+        assert old_record.revoked is True
+        assert old_record.revoked_at is not None
+
+    def test_postgresql_single_statement(self):
+        """On PostgreSQL the pair and the revocation are one statement"""
+        from sqlalchemy.dialects import postgresql
+
+        token_service = TokenService()
+        user_id = uuid.uuid4()
+        _, access_values = token_service._access_token_values(user_id, "a@example.com")
+        _, refresh_values = token_service._refresh_token_values(user_id, access_values["id"])
+
+        statement = token_service.token_pair_statement(
+            access_values, refresh_values, uuid.uuid4(), datetime.now(timezone.utc)
+        )
+        sql = str(statement.compile(dialect=postgresql.asyncpg.dialect()))
+
+        assert sql.startswith("WITH new_access_token AS")
+        assert "UPDATE refresh_tokens SET revoked" in sql
+        assert sql.count("INSERT INTO") == 2
+
+
+class TestUserAgentInterning:
+    """User agents are stored once and referenced by id"""
+
+    @pytest.mark.asyncio
+    async def test_same_agent_shares_a_row(
+        self, db_session: AsyncSession, test_user: User
+    ):
+        token_service = TokenService()
+        for _ in range(2):
+            await token_service.issue_token_pair(
+                user_id=test_user.id,
+                email=test_user.email,
+                db=db_session,
+                user_agent="Mozilla/5.0",
+            )
+        await db_session.commit()
+
+        agents = (await db_session.execute(select(UserAgent))).scalars().all()
+        assert [agent.value for agent in agents] == ["Mozilla/5.0"]
+        tokens = (await db_session.execute(select(RefreshToken))).scalars().all()
+        assert {token.user_agent_id for token in tokens} == {agents[0].id}
+
+    @pytest.mark.asyncio
+    async def test_committed_id_is_cached(
+        self, db_session: AsyncSession, test_user: User, assert_max_queries
+    ):
+        token_service = TokenService()
+        # Inserted by this session: not cached yet
+        agent_id = await token_service._user_agent_id("curl/8.0", db_session)
+        await db_session.commit()
+        # Read back from a committed row: cached from here on
+        assert await token_service._user_agent_id("curl/8.0", db_session) == agent_id
+
+        with assert_max_queries(0):
+            assert await token_service._user_agent_id("curl/8.0", db_session) == agent_id
+
+    @pytest.mark.asyncio
+    async def test_missing_agent(self, db_session: AsyncSession, assert_max_queries):
+        with assert_max_queries(0):
+            assert await TokenService()._user_agent_id(None, db_session) is None
+
+
 class TestTokenValidation:
     """Test token validation"""
 
@@ -215,7 +324,7 @@ class TestTokenRevocation:
         """Test revoking a token that doesn't exist"""
         token_service = TokenService()
 
-        fake_hash = "nonexistent_hash"
+        fake_hash = bytes(32)
         result = await token_service.revoke_token(fake_hash, db_session)
 
         assert result is False
@@ -306,11 +415,11 @@ class TestTokenHashing:
         assert hash1 != hash2
 
     def test_hash_token_sha256_length(self):
-        """Test that hash is SHA-256 (64 hex characters)"""
+        """Test that hash is a raw SHA-256 digest (32 bytes)"""
         token_service = TokenService()
 
         token = "test_token"
         token_hash = token_service._hash_token(token)
 
-        assert len(token_hash) == 64  # SHA-256 produces 64 hex characters
-        assert all(c in "0123456789abcdef" for c in token_hash)
+        assert isinstance(token_hash, bytes)
+        assert len(token_hash) == 32
@@ -0,0 +1,94 @@
+"""
+Tests for coalesced access_tokens.last_used_at tracking
+"""
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.tokens import AccessToken
+from app.db.models.user import User
+from app.services import token_usage
+from app.services.token import TokenService
+from app.services.token_usage import TokenUsageBuffer
+
+
+@pytest.fixture
+def buffer(monkeypatch) -> TokenUsageBuffer:
+    """A fresh usage buffer in place of the worker's."""
+    buffer = TokenUsageBuffer(resolution_minutes=5)
+    monkeypatch.setattr(token_usage, "usage_buffer", buffer)
+    return buffer
+
+
+async def _issue(user: User, db: AsyncSession) -> AccessToken:
+    token_service = TokenService()
+    access, _ = await token_service.issue_token_pair(user.id, user.email, db)
+    return await db.scalar(
+        select(AccessToken).where(
+            AccessToken.token_hash == token_service._hash_token(access)
+        )
+    )
+
+
+class TestTokenUsageBuffer:
+    """Recording and flushing token usage"""
+
+    @pytest.mark.asyncio
+    async def test_requests_coalesce(
+        self, client: AsyncClient, auth_token: str, buffer
+    ):
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        for _ in range(3):
+            response = await client.get("/api/v1/auth/me", headers=headers)
+            assert response.status_code == 200
+        assert len(buffer) == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_last_used_at(
+        self, test_user: User, db_session: AsyncSession, buffer, assert_max_queries
+    ):
+        records = [await _issue(test_user, db_session) for _ in range(3)]
+        for record in records:
+            buffer.record(record.id)
+
+        with assert_max_queries(1):
+            assert await buffer.flush(db_session) == 3
+        assert len(buffer) == 0
+        for record in records:
+            await db_session.refresh(record)
+            assert record.last_used_at is not None
+
+        # Within the resolution window a use is not written again
+        buffer.record(records[0].id)
+        assert len(buffer) == 0
+        assert await buffer.flush(db_session) == 0
+
+    def test_resolution_window_expires(self, buffer, monkeypatch):
+        token_id = uuid.uuid4()
+        now = token_usage.time.monotonic()
+        buffer.record(token_id)
+        buffer.record(token_id)
+        assert len(buffer) == 1
+
+        monkeypatch.setattr(token_usage.time, "monotonic", lambda: now + 301)
+        buffer._pending.clear()
+        buffer.record(token_id)
+        assert len(buffer) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_requeued(
+        self, test_user: User, db_session: AsyncSession, buffer, monkeypatch
+    ):
+        record = await _issue(test_user, db_session)
+        buffer.record(record.id)
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("database down")
+
+        monkeypatch.setattr(db_session, "execute", fail)
+        with pytest.raises(RuntimeError):
+            await buffer.flush(db_session)
+        assert len(buffer) == 1